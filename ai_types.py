@@ -1,6 +1,8 @@
 from __future__ import annotations
 
+from array import array
 from dataclasses import dataclass
+from typing import Any, Sequence, Union
 
 
 @dataclass
@@ -33,3 +35,121 @@ class Candle:
         self.volume = float(self.volume)
         if self.quote_volume is not None:
             self.quote_volume = float(self.quote_volume)
+
+
+_FRAME_FLOAT_COLUMNS = ("open", "high", "low", "close", "volume")
+_FRAME_INT_COLUMNS = ("open_time", "close_time")
+
+
+@dataclass(frozen=True)
+class CandleFrame:
+    """
+    Struct-of-arrays candle series: float64 open/high/low/close/volume and
+    int64 open_time/close_time, each exposed as a memoryview.
+
+    Slicing (``frame[-60:]``, ``frame.tail(40)``) returns a new frame that
+    shares the underlying buffers, so windows cost no copies. Integer
+    indexing builds a single ``Candle`` for code that still wants one.
+    """
+
+    open_time: memoryview
+    close_time: memoryview
+    open: memoryview
+    high: memoryview
+    low: memoryview
+    close: memoryview
+    volume: memoryview
+
+    @classmethod
+    def empty(cls) -> "CandleFrame":
+        return cls(
+            **{name: memoryview(array("q")) for name in _FRAME_INT_COLUMNS},
+            **{name: memoryview(array("d")) for name in _FRAME_FLOAT_COLUMNS},
+        )
+
+    @classmethod
+    def from_klines(cls, raw_klines: Sequence[Sequence[Any]]) -> "CandleFrame":
+        rows = [item for item in raw_klines if isinstance(item, (list, tuple)) and len(item) >= 6]
+        open_time = array("q", [int(item[0]) for item in rows])
+        close_time = array(
+            "q",
+            [int(item[6]) if len(item) > 6 else int(item[0]) for item in rows],
+        )
+        return cls(
+            open_time=memoryview(open_time),
+            close_time=memoryview(close_time),
+            open=memoryview(array("d", [float(item[1]) for item in rows])),
+            high=memoryview(array("d", [float(item[2]) for item in rows])),
+            low=memoryview(array("d", [float(item[3]) for item in rows])),
+            close=memoryview(array("d", [float(item[4]) for item in rows])),
+            volume=memoryview(array("d", [float(item[5]) for item in rows])),
+        )
+
+    @classmethod
+    def from_candles(cls, candles: Sequence[Candle]) -> "CandleFrame":
+        return cls(
+            open_time=memoryview(array("q", [int(c.open_time or 0) for c in candles])),
+            close_time=memoryview(array("q", [int(c.close_time or 0) for c in candles])),
+            open=memoryview(array("d", [c.open for c in candles])),
+            high=memoryview(array("d", [c.high for c in candles])),
+            low=memoryview(array("d", [c.low for c in candles])),
+            close=memoryview(array("d", [c.close for c in candles])),
+            volume=memoryview(array("d", [c.volume for c in candles])),
+        )
+
+    @classmethod
+    def from_arrays(cls, columns: dict[str, array]) -> "CandleFrame":
+        return cls(**{name: memoryview(values) for name, values in columns.items()})
+
+    def to_arrays(self) -> dict[str, array]:
+        """Copy every column into its own array (views are cut down to the visible window)."""
+        return {
+            name: array(getattr(self, name).format, getattr(self, name).tobytes())
+            for name in _FRAME_INT_COLUMNS + _FRAME_FLOAT_COLUMNS
+        }
+
+    def __reduce__(self):
+        # memoryviews do not pickle; ship the columns as arrays instead
+        return CandleFrame.from_arrays, (self.to_arrays(),)
+
+    def __len__(self) -> int:
+        return len(self.close)
+
+    def __bool__(self) -> bool:
+        return len(self.close) > 0
+
+    def __getitem__(self, index: int | slice) -> "Candle | CandleFrame":
+        if isinstance(index, slice):
+            return self.view(index.start, index.stop)
+        return Candle(
+            open=self.open[index],
+            high=self.high[index],
+            low=self.low[index],
+            close=self.close[index],
+            volume=self.volume[index],
+            open_time=self.open_time[index],
+            close_time=self.close_time[index],
+        )
+
+    def view(self, start: int | None = None, stop: int | None = None) -> "CandleFrame":
+        window = slice(start, stop)
+        return CandleFrame(
+            open_time=self.open_time[window],
+            close_time=self.close_time[window],
+            open=self.open[window],
+            high=self.high[window],
+            low=self.low[window],
+            close=self.close[window],
+            volume=self.volume[window],
+        )
+
+    def tail(self, count: int) -> "CandleFrame":
+        if count <= 0:
+            return self.view(len(self), None)
+        return self.view(-count, None)
+
+    def to_candles(self) -> list[Candle]:
+        return [self[idx] for idx in range(len(self))]
+
+
+CandleSeries = Union[Sequence[Candle], CandleFrame]
@@ -1,11 +1,11 @@
 import sqlite3
 import time
 
-from db_path import get_db_path
+from db_pool import DB_POOL
 
 
 def init_alert_dedup() -> None:
-    conn = sqlite3.connect(get_db_path())
+    conn = DB_POOL.writer()
     try:
         conn.execute(
             """
@@ -33,7 +33,7 @@ def can_send(chat_id: int, feature: str, dedup_key: str, cooldown_sec: int) -> b
     dedup_value = str(dedup_key or "").strip().upper()
     if not feature_key or not dedup_value:
         return False
-    conn = sqlite3.connect(get_db_path())
+    conn = DB_POOL.writer()
     try:
         conn.execute("BEGIN IMMEDIATE")
         cur = conn.execute(
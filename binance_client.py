@@ -22,7 +22,7 @@ async def fetch_klines(
     start_ms: int | None = None,
 ) -> List[Candle]:
     try:
-        raw = await fetch_klines_raw(symbol, interval, limit, start_ms=start_ms)
+        raw = await fetch_klines_raw(symbol, interval, limit, start_ms=start_ms, forming=False)
     except Exception as exc:
         print(f"[BINANCE] ERROR {symbol}: {exc}")
         raise
@@ -2,7 +2,9 @@ import asyncio
 import os
 import random
 import time
-from typing import Mapping, Optional
+from contextlib import asynccontextmanager
+from typing import Dict, Mapping, Optional
+from urllib.parse import urlsplit
 
 
 def _get_header(headers: Mapping[str, str], key: str) -> Optional[str]:
@@ -26,55 +28,208 @@ def _parse_retry_after(value: Optional[str]) -> Optional[float]:
     return None
 
 
-class BinanceWeightTracker:
+def _klines_weight(limit: int) -> int:
+    if limit < 100:
+        return 1
+    if limit < 500:
+        return 2
+    if limit <= 1000:
+        return 5
+    return 10
+
+
+def request_weight(url: str, params: Optional[Mapping] = None) -> int:
+    """Request weight of a Binance REST call (0 for hosts outside the api limits)."""
+    parts = urlsplit(url)
+    host = parts.netloc
+    path = parts.path.rstrip("/")
+    params = params or {}
+    if host.startswith("fapi."):
+        if path.endswith("/klines"):
+            return _klines_weight(int(params.get("limit", 500)))
+        if path.endswith("/ticker/24hr"):
+            return 1 if params.get("symbol") else 40
+        if path.endswith("/aggTrades"):
+            return 20
+        return 1
+    if not path.startswith("/api/"):
+        return 0
+    if path.endswith("/klines"):
+        return _klines_weight(int(params.get("limit", 500)))
+    if path.endswith("/ticker/24hr"):
+        return 2 if params.get("symbol") else 80
+    if path.endswith("/exchangeInfo"):
+        return 20
+    if path.endswith("/aggTrades"):
+        return 4
+    return 2
+
+
+def _parse_priorities(raw: str) -> Dict[str, int]:
+    priorities: Dict[str, int] = {}
+    for item in raw.split(","):
+        name, _, value = item.partition(":")
+        name = name.strip()
+        if not name:
+            continue
+        try:
+            priorities[name] = max(1, int(value))
+        except ValueError:
+            continue
+    return priorities
+
+
+class WeightScheduler:
     """
-    Tracks Binance request weight using response headers.
+    Admits Binance requests against the 1-minute weight budget.
 
-    Binance recommends monitoring:
-      - X-MBX-USED-WEIGHT-1M
-      - Retry-After (for 429)
-    and backing off when near / over limits.
+    Every request states its weight (see request_weight) and the module that
+    issues it (binance_request_context). Usage is the larger of what was
+    granted locally in the current minute and X-MBX-USED-WEIGHT-1M, so other
+    processes on the same IP are accounted for. The budget is split between
+    modules by priority share: a module may always spend its own share, and
+    borrows unused weight only while no higher-priority module is waiting and
+    the reserve kept for the top-priority module is left untouched. The
+    number of requests in flight shrinks as the minute budget runs out.
+    429/418 with Retry-After block everyone until the ban ends.
     """
 
-    def __init__(self, *, limit_1m: int = 1200, soft_ratio: float = 0.90) -> None:
+    def __init__(
+        self,
+        *,
+        limit_1m: int = 1200,
+        target_ratio: float = 0.95,
+        reserve_ratio: float = 0.10,
+        max_inflight: int = 8,
+        priorities: Optional[Dict[str, int]] = None,
+        default_priority: int = 1,
+    ) -> None:
         self.limit_1m = int(limit_1m)
-        self.soft_ratio = float(soft_ratio)
+        self.target_ratio = float(target_ratio)
+        self.reserve_ratio = float(reserve_ratio)
+        self.max_inflight = max(1, int(max_inflight))
+        self.priorities = dict(priorities or {})
+        self.default_priority = max(1, int(default_priority))
         self.used_weight_1m: int = 0
 
-        self._lock = asyncio.Lock()
+        self._minute = 0
+        self._granted = 0
+        self._granted_by_module: Dict[str, int] = {}
+        self._server_used = 0
+        self._inflight = 0
+        self._waiting: Dict[str, int] = {}
         self._blocked_until: float = 0.0  # monotonic
+        self._wakeup = asyncio.Event()
+        self.waits = 0
+        self.throttled_by_module: Dict[str, int] = {}
+
+    @property
+    def budget(self) -> int:
+        return int(self.limit_1m * self.target_ratio)
+
+    def priority(self, module: Optional[str]) -> int:
+        return self.priorities.get(module or "", self.default_priority)
+
+    def _top_module(self) -> Optional[str]:
+        if not self.priorities:
+            return None
+        return max(self.priorities, key=self.priorities.get)
+
+    def _share(self, module: Optional[str]) -> int:
+        total = sum(self.priorities.values()) + self.default_priority
+        return int(self.budget * self.priority(module) / max(total, 1))
+
+    def _roll(self) -> None:
+        minute = int(time.time() // 60)
+        if minute != self._minute:
+            self._minute = minute
+            self._granted = 0
+            self._granted_by_module = {}
+            self._server_used = 0
+
+    def _used(self) -> int:
+        return max(self._granted, self._server_used)
+
+    def _inflight_limit(self) -> int:
+        budget = self.budget
+        if budget <= 0:
+            return self.max_inflight
+        headroom = max(budget - self._used(), 0) / budget
+        return max(1, min(self.max_inflight, int(self.max_inflight * headroom * 2) or 1))
+
+    def _admissible(self, weight: int, module: Optional[str]) -> bool:
+        if self._inflight >= self._inflight_limit():
+            return False
+        if weight <= 0:
+            return True
+        used = self._used()
+        if used + weight > self.budget:
+            return False
+        key = module or ""
+        if self._granted_by_module.get(key, 0) + weight <= self._share(module):
+            return True
+        own = self.priority(module)
+        if any(count > 0 and self.priority(other) > own for other, count in self._waiting.items()):
+            return False
+        top = self._top_module()
+        if top is not None and key != top:
+            return used + weight <= self.budget - int(self.budget * self.reserve_ratio)
+        return True
+
+    def _seconds_to_next_minute(self) -> float:
+        return 60.0 - (time.time() % 60) + 0.05
+
+    async def acquire(self, weight: int, module: Optional[str] = None) -> None:
+        key = module or ""
+        waiting = False
+        try:
+            while True:
+                now = time.monotonic()
+                if self._blocked_until > now:
+                    await asyncio.sleep(min(self._blocked_until - now, 60.0))
+                    continue
+                self._roll()
+                if self._admissible(weight, module):
+                    self._inflight += 1
+                    self._granted += weight
+                    self._granted_by_module[key] = self._granted_by_module.get(key, 0) + weight
+                    return
+                if not waiting:
+                    waiting = True
+                    self.waits += 1
+                    self.throttled_by_module[key] = self.throttled_by_module.get(key, 0) + 1
+                    self._waiting[key] = self._waiting.get(key, 0) + 1
+                self._wakeup.clear()
+                try:
+                    await asyncio.wait_for(self._wakeup.wait(), timeout=self._seconds_to_next_minute())
+                except asyncio.TimeoutError:
+                    pass
+        finally:
+            if waiting:
+                self._waiting[key] -= 1
+                if self._waiting[key] <= 0:
+                    del self._waiting[key]
+                self._wakeup.set()
+
+    def release(self) -> None:
+        self._inflight = max(self._inflight - 1, 0)
+        self._wakeup.set()
+
+    @asynccontextmanager
+    async def slot(self, weight: int, module: Optional[str] = None):
+        await self.acquire(weight, module)
+        try:
+            yield
+        finally:
+            self.release()
 
     async def block_for(self, seconds: float) -> None:
         if seconds <= 0:
             return
         seconds = min(seconds, 60.0)
-        async with self._lock:
-            until = time.monotonic() + seconds
-            if until > self._blocked_until:
-                self._blocked_until = until
-
-    async def pre_request_wait(self) -> None:
-        """Delay before sending a request if we are currently in a backoff window."""
-        while True:
-            async with self._lock:
-                now = time.monotonic()
-                blocked = self._blocked_until
-                used = self.used_weight_1m
-
-            if blocked > now:
-                await asyncio.sleep(min(blocked - now, 60.0))
-                continue
-
-            # If we're close to the 1m limit, slow down a bit to let the window slide.
-            soft_limit = int(self.limit_1m * self.soft_ratio)
-            if self.limit_1m > 0 and used >= soft_limit:
-                # scale ~0.5..2.5s when used goes from soft_limit..limit
-                over = min(max(used - soft_limit, 0), max(self.limit_1m - soft_limit, 1))
-                ratio = over / max(self.limit_1m - soft_limit, 1)
-                await asyncio.sleep(min(0.5 + 2.0 * ratio, 60.0))
-                continue
-
-            return
+        until = time.monotonic() + seconds
+        if until > self._blocked_until:
+            self._blocked_until = until
 
     async def update_from_headers(self, headers: Mapping[str, str]) -> None:
         used_1m = _get_header(headers, "x-mbx-used-weight-1m")
@@ -84,16 +239,56 @@ class BinanceWeightTracker:
             used_int = int(float(str(used_1m).strip()))
         except Exception:
             return
+        self._roll()
+        self.used_weight_1m = max(used_int, 0)
+        self._server_used = max(self._server_used, self.used_weight_1m)
+        self._wakeup.set()
 
-        async with self._lock:
-            self.used_weight_1m = max(used_int, 0)
+    def snapshot(self) -> dict:
+        self._roll()
+        return {
+            "limit_1m": self.limit_1m,
+            "budget": self.budget,
+            "used": self._used(),
+            "server_used": self._server_used,
+            "inflight": self._inflight,
+            "inflight_limit": self._inflight_limit(),
+            "by_module": dict(self._granted_by_module),
+            "waiting": dict(self._waiting),
+            "waits": self.waits,
+            "throttled_by_module": dict(self.throttled_by_module),
+        }
 
 
-# Shared singleton (imported by binance_rest / signals)
-BINANCE_WEIGHT_TRACKER = BinanceWeightTracker(
+_MODULE_PRIORITIES = _parse_priorities(
+    os.environ.get(
+        "BINANCE_MODULE_PRIORITIES",
+        "signal_refresh:8,signal_audit:4,ai_signals:3,pumpdump:2",
+    )
+)
+
+# Shared singletons (imported by binance_rest). Spot and futures have separate
+# weight limits, so each gets its own budget.
+BINANCE_WEIGHT_SCHEDULER = WeightScheduler(
     limit_1m=int(float(os.environ.get("BINANCE_WEIGHT_LIMIT_1M", "1200"))),
-    soft_ratio=float(os.environ.get("BINANCE_WEIGHT_SOFT_RATIO", "0.90")),
+    target_ratio=float(os.environ.get("BINANCE_WEIGHT_TARGET_RATIO", "0.95")),
+    reserve_ratio=float(os.environ.get("BINANCE_WEIGHT_RESERVE_RATIO", "0.10")),
+    max_inflight=int(os.environ.get("BINANCE_MAX_INFLIGHT", "8")),
+    priorities=_MODULE_PRIORITIES,
 )
+BINANCE_FUTURES_WEIGHT_SCHEDULER = WeightScheduler(
+    limit_1m=int(float(os.environ.get("BINANCE_FUTURES_WEIGHT_LIMIT_1M", "2400"))),
+    target_ratio=float(os.environ.get("BINANCE_WEIGHT_TARGET_RATIO", "0.95")),
+    reserve_ratio=float(os.environ.get("BINANCE_WEIGHT_RESERVE_RATIO", "0.10")),
+    max_inflight=int(os.environ.get("BINANCE_MAX_INFLIGHT", "8")),
+    priorities=_MODULE_PRIORITIES,
+)
+
+
+def get_weight_scheduler(url: str) -> WeightScheduler:
+    if urlsplit(url).netloc.startswith("fapi."):
+        return BINANCE_FUTURES_WEIGHT_SCHEDULER
+    return BINANCE_WEIGHT_SCHEDULER
 
 
 def calc_backoff_seconds(
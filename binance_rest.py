@@ -1,6 +1,7 @@
 import asyncio
 import os
 import random
+import sqlite3
 import time
 from contextlib import contextmanager
 from contextvars import ContextVar
@@ -9,8 +10,11 @@ from typing import Any, Optional
 
 import aiohttp
 
-from binance_limits import BINANCE_WEIGHT_TRACKER
-from rate_limiter import BINANCE_RATE_LIMITER
+from binance_limits import calc_backoff_seconds, get_weight_scheduler, request_weight
+import kline_db
+import kline_resample
+from bounded_cache import BoundedCache, env_bytes
+from kline_store import BINANCE_KLINES_MAX_LIMIT, KLINE_STORE, interval_to_ms
 
 # ---- shared session (one per process) ----
 _SHARED_SESSION: aiohttp.ClientSession | None = None
@@ -25,12 +29,11 @@ BINANCE_FALLBACK_BASE_URL = os.getenv(
 _BINANCE_BASE_URLS = [BINANCE_BASE_URL]
 if BINANCE_FALLBACK_BASE_URL and BINANCE_FALLBACK_BASE_URL not in _BINANCE_BASE_URLS:
     _BINANCE_BASE_URLS.append(BINANCE_FALLBACK_BASE_URL)
-# cache by (symbol, interval) to reuse across different LIMIT requests
-# value: (ts, data_list)
-_KLINES_CACHE: dict[tuple[str, str], tuple[float, list]] = {}
+# candles by (symbol, interval) to reuse across different LIMIT requests;
+# stale series are topped up with startTime= instead of refetching the window
+_KLINES_CACHE = KLINE_STORE
 _KLINES_INFLIGHT: dict[tuple[str, str, int], tuple[asyncio.Task, int]] = {}
 _KLINES_INFLIGHT_AWAITS: dict[str, int] = {}
-_AGGTRADES_CACHE: dict[tuple[str, str, int, int], tuple[float, list]] = {}
 _BINANCE_TIMEOUT = aiohttp.ClientTimeout(
     total=12, connect=4, sock_connect=4, sock_read=8
 )
@@ -82,6 +85,7 @@ def get_klines_ttl_sec(interval: str) -> int:
 
 
 _KLINES_CACHE_TTL_SEC_DEFAULT = _env_int("KLINES_TTL_DEFAULT", 45)
+# default refresh rate of the forming candle; every close expires the series anyway
 _KLINES_CACHE_TTL_BY_INTERVAL = {
     "1d": _env_int("KLINES_TTL_1D", 28800),
     "4h": _env_int("KLINES_TTL_4H", 5400),
@@ -106,6 +110,21 @@ _KLINES_CACHE_LOCK = asyncio.Lock()
 _KLINES_INFLIGHT_LOCK = asyncio.Lock()
 _AGGTRADES_CACHE_LOCK = asyncio.Lock()
 _AGGTRADES_CACHE_TTL_SEC = _env_int("AGGTRADES_TTL_SEC", 10)
+# aggTrades windows are large lists of dicts: bound them by bytes, not by count
+_AGGTRADES_CACHE: BoundedCache[tuple[str, str, int, int], list] = BoundedCache(
+    "aggtrades",
+    max_bytes=env_bytes("AGGTRADES_CACHE_MAX_MB", 32),
+    ttl_sec=_AGGTRADES_CACHE_TTL_SEC,
+)
+KLINES_RESAMPLE_ENABLED = os.getenv("KLINES_RESAMPLE", "1").strip().lower() not in {"0", "false", "no"}
+_KLINES_RESAMPLE_TFS = {
+    tf.strip()
+    for tf in os.getenv("KLINES_RESAMPLE_TFS", "15m,1h,4h").split(",")
+    if tf.strip()
+}
+# timeframes whose first derivation matched Binance / did not match it
+_KLINES_RESAMPLE_VERIFIED: set[str] = set()
+_KLINES_RESAMPLE_DISABLED: set[str] = set()
 _BINANCE_REQUEST_MODULE = ContextVar("binance_request_module", default=None)
 
 
@@ -235,13 +254,6 @@ def get_binance_state() -> dict[str, float | int]:
     }
 
 
-# ---- optional concurrency gate (reduces socket spikes) ----
-# One more layer in addition to rate limiter/weight tracker.
-BINANCE_SEM = asyncio.Semaphore(_env_int("BINANCE_MAX_CONCURRENCY", 5))
-KLINES_SEM = asyncio.Semaphore(int(os.getenv("BINANCE_KLINES_CONCURRENCY", "8")))
-AGGTRADES_SEM = asyncio.Semaphore(int(os.getenv("BINANCE_AGGTRADES_CONCURRENCY", "10")))
-
-
 @contextmanager
 def binance_request_context(module: str):
     token = _BINANCE_REQUEST_MODULE.set(module)
@@ -318,9 +330,9 @@ async def fetch_json(
     """
     Safe GET JSON with:
       - shared session (default)
-      - global weight tracking & backoff (429/418 + Retry-After)
+      - weight-budget admission per module (binance_limits.WeightScheduler)
+      - backoff on 429/418 honouring Retry-After
       - retries on 5xx / timeouts
-      - concurrency semaphore to avoid bursts
     """
     if session is None:
         session = await get_shared_session()
@@ -328,31 +340,31 @@ async def fetch_json(
     module = _BINANCE_REQUEST_MODULE.get()
     if module:
         _update_binance_stage(module, stage)
+    scheduler = get_weight_scheduler(url)
+    weight = request_weight(url, params)
 
     for attempt in range(_MAX_RETRIES + 1):
         try:
-            await BINANCE_WEIGHT_TRACKER.pre_request_wait()
-
             async def _perform_request():
-                async with BINANCE_SEM:
-                    async with BINANCE_RATE_LIMITER:
-                        _track_request()
-                        async with session.get(
-                            url,
-                            params=params,
-                            timeout=_BINANCE_TIMEOUT,
-                        ) as resp:
-                            await BINANCE_WEIGHT_TRACKER.update_from_headers(resp.headers)
-                            status = resp.status
-                            headers = resp.headers
-                            if status in (418, 429) or 500 <= status <= 599:
-                                return status, headers, None
-                            resp.raise_for_status()
-                            return status, headers, await resp.json()
-
-            status, headers, payload = await asyncio.wait_for(
-                _perform_request(), timeout=_BINANCE_TIMEOUT.total
-            )
+                _track_request()
+                async with session.get(
+                    url,
+                    params=params,
+                    timeout=_BINANCE_TIMEOUT,
+                ) as resp:
+                    await scheduler.update_from_headers(resp.headers)
+                    status = resp.status
+                    headers = resp.headers
+                    if status in (418, 429) or 500 <= status <= 599:
+                        return status, headers, None
+                    resp.raise_for_status()
+                    return status, headers, await resp.json()
+
+            # waiting for weight budget is not part of the request timeout
+            async with scheduler.slot(weight, module):
+                status, headers, payload = await asyncio.wait_for(
+                    _perform_request(), timeout=_BINANCE_TIMEOUT.total
+                )
             await _record_response()
 
             # Rate limit / ban protection
@@ -360,7 +372,10 @@ async def fetch_json(
                 if attempt < _MAX_RETRIES:
                     delay = random.uniform(0.5, 1.5) * (2**attempt)
                     if status in (418, 429):
-                        await BINANCE_WEIGHT_TRACKER.block_for(delay)
+                        delay = calc_backoff_seconds(
+                            attempt=attempt, retry_after_header=headers.get("Retry-After")
+                        )
+                        await scheduler.block_for(delay)
                     print(
                         "[BINANCE] retry "
                         f"status={status} attempt={attempt + 1}/{_MAX_RETRIES + 1} "
@@ -416,10 +431,25 @@ async def fetch_klines(
     limit: int,
     *,
     start_ms: int | None = None,
+    forming: bool = True,
+    forming_ttl_sec: float | None = None,
 ) -> Optional[list]:
+    """
+    Klines for (symbol, interval), served from _KLINES_CACHE while fresh.
+
+    The cached series expires when a candle closes after its last refresh.
+    forming=False is for callers that drop the forming candle (normalize_klines,
+    klines_to_frame): they are served from memory until the next close.
+    Otherwise the forming candle is refreshed every forming_ttl_sec, by default
+    the per-interval TTL.
+    """
     now = time.time()
     module = _BINANCE_REQUEST_MODULE.get()
     ttl_sec = get_klines_ttl_sec(interval)
+    if not forming:
+        forming_ttl = None
+    else:
+        forming_ttl = forming_ttl_sec if forming_ttl_sec is not None else ttl_sec
     cache_key = None if start_ms is not None else (symbol, interval)
     fetch_limit = limit
     if cache_key is not None:
@@ -428,10 +458,11 @@ async def fetch_klines(
             fetch_limit = max(fetch_limit, min_limit)
     if cache_key is not None:
         async with _KLINES_CACHE_LOCK:
-            cached = _KLINES_CACHE.get(cache_key)
-            if cached:
-                cached_ts, cached_data = cached
-                if now - cached_ts < ttl_sec and isinstance(cached_data, list):
+            cached_data = _KLINES_CACHE.get(cache_key)
+            if cached_data:
+                if _KLINES_CACHE.is_fresh(
+                    cache_key, now, forming_ttl=forming_ttl, fallback_ttl=ttl_sec
+                ):
                     if len(cached_data) >= limit:
                         _BINANCE_METRICS.increment(_BINANCE_METRICS.cache_hit, module)
                         _BINANCE_METRICS.increment(
@@ -502,14 +533,190 @@ async def fetch_klines(
                 _KLINES_INFLIGHT.pop(inflight_key, None)
 
 
+def warm_klines_cache() -> int:
+    """Load closed candles persisted by the previous run into _KLINES_CACHE."""
+    if not kline_db.KLINES_DB_ENABLED:
+        return 0
+    try:
+        kline_db.init_kline_db()
+        series = kline_db.run_reader(kline_db.load_recent_series, _KLINES_CACHE.capacity)
+    except sqlite3.Error as exc:
+        print(f"[binance_rest] klines db warm-load failed: {exc}")
+        return 0
+    for key, rows in series.items():
+        if rows:
+            # refreshed_at=0: treated as stale, the first read tops it up via startTime
+            _KLINES_CACHE.replace(key, rows, 0.0)
+    print(f"[binance_rest] klines db warm-load series={len(series)}")
+    return len(series)
+
+
+def _persist_closed_klines(symbol: str, interval: str, rows: list, now: float) -> None:
+    # queued to the kline_db writer thread, which batches commits
+    if not kline_db.KLINES_DB_ENABLED or not rows:
+        return
+    kline_db.save_closed_klines(symbol, interval, rows, int(now * 1000))
+
+
+async def _load_closed_range(symbol: str, interval: str, start_ms: int, limit: int) -> list:
+    if not kline_db.KLINES_DB_ENABLED:
+        return []
+    try:
+        return await kline_db.run_reader_async(kline_db.load_closed_range, symbol, interval, start_ms, limit)
+    except sqlite3.Error as exc:
+        print(f"[binance_rest] klines db read failed {symbol} {interval}: {exc}")
+        return []
+
+
+async def refresh_klines(symbol: str, interval: str, limit: int) -> Optional[list]:
+    """Top up the cached series over REST regardless of its TTL (stream backfill)."""
+    return await _fetch_klines_from_binance(
+        symbol,
+        interval,
+        limit,
+        start_ms=None,
+        cache_key=(symbol, interval),
+        now=time.time(),
+    )
+
+
+def merge_stream_kline(symbol: str, interval: str, row: list, *, closed: bool = False) -> bool:
+    """
+    Apply one streamed kline to the cached series. Returns False when the row
+    does not continue the series (missed candles); the caller must backfill.
+    """
+    key = (symbol, interval)
+    last_open = _KLINES_CACHE.last_open_time(key)
+    interval_ms = interval_to_ms(interval)
+    open_time = int(row[0])
+    if last_open is None or (interval_ms > 0 and open_time > last_open + interval_ms):
+        _KLINES_CACHE.set_live(key, False)
+        return False
+    if open_time < last_open:
+        return True
+    now = time.time()
+    _KLINES_CACHE.merge(key, [row], now)
+    if closed:
+        # the exchange marked it final, so do not depend on the local clock here
+        _persist_closed_klines(symbol, interval, [row], (int(row[6]) + 1) / 1000)
+    return True
+
+
+def set_klines_live(symbol: str, interval: str, live: bool) -> None:
+    _KLINES_CACHE.set_live((symbol, interval), live)
+
+
 async def get_klines(
     symbol: str,
     interval: str,
     limit: int,
     *,
     start_ms: int | None = None,
+    forming: bool = True,
+    forming_ttl_sec: float | None = None,
 ) -> Optional[list]:
-    return await fetch_klines(symbol, interval, limit, start_ms=start_ms)
+    return await fetch_klines(
+        symbol,
+        interval,
+        limit,
+        start_ms=start_ms,
+        forming=forming,
+        forming_ttl_sec=forming_ttl_sec,
+    )
+
+
+def _resample_plan(limits: dict[str, int]) -> tuple[dict[str, str], dict[str, int]]:
+    """
+    Pick a directly fetched source for every timeframe that can be resampled.
+
+    Larger timeframes are planned first and take the largest lower timeframe
+    whose window still fits in one request / the kline store; a timeframe
+    used as a source is always fetched itself.
+    """
+    sources: dict[str, str] = {}
+    fetch_limits = dict(limits)
+    order = sorted(limits, key=interval_to_ms)
+    max_base = min(_KLINES_CACHE.capacity, BINANCE_KLINES_MAX_LIMIT)
+    for idx in range(len(order) - 1, -1, -1):
+        target = order[idx]
+        if target not in _KLINES_RESAMPLE_TFS or target in _KLINES_RESAMPLE_DISABLED:
+            continue
+        if target in sources.values():
+            continue
+        for source in reversed(order[:idx]):
+            need = kline_resample.base_limit_for(source, target, limits[target])
+            if 0 < need <= max_base:
+                sources[target] = source
+                fetch_limits[source] = max(fetch_limits[source], need)
+                break
+    for target in sources:
+        fetch_limits.pop(target, None)
+    return sources, fetch_limits
+
+
+async def _verify_resampled(symbol: str, target: str, source: str, derived: list, limit: int, forming: bool) -> list:
+    """Compare the first derivation of each timeframe with Binance's own candles."""
+    direct = await fetch_klines(symbol, target, limit, forming=forming)
+    if not isinstance(direct, list):
+        return derived
+    _KLINES_RESAMPLE_VERIFIED.add(target)
+    if not kline_resample.klines_match(derived, direct):
+        _KLINES_RESAMPLE_DISABLED.add(target)
+        print(f"[binance_rest] resample mismatch {symbol} {source}->{target}, fetching {target} directly")
+        return direct
+    print(f"[binance_rest] resample verified {symbol} {source}->{target}")
+    return derived
+
+
+async def get_klines_bundle(
+    symbol: str,
+    limits: dict[str, int],
+    *,
+    forming: bool = True,
+) -> dict[str, Optional[list]]:
+    """
+    Klines for several timeframes of one symbol in as few requests as possible.
+
+    Timeframes listed in KLINES_RESAMPLE_TFS are aggregated locally from a
+    lower requested timeframe (kline_resample) when its window allows it, so
+    e.g. 5m/15m/1h/4h/1d costs three requests instead of five. A derived
+    series that comes out shorter than asked (gaps) is fetched directly.
+    """
+    if not KLINES_RESAMPLE_ENABLED or len(limits) < 2:
+        sources, fetch_limits = {}, dict(limits)
+    else:
+        sources, fetch_limits = _resample_plan(limits)
+    tfs = list(fetch_limits)
+    results = await asyncio.gather(
+        *(fetch_klines(symbol, tf, fetch_limits[tf], forming=forming) for tf in tfs),
+        return_exceptions=True,
+    )
+    fetched = dict(zip(tfs, results))
+    out: dict[str, Optional[list]] = {}
+    for tf in limits:
+        if tf in sources:
+            continue
+        data = fetched.get(tf)
+        out[tf] = data[-limits[tf]:] if isinstance(data, list) else None
+
+    now_ms = int(time.time() * 1000)
+    for target, source in sources.items():
+        limit = limits[target]
+        base = fetched.get(source)
+        derived = (
+            kline_resample.resample_klines(base, source, target, now_ms=now_ms)
+            if isinstance(base, list)
+            else []
+        )
+        if len(derived) < limit:
+            data = await fetch_klines(symbol, target, limit, forming=forming)
+            out[target] = data if isinstance(data, list) else None
+            continue
+        derived = derived[-limit:]
+        if target not in _KLINES_RESAMPLE_VERIFIED:
+            derived = await _verify_resampled(symbol, target, source, derived, limit, forming)
+        out[target] = derived
+    return out
 
 
 async def _fetch_klines_from_binance(
@@ -521,22 +728,41 @@ async def _fetch_klines_from_binance(
     cache_key: tuple[str, str] | None,
     now: float,
 ) -> Optional[list]:
-    print(f"[binance_rest] MISS klines {symbol} {interval} {limit}")
+    delta = None
+    if cache_key is not None:
+        async with _KLINES_CACHE_LOCK:
+            delta = _KLINES_CACHE.plan_refresh(cache_key, limit, int(now * 1000))
     params = {
         "symbol": symbol,
         "interval": interval,
         "limit": limit,
     }
+    if delta is not None:
+        params["startTime"], params["limit"] = delta
+        print(
+            f"[binance_rest] DELTA klines {symbol} {interval} {limit} "
+            f"(start={params['startTime']} limit={params['limit']})"
+        )
+    stored: list = []
     if start_ms is not None:
         params["startTime"] = start_ms
+        # closed candles are immutable: take what is on disk, fetch only the rest
+        stored = await _load_closed_range(symbol, interval, start_ms, limit)
+        if len(stored) >= limit:
+            print(f"[binance_rest] DISK klines {symbol} {interval} {limit} (start={start_ms})")
+            return stored
+        if stored:
+            params["startTime"] = int(stored[-1][0]) + interval_to_ms(interval)
+            params["limit"] = limit - len(stored)
+    if delta is None:
+        print(f"[binance_rest] MISS klines {symbol} {interval} {limit}")
     _track_klines_request()
     data = None
-    async with KLINES_SEM:
-        for base_url in _BINANCE_BASE_URLS:
-            url = f"{base_url}/klines"
-            data = await fetch_json(url, params, stage="klines")
-            if isinstance(data, list):
-                break
+    for base_url in _BINANCE_BASE_URLS:
+        url = f"{base_url}/klines"
+        data = await fetch_json(url, params, stage="klines")
+        if isinstance(data, list):
+            break
     if not isinstance(data, list):
         return None
     module = _BINANCE_REQUEST_MODULE.get()
@@ -549,17 +775,16 @@ async def _fetch_klines_from_binance(
             and metrics.cache_hit.get(module, 0) == 0
         ):
             print("[binance_rest] warning: metrics inconsistent (candles without requests)")
+    _persist_closed_klines(symbol, interval, data, time.time())
+    if stored:
+        data = stored + data
     if cache_key is not None:
         async with _KLINES_CACHE_LOCK:
-            prev = _KLINES_CACHE.get(cache_key)
-            if prev:
-                _, prev_data = prev
-                if isinstance(prev_data, list) and len(prev_data) >= len(data):
-                    _KLINES_CACHE[cache_key] = (now, prev_data)
-                else:
-                    _KLINES_CACHE[cache_key] = (now, data)
-            else:
-                _KLINES_CACHE[cache_key] = (now, data)
+            _KLINES_CACHE.merge(cache_key, data, now)
+            # a delta only carries the new candles: the window comes from the store
+            merged = _KLINES_CACHE.tail(cache_key, limit) if delta is not None else None
+        if merged is not None and len(merged) >= limit:
+            return merged
     return data
 
 
@@ -575,12 +800,12 @@ async def fetch_agg_trades(
     cache_key = (symbol, market, window_sec, limit)
     now = time.time()
     async with _AGGTRADES_CACHE_LOCK:
-        cached = _AGGTRADES_CACHE.get(cache_key)
-        if cached and now - cached[0] < _AGGTRADES_CACHE_TTL_SEC:
+        cached = _AGGTRADES_CACHE.get(cache_key, now=now)
+        if cached is not None:
             print(
                 f"[binance_rest] aggTrades {symbol} {market} (cache_hit=True)"
             )
-            return cached[1]
+            return cached
 
     print(f"[binance_rest] aggTrades {symbol} {market} (cache_hit=False)")
     params = {
@@ -590,22 +815,29 @@ async def fetch_agg_trades(
         "limit": limit,
     }
     data = None
-    async with AGGTRADES_SEM:
-        if market == "spot":
-            for base_url in _BINANCE_BASE_URLS:
-                url = f"{base_url}/aggTrades"
-                data = await fetch_json(url, params, stage="agg_trades")
-                if isinstance(data, list):
-                    break
-        else:
-            url = "https://fapi.binance.com/fapi/v1/aggTrades"
+    if market == "spot":
+        for base_url in _BINANCE_BASE_URLS:
+            url = f"{base_url}/aggTrades"
             data = await fetch_json(url, params, stage="agg_trades")
+            if isinstance(data, list):
+                break
+    else:
+        url = "https://fapi.binance.com/fapi/v1/aggTrades"
+        data = await fetch_json(url, params, stage="agg_trades")
     if not isinstance(data, list):
         return None
     async with _AGGTRADES_CACHE_LOCK:
-        _AGGTRADES_CACHE[cache_key] = (now, data)
+        _AGGTRADES_CACHE.set(cache_key, data, now=now)
     return data
 
 
+def get_memory_cache_stats() -> dict[str, dict[str, int]]:
+    """Entry counts, approximate bytes and hit/eviction counters of the REST caches."""
+    return {
+        "klines": _KLINES_CACHE.stats(),
+        "aggtrades": _AGGTRADES_CACHE.stats(),
+    }
+
+
 async def binance_watchdog() -> None:
     return None
@@ -0,0 +1,214 @@
+"""
+Shared in-memory cache primitive: LRU order, optional TTL and a byte budget.
+
+Entry sizes are approximations (approx_size samples long lists), good enough
+to keep a long-running process flat on a small container without walking
+every object on each write. Counters are kept per cache and exposed through
+stats() for the periodic logs.
+"""
+
+from __future__ import annotations
+
+import os
+import sys
+import threading
+import time
+from collections import OrderedDict
+from dataclasses import dataclass
+from typing import Any, Callable, Generic, Hashable, Iterator, Optional, TypeVar
+
+K = TypeVar("K", bound=Hashable)
+V = TypeVar("V")
+
+_SAMPLE_ITEMS = 8
+
+
+def approx_size(value: Any, _depth: int = 0) -> int:
+    """Approximate deep size in bytes; long containers are extrapolated from a sample."""
+    size = sys.getsizeof(value)
+    if _depth > 4:
+        return size
+    if isinstance(value, (list, tuple, set, frozenset)) or hasattr(value, "maxlen"):
+        items = list(value) if not isinstance(value, (list, tuple)) else value
+        count = len(items)
+        if count == 0:
+            return size
+        if count <= _SAMPLE_ITEMS:
+            return size + sum(approx_size(item, _depth + 1) for item in items)
+        step = count // _SAMPLE_ITEMS
+        sample = [items[idx] for idx in range(0, count, step)][:_SAMPLE_ITEMS]
+        per_item = sum(approx_size(item, _depth + 1) for item in sample) / len(sample)
+        return size + int(per_item * count)
+    if isinstance(value, dict):
+        return size + sum(
+            approx_size(key, _depth + 1) + approx_size(item, _depth + 1) for key, item in value.items()
+        )
+    return size
+
+
+def env_bytes(name: str, default_mb: float) -> int:
+    """Byte budget from a *_MB environment variable."""
+    value = os.getenv(name)
+    try:
+        megabytes = float(value) if value is not None else default_mb
+    except ValueError:
+        megabytes = default_mb
+    return int(megabytes * 1024 * 1024)
+
+
+@dataclass
+class _Entry(Generic[V]):
+    value: V
+    size: int
+    stored_at: float
+
+
+class BoundedCache(Generic[K, V]):
+    """
+    Mapping with LRU eviction under max_bytes / max_entries and expiry after
+    ttl_sec since the entry was stored. 0 disables a limit.
+
+    get() counts hits and misses and refreshes LRU order; peek() does neither.
+    Values that are mutated in place must be re-measured with resize().
+    """
+
+    def __init__(
+        self,
+        name: str,
+        *,
+        max_bytes: int = 0,
+        max_entries: int = 0,
+        ttl_sec: float = 0.0,
+        sizeof: Callable[[Any], int] = approx_size,
+    ) -> None:
+        self.name = name
+        self.max_bytes = max(0, int(max_bytes))
+        self.max_entries = max(0, int(max_entries))
+        self.ttl_sec = max(0.0, float(ttl_sec))
+        self._sizeof = sizeof
+        self._data: OrderedDict[K, _Entry[V]] = OrderedDict()
+        self._lock = threading.RLock()
+        self.bytes = 0
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.expirations = 0
+        self._purged_at = 0.0
+
+    def _expired(self, entry: _Entry[V], now: float) -> bool:
+        return self.ttl_sec > 0 and now - entry.stored_at >= self.ttl_sec
+
+    def _remove(self, key: K) -> Optional[_Entry[V]]:
+        entry = self._data.pop(key, None)
+        if entry is not None:
+            self.bytes -= entry.size
+        return entry
+
+    def _enforce(self, keep: Optional[K] = None) -> None:
+        while self._data and (
+            (self.max_bytes and self.bytes > self.max_bytes)
+            or (self.max_entries and len(self._data) > self.max_entries)
+        ):
+            oldest = next(iter(self._data))
+            if oldest == keep:
+                if len(self._data) == 1:
+                    break
+                self._data.move_to_end(oldest)
+                continue
+            self._remove(oldest)
+            self.evictions += 1
+
+    def purge_expired(self, now: Optional[float] = None) -> int:
+        """Drop every expired entry, including ones nobody reads any more."""
+        if self.ttl_sec <= 0:
+            return 0
+        now = time.time() if now is None else now
+        with self._lock:
+            self._purged_at = now
+            stale = [key for key, entry in self._data.items() if self._expired(entry, now)]
+            for key in stale:
+                self._remove(key)
+            self.expirations += len(stale)
+            return len(stale)
+
+    def get(self, key: K, default: Optional[V] = None, *, now: Optional[float] = None) -> Optional[V]:
+        with self._lock:
+            entry = self._data.get(key)
+            if entry is not None and self._expired(entry, time.time() if now is None else now):
+                self._remove(key)
+                self.expirations += 1
+                entry = None
+            if entry is None:
+                self.misses += 1
+                return default
+            self._data.move_to_end(key)
+            self.hits += 1
+            return entry.value
+
+    def peek(self, key: K, default: Optional[V] = None) -> Optional[V]:
+        with self._lock:
+            entry = self._data.get(key)
+            return entry.value if entry is not None else default
+
+    def stored_at(self, key: K) -> float:
+        with self._lock:
+            entry = self._data.get(key)
+            return entry.stored_at if entry is not None else 0.0
+
+    def set(self, key: K, value: V, *, now: Optional[float] = None, size: Optional[int] = None) -> None:
+        with self._lock:
+            now = time.time() if now is None else now
+            self._remove(key)
+            entry_size = self._sizeof(value) if size is None else int(size)
+            self._data[key] = _Entry(value, entry_size, now)
+            self.bytes += entry_size
+            self._enforce(keep=key)
+            # writes also sweep expired entries, at most every few minutes
+            if self.ttl_sec > 0 and now - self._purged_at >= min(self.ttl_sec, 300.0):
+                self.purge_expired(now)
+
+    def resize(self, key: K, *, now: Optional[float] = None, size: Optional[int] = None) -> None:
+        """Re-measure an entry after in-place changes; now= also restarts its TTL."""
+        with self._lock:
+            entry = self._data.get(key)
+            if entry is None:
+                return
+            new_size = self._sizeof(entry.value) if size is None else int(size)
+            self.bytes += new_size - entry.size
+            entry.size = new_size
+            if now is not None:
+                entry.stored_at = now
+            self._data.move_to_end(key)
+            self._enforce(keep=key)
+
+    def pop(self, key: K, default: Optional[V] = None) -> Optional[V]:
+        with self._lock:
+            entry = self._remove(key)
+            return entry.value if entry is not None else default
+
+    def clear(self) -> None:
+        with self._lock:
+            self._data.clear()
+            self.bytes = 0
+
+    def __contains__(self, key: object) -> bool:
+        with self._lock:
+            return key in self._data
+
+    def __len__(self) -> int:
+        return len(self._data)
+
+    def keys(self) -> Iterator[K]:
+        with self._lock:
+            return iter(list(self._data.keys()))
+
+    def stats(self) -> dict[str, int]:
+        return {
+            "entries": len(self._data),
+            "bytes": self.bytes,
+            "max_bytes": self.max_bytes,
+            "hits": self.hits,
+            "misses": self.misses,
+            "evictions": self.evictions,
+            "expirations": self.expirations,
+        }
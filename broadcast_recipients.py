@@ -0,0 +1,445 @@
+"""
+Bulk eligibility for AI signal broadcasts.
+
+send_signal_to_all used to call is_user_locked, get_user_pref, can_send,
+get_user_lang, is_sub_active, ensure_trial_defaults and try_consume_trial for
+every recipient. resolve_ai_recipients() reads prefs, languages and dedup
+stamps for the whole list with one set-based query per table (per chunk of
+RECIPIENTS_CHUNK ids), applies the same rules in memory and writes dedup
+stamps, trial defaults/consumption and paywall timestamps back in the same
+BEGIN IMMEDIATE transaction, so it stays atomic like can_send().
+
+resolve_pumpdump_recipients() does the same for pump/dump broadcasts (daily
+limit, lock, global + per-symbol cooldowns, subscription, pump trial and
+paywall cooldown), and record_pumpdump_deliveries() writes the per-send
+bookkeeping (toggle state, daily counter) for a whole broadcast at once.
+resolve_signal_event_recipients() is the read-only check used by the
+activation / POI / progress follow-ups of signals already delivered.
+"""
+
+from __future__ import annotations
+
+import os
+import time
+from dataclasses import dataclass
+from typing import Iterable, Optional
+
+from db import TRIAL_AI_LIMIT, TRIAL_PUMP_LIMIT
+from db_pool import DB_POOL
+
+RECIPIENTS_CHUNK = int(os.getenv("RECIPIENTS_CHUNK", "500"))
+
+STATUS_SEND = "send"
+STATUS_PAYWALL = "paywall"
+STATUS_INVALID = "invalid"
+STATUS_LOCKED = "locked"
+STATUS_NOTIFICATIONS_OFF = "notifications_off"
+STATUS_BUCKET_OFF = "bucket_off"
+STATUS_DEDUP = "dedup"
+STATUS_TRIAL_EXHAUSTED = "trial_exhausted"
+STATUS_DAILY_LIMIT = "daily_limit"
+STATUS_NO_SUBSCRIPTION = "no_subscription"
+
+# defaults written by ensure_trial_defaults()
+_TRIAL_DEFAULTS = {
+    "trial_ai_left": TRIAL_AI_LIMIT,
+    "trial_pump_left": TRIAL_PUMP_LIMIT,
+    "user_locked": 0,
+    "notif_regular_enabled": 1,
+    "notif_elite_enabled": 1,
+    "sound_signal_entry_enabled": 1,
+}
+
+
+@dataclass
+class RecipientDecision:
+    chat_id: int
+    status: str
+    language: Optional[str] = None
+    full_access: bool = False
+    # trial uses left after this signal, None when no trial was consumed
+    trial_left: Optional[int] = None
+    sound_entry_enabled: bool = True
+
+
+def _chunks(items: list[int], size: int) -> Iterable[list[int]]:
+    size = max(1, size)
+    for start in range(0, len(items), size):
+        yield items[start : start + size]
+
+
+def _placeholders(count: int) -> str:
+    return ",".join("?" * count)
+
+
+def _load_prefs(conn, chat_ids: list[int], keys: list[str]) -> dict[int, dict[str, int]]:
+    prefs: dict[int, dict[str, int]] = {}
+    for chunk in _chunks(chat_ids, RECIPIENTS_CHUNK):
+        cur = conn.execute(
+            f"""
+            SELECT user_id, key, value FROM user_prefs
+            WHERE user_id IN ({_placeholders(len(chunk))}) AND key IN ({_placeholders(len(keys))})
+            """,
+            (*chunk, *keys),
+        )
+        for user_id, key, value in cur.fetchall():
+            prefs.setdefault(int(user_id), {})[key] = int(value)
+    return prefs
+
+
+def _load_languages(conn, chat_ids: list[int]) -> dict[int, Optional[str]]:
+    languages: dict[int, Optional[str]] = {}
+    for chunk in _chunks(chat_ids, RECIPIENTS_CHUNK):
+        cur = conn.execute(
+            f"SELECT chat_id, language FROM users WHERE chat_id IN ({_placeholders(len(chunk))})",
+            chunk,
+        )
+        for chat_id, language in cur.fetchall():
+            languages[int(chat_id)] = language
+    return languages
+
+
+def _load_dedup(conn, chat_ids: list[int], feature: str, dedup_key: str) -> dict[int, int]:
+    sent: dict[int, int] = {}
+    for chunk in _chunks(chat_ids, RECIPIENTS_CHUNK):
+        cur = conn.execute(
+            f"""
+            SELECT chat_id, sent_at FROM alert_dedup
+            WHERE feature=? AND dedup_key=? AND chat_id IN ({_placeholders(len(chunk))})
+            """,
+            (feature, dedup_key, *chunk),
+        )
+        for chat_id, sent_at in cur.fetchall():
+            sent[int(chat_id)] = int(sent_at)
+    return sent
+
+
+def resolve_ai_recipients(
+    chat_ids: list[int],
+    *,
+    admin_chat_id: Optional[int],
+    full_access_ids: set[int],
+    bucket_pref_key: str,
+    dedup_feature: str,
+    dedup_key: str,
+    cooldown_sec: Optional[int],
+    check_access: bool,
+    paywall_cooldown_sec: int,
+    now: Optional[int] = None,
+) -> list[RecipientDecision]:
+    """
+    Same decisions as the old per-recipient chain, in recipient order.
+    cooldown_sec=None skips the dedup check (test broadcasts, forced sends);
+    check_access=False skips subscription/trial handling (test broadcasts).
+    """
+    now = int(time.time()) if now is None else int(now)
+    feature = str(dedup_feature or "").strip().lower()
+    key = str(dedup_key or "").strip().upper()
+    valid_ids = [chat_id for chat_id in chat_ids if chat_id > 0]
+    pref_keys = sorted(
+        {
+            "ai_signals_enabled",
+            bucket_pref_key,
+            "sub_until",
+            "last_paywall_ts_ai",
+            *_TRIAL_DEFAULTS,
+        }
+    )
+
+    decisions: list[RecipientDecision] = []
+    dedup_writes: list[tuple] = []
+    pref_writes: list[tuple] = []
+    default_inserts: list[tuple] = []
+
+    conn = DB_POOL.writer()
+    try:
+        conn.execute("BEGIN IMMEDIATE")
+        prefs = _load_prefs(conn, valid_ids, pref_keys) if valid_ids else {}
+        languages = _load_languages(conn, valid_ids) if valid_ids else {}
+        sent_at = (
+            _load_dedup(conn, valid_ids, feature, key)
+            if valid_ids and cooldown_sec is not None and feature and key
+            else {}
+        )
+
+        for chat_id in chat_ids:
+            if chat_id <= 0:
+                decisions.append(RecipientDecision(chat_id, STATUS_INVALID))
+                continue
+            user_prefs = prefs.get(chat_id, {})
+            decision = RecipientDecision(
+                chat_id,
+                STATUS_SEND,
+                language=languages.get(chat_id),
+                full_access=chat_id in full_access_ids,
+                sound_entry_enabled=bool(user_prefs.get("sound_signal_entry_enabled", 1)),
+            )
+            decisions.append(decision)
+            if user_prefs.get("user_locked", 0) == 1:
+                decision.status = STATUS_LOCKED
+                continue
+            if chat_id != admin_chat_id:
+                if not user_prefs.get("ai_signals_enabled", 0):
+                    decision.status = STATUS_NOTIFICATIONS_OFF
+                    continue
+                if not user_prefs.get(bucket_pref_key, 1):
+                    decision.status = STATUS_BUCKET_OFF
+                    continue
+            if cooldown_sec is not None:
+                if not feature or not key:
+                    decision.status = STATUS_DEDUP
+                    continue
+                last = sent_at.get(chat_id)
+                if last is not None and now - last < cooldown_sec:
+                    decision.status = STATUS_DEDUP
+                    continue
+                dedup_writes.append((chat_id, feature, key, now))
+            if not check_access or decision.full_access or now < user_prefs.get("sub_until", 0):
+                decision.full_access = True
+                continue
+
+            for pref_key, default in _TRIAL_DEFAULTS.items():
+                if pref_key not in user_prefs:
+                    default_inserts.append((chat_id, pref_key, default, now))
+            trial_left = user_prefs.get("trial_ai_left", TRIAL_AI_LIMIT)
+            if trial_left >= 1:
+                decision.trial_left = trial_left - 1
+                pref_writes.append((chat_id, "trial_ai_left", trial_left - 1, now))
+                continue
+            last_paywall = user_prefs.get("last_paywall_ts_ai", 0)
+            if last_paywall and now - last_paywall < paywall_cooldown_sec:
+                decision.status = STATUS_TRIAL_EXHAUSTED
+                continue
+            decision.status = STATUS_PAYWALL
+            pref_writes.append((chat_id, "last_paywall_ts_ai", now, now))
+
+        _write_decisions(conn, default_inserts, pref_writes, dedup_writes)
+        conn.commit()
+    finally:
+        conn.close()
+    return decisions
+
+
+def _write_decisions(conn, default_inserts: list[tuple], pref_writes: list[tuple], dedup_writes: list[tuple]) -> None:
+    if default_inserts:
+        conn.executemany(
+            """
+            INSERT INTO user_prefs (user_id, key, value, updated_at)
+            VALUES (?, ?, ?, ?)
+            ON CONFLICT(user_id, key) DO NOTHING
+            """,
+            default_inserts,
+        )
+    if pref_writes:
+        conn.executemany(
+            """
+            INSERT INTO user_prefs (user_id, key, value, updated_at)
+            VALUES (?, ?, ?, ?)
+            ON CONFLICT(user_id, key)
+            DO UPDATE SET value = excluded.value, updated_at = excluded.updated_at
+            """,
+            pref_writes,
+        )
+    if dedup_writes:
+        conn.executemany(
+            """
+            INSERT INTO alert_dedup(chat_id, feature, dedup_key, sent_at)
+            VALUES(?,?,?,?)
+            ON CONFLICT(chat_id, feature, dedup_key)
+            DO UPDATE SET sent_at=excluded.sent_at
+            """,
+            dedup_writes,
+        )
+
+
+def _load_daily_counts(conn, chat_ids: list[int], date_key: str, feature: str) -> dict[int, int]:
+    counts: dict[int, int] = {}
+    for chunk in _chunks(chat_ids, RECIPIENTS_CHUNK):
+        cur = conn.execute(
+            f"""
+            SELECT chat_id, count FROM pumpdump_daily_counts
+            WHERE date=? AND feature=? AND chat_id IN ({_placeholders(len(chunk))})
+            """,
+            (date_key, feature, *chunk),
+        )
+        for chat_id, count in cur.fetchall():
+            counts[int(chat_id)] = int(count)
+    return counts
+
+
+def resolve_pumpdump_recipients(
+    chat_ids: list[int],
+    *,
+    full_access_ids: set[int],
+    date_key: str,
+    daily_limit: Optional[int],
+    cooldowns: Optional[list[tuple[str, int]]],
+    paywall_cooldown_sec: int,
+    now: Optional[int] = None,
+) -> list[RecipientDecision]:
+    """
+    Same decisions as the old per-recipient pump/dump chain, in recipient order.
+    daily_limit=None skips the daily limit; cooldowns is a list of
+    (dedup_key, cooldown_sec) checked in order, None skips them. As with
+    can_send(), a passed cooldown is stamped even if a later one blocks.
+    """
+    now = int(time.time()) if now is None else int(now)
+    feature = "pumpdump"
+    cooldowns = [(str(key).strip().upper(), int(sec)) for key, sec in (cooldowns or [])]
+    valid_ids = [chat_id for chat_id in chat_ids if chat_id > 0]
+    pref_keys = sorted({"sub_until", "last_paywall_ts_pump", *_TRIAL_DEFAULTS})
+
+    decisions: list[RecipientDecision] = []
+    dedup_writes: list[tuple] = []
+    pref_writes: list[tuple] = []
+    default_inserts: list[tuple] = []
+
+    conn = DB_POOL.writer()
+    try:
+        conn.execute("BEGIN IMMEDIATE")
+        prefs = _load_prefs(conn, valid_ids, pref_keys) if valid_ids else {}
+        languages = _load_languages(conn, valid_ids) if valid_ids else {}
+        counts = (
+            _load_daily_counts(conn, valid_ids, date_key, feature)
+            if valid_ids and daily_limit is not None
+            else {}
+        )
+        sent_at = {key: _load_dedup(conn, valid_ids, feature, key) if valid_ids else {} for key, _ in cooldowns}
+
+        for chat_id in chat_ids:
+            if chat_id <= 0:
+                decisions.append(RecipientDecision(chat_id, STATUS_INVALID))
+                continue
+            user_prefs = prefs.get(chat_id, {})
+            decision = RecipientDecision(
+                chat_id,
+                STATUS_SEND,
+                language=languages.get(chat_id),
+                full_access=chat_id in full_access_ids,
+            )
+            decisions.append(decision)
+            if not decision.full_access:
+                if daily_limit is not None and counts.get(chat_id, 0) >= daily_limit:
+                    decision.status = STATUS_DAILY_LIMIT
+                    continue
+                if user_prefs.get("user_locked", 0) == 1:
+                    decision.status = STATUS_LOCKED
+                    continue
+            blocked = False
+            for key, cooldown_sec in cooldowns:
+                last = sent_at[key].get(chat_id)
+                if last is not None and now - last < cooldown_sec:
+                    blocked = True
+                    break
+                dedup_writes.append((chat_id, feature, key, now))
+            if blocked:
+                decision.status = STATUS_DEDUP
+                continue
+            if decision.full_access or now < user_prefs.get("sub_until", 0):
+                decision.full_access = True
+                continue
+
+            for pref_key, default in _TRIAL_DEFAULTS.items():
+                if pref_key not in user_prefs:
+                    default_inserts.append((chat_id, pref_key, default, now))
+            trial_left = user_prefs.get("trial_pump_left", TRIAL_PUMP_LIMIT)
+            if trial_left >= 1:
+                decision.trial_left = trial_left - 1
+                pref_writes.append((chat_id, "trial_pump_left", trial_left - 1, now))
+                continue
+            last_paywall = user_prefs.get("last_paywall_ts_pump", 0)
+            if last_paywall and now - last_paywall < paywall_cooldown_sec:
+                decision.status = STATUS_TRIAL_EXHAUSTED
+                continue
+            decision.status = STATUS_PAYWALL
+            pref_writes.append((chat_id, "last_paywall_ts_pump", now, now))
+
+        _write_decisions(conn, default_inserts, pref_writes, dedup_writes)
+        conn.commit()
+    finally:
+        conn.close()
+    return decisions
+
+
+def record_pumpdump_deliveries(
+    states: list[tuple[str, str]],
+    delivered_ids: list[int],
+    date_key: str,
+    now: Optional[int] = None,
+) -> None:
+    """Persist toggle states (state_kv key, json) and bump daily counters in one commit."""
+    if not states and not delivered_ids:
+        return
+    now = int(time.time()) if now is None else int(now)
+    conn = DB_POOL.writer()
+    try:
+        conn.execute("BEGIN IMMEDIATE")
+        if states:
+            conn.executemany(
+                """
+                INSERT INTO state_kv (key, value, updated_at)
+                VALUES (?, ?, ?)
+                ON CONFLICT(key)
+                DO UPDATE SET value = excluded.value, updated_at = excluded.updated_at
+                """,
+                [(key, value, now) for key, value in states],
+            )
+        if delivered_ids:
+            conn.executemany(
+                """
+                INSERT INTO pumpdump_daily_counts (chat_id, date, feature, count)
+                VALUES (?, ?, ?, 1)
+                ON CONFLICT(chat_id, date, feature)
+                DO UPDATE SET count = count + 1
+                """,
+                [(chat_id, date_key, "pumpdump") for chat_id in delivered_ids],
+            )
+        conn.commit()
+    finally:
+        conn.close()
+
+
+def resolve_signal_event_recipients(
+    chat_ids: list[int],
+    *,
+    feature: str = "ai_signals",
+    now: Optional[int] = None,
+) -> list[RecipientDecision]:
+    """
+    Follow-up eligibility in recipient order: not locked, an active
+    subscription and `{feature}_enabled` on. Nothing is written.
+    """
+    now = int(time.time()) if now is None else int(now)
+    valid_ids = [chat_id for chat_id in chat_ids if chat_id > 0]
+    notify_key = f"{feature}_enabled"
+    decisions: list[RecipientDecision] = []
+    conn = DB_POOL.reader()
+    try:
+        prefs = (
+            _load_prefs(conn, valid_ids, sorted({"user_locked", "sub_until", notify_key, "sound_signal_entry_enabled"}))
+            if valid_ids
+            else {}
+        )
+        languages = _load_languages(conn, valid_ids) if valid_ids else {}
+    finally:
+        conn.close()
+    for chat_id in chat_ids:
+        if chat_id <= 0:
+            decisions.append(RecipientDecision(chat_id, STATUS_INVALID))
+            continue
+        user_prefs = prefs.get(chat_id, {})
+        decision = RecipientDecision(
+            chat_id,
+            STATUS_SEND,
+            language=languages.get(chat_id),
+            full_access=True,
+            sound_entry_enabled=bool(user_prefs.get("sound_signal_entry_enabled", 1)),
+        )
+        decisions.append(decision)
+        if user_prefs.get("user_locked", 0) == 1:
+            decision.status = STATUS_LOCKED
+        elif now >= user_prefs.get("sub_until", 0):
+            decision.status = STATUS_NO_SUBSCRIPTION
+        elif not user_prefs.get(notify_key, 0):
+            decision.status = STATUS_NOTIFICATIONS_OFF
+    return decisions
@@ -1,12 +1,15 @@
 import asyncio
+import logging
 import os
 import time
-from typing import Any, Dict, List, Optional
+from typing import Any, Dict, List, Optional, Sequence
 
-from ai_types import Candle
-from binance_rest import get_klines
-from trading_core import compute_ema
-from utils_klines import normalize_klines
+from ai_types import CandleFrame
+from binance_rest import get_klines_bundle
+import indicators_vectorized
+from market_regime import compute_market_regime, normalize_market_bundle
+from trading_core import _use_vectorized, compute_ema
+from utils_klines import klines_to_frame
 
 BTC_REGIME_RISK_ON = "RISK_ON"
 BTC_REGIME_RISK_OFF = "RISK_OFF"
@@ -26,11 +29,22 @@ BTC_RISKOFF_ATR15M_PCT = float(os.getenv("BTC_RISKOFF_ATR15M_PCT", "0.9") or "0.
 BTC_RISKOFF_ATR15M_PCT_ON = float(os.getenv("BTC_RISKOFF_ATR15M_PCT_ON", str(BTC_RISKOFF_ATR15M_PCT)) or str(BTC_RISKOFF_ATR15M_PCT))
 BTC_RISKOFF_ATR15M_PCT_OFF = float(os.getenv("BTC_RISKOFF_ATR15M_PCT_OFF", "0.75") or "0.75")
 BTC_SQUEEZE_CLOSE_NEAR_EXTREME_PCT = float(os.getenv("BTC_SQUEEZE_CLOSE_NEAR_EXTREME_PCT", "0.15") or "0.15")
-_BTC_CONTEXT_CACHE: Dict[str, Any] = {"expires_at": 0.0, "value": None}
+_BTC_CONTEXT_STALE_SEC = int(os.getenv("BTC_CONTEXT_STALE_SEC", "300") or "300")
+_BTC_CONTEXT_CLOSE_MS = 15 * 60 * 1000
+# one fetch per timeframe covers both analyses: 1h 220 for EMA200, 15m 160 for market_regime
+_BTC_CONTEXT_LIMITS = {"1d": 60, "4h": 120, "1h": 220, "15m": 160}
+_BTC_REGIME_15M_LIMIT = 120
+_BTC_CONTEXT_CACHE: Dict[str, Any] = {"updated_at": 0.0, "close_ms": 0, "value": None}
 _BTC_CONTEXT_LOCK = asyncio.Lock()
+# background stale-while-revalidate refresh; the loop only keeps weak references to tasks
+_BTC_REFRESH_TASK: Optional["asyncio.Task[Dict[str, Any]]"] = None
 
+logger = logging.getLogger(__name__)
 
-def _ema_series(closes: List[float], period: int) -> List[float]:
+
+def _ema_series(closes: Sequence[float], period: int) -> List[float]:
+    if _use_vectorized():
+        return indicators_vectorized.ema_series(closes, period)
     if len(closes) < period:
         return []
     k = 2 / (period + 1)
@@ -42,7 +56,7 @@ def _ema_series(closes: List[float], period: int) -> List[float]:
     return out
 
 
-def _slope_pct(closes: List[float], lookback: int = 24) -> float:
+def _slope_pct(closes: Sequence[float], lookback: int = 24) -> float:
     if len(closes) < lookback + 1:
         return 0.0
     start = closes[-lookback - 1]
@@ -52,32 +66,37 @@ def _slope_pct(closes: List[float], lookback: int = 24) -> float:
     return (end - start) / start * 100.0
 
 
-def _atr_percent(candles: List[Candle], period: int = 14, sample: int = 24) -> float:
+def _atr_percent(candles: CandleFrame, period: int = 14, sample: int = 24) -> float:
     if len(candles) < period + sample + 2:
         return 0.0
+    highs, lows, closes = candles.high, candles.low, candles.close
     true_ranges: List[float] = []
-    for idx in range(1, len(candles)):
-        c = candles[idx]
-        prev_close = candles[idx - 1].close
-        tr = max(c.high - c.low, abs(c.high - prev_close), abs(c.low - prev_close))
+    for idx in range(1, len(closes)):
+        high = highs[idx]
+        low = lows[idx]
+        prev_close = closes[idx - 1]
+        tr = max(high - low, abs(high - prev_close), abs(low - prev_close))
         true_ranges.append(tr)
     if len(true_ranges) < period:
         return 0.0
-    atr_values: List[float] = []
-    for idx in range(period - 1, len(true_ranges)):
-        window = true_ranges[idx - period + 1 : idx + 1]
-        atr_values.append(sum(window) / period)
+    if _use_vectorized():
+        atr_values = indicators_vectorized.rolling_mean(true_ranges, period)
+    else:
+        atr_values = []
+        for idx in range(period - 1, len(true_ranges)):
+            window = true_ranges[idx - period + 1 : idx + 1]
+            atr_values.append(sum(window) / period)
     atr_slice = atr_values[-sample:] if len(atr_values) >= sample else atr_values
     if not atr_slice:
         return 0.0
-    close_ref = candles[-1].close
+    close_ref = closes[-1]
     if close_ref <= 0:
         return 0.0
     return (sum(atr_slice) / len(atr_slice)) / close_ref * 100.0
 
 
-def _count_ema50_crossovers(candles_15m: List[Candle], sample: int = 48) -> int:
-    closes = [c.close for c in candles_15m]
+def _count_ema50_crossovers(candles_15m: CandleFrame, sample: int = 48) -> int:
+    closes = candles_15m.close
     ema50 = _ema_series(closes, 50)
     if not ema50:
         return 0
@@ -98,8 +117,8 @@ def _count_ema50_crossovers(candles_15m: List[Candle], sample: int = 48) -> int:
     return crosses
 
 
-def _count_alternating_returns(candles_15m: List[Candle], sample: int = 32) -> int:
-    closes = [c.close for c in candles_15m]
+def _count_alternating_returns(candles_15m: CandleFrame, sample: int = 32) -> int:
+    closes = candles_15m.close
     if len(closes) < sample + 1:
         sample = max(4, len(closes) - 1)
     start = max(1, len(closes) - sample)
@@ -116,27 +135,21 @@ def _count_alternating_returns(candles_15m: List[Candle], sample: int = 32) -> i
     return alternations
 
 
-async def _fetch_btc_context_raw(prev_regime: str = BTC_REGIME_CHOP) -> Dict[str, Any]:
-    symbol = "BTCUSDT"
-    k1h_raw, k15m_raw = await asyncio.gather(
-        get_klines(symbol, "1h", 220),
-        get_klines(symbol, "15m", 120),
-        return_exceptions=True,
-    )
+def _btc_regime_from_klines(k1h_raw: Any, k15m_raw: Any, prev_regime: str = BTC_REGIME_CHOP) -> Dict[str, Any]:
     if isinstance(k1h_raw, BaseException) or isinstance(k15m_raw, BaseException):
         return {
             "btc_regime": BTC_REGIME_CHOP,
             "reasons": ["btc_data_fetch_error"],
         }
-    candles_1h = normalize_klines(k1h_raw if isinstance(k1h_raw, list) else [])
-    candles_15m = normalize_klines(k15m_raw if isinstance(k15m_raw, list) else [])
+    candles_1h = klines_to_frame(k1h_raw if isinstance(k1h_raw, list) else [])
+    candles_15m = klines_to_frame(k15m_raw if isinstance(k15m_raw, list) else [])
     if len(candles_1h) < 200 or len(candles_15m) < 100:
         return {
             "btc_regime": BTC_REGIME_CHOP,
             "reasons": ["btc_data_insufficient"],
         }
 
-    closes_1h = [c.close for c in candles_1h]
+    closes_1h = candles_1h.close
     ema50 = compute_ema(closes_1h, 50)
     ema200 = compute_ema(closes_1h, 200)
     slope = _slope_pct(closes_1h, lookback=24)
@@ -144,7 +157,7 @@ async def _fetch_btc_context_raw(prev_regime: str = BTC_REGIME_CHOP) -> Dict[str
     atr_pct_15m = _atr_percent(candles_15m, period=14, sample=24)
     crossovers = _count_ema50_crossovers(candles_15m, sample=48)
     alternations = _count_alternating_returns(candles_15m, sample=32)
-    closes_15m = [c.close for c in candles_15m]
+    closes_15m = candles_15m.close
     impulse = 0.0
     if len(closes_15m) >= 4:
         impulse_base = closes_15m[-4]
@@ -152,7 +165,7 @@ async def _fetch_btc_context_raw(prev_regime: str = BTC_REGIME_CHOP) -> Dict[str
             impulse = (closes_15m[-1] - impulse_base) / impulse_base * 100.0
 
     vol_z = 0.0
-    volumes = [c.volume for c in candles_15m]
+    volumes = candles_15m.volume
     baseline = volumes[-41:-1] if len(volumes) >= 41 else []
     if baseline:
         mean_volume = sum(baseline) / len(baseline)
@@ -228,34 +241,102 @@ async def _fetch_btc_context_raw(prev_regime: str = BTC_REGIME_CHOP) -> Dict[str
     }
 
 
-async def get_btc_regime() -> Dict[str, Any]:
-    now = time.time()
-    cached = _BTC_CONTEXT_CACHE.get("value")
-    if cached and now < float(_BTC_CONTEXT_CACHE.get("expires_at", 0.0)):
-        return dict(cached)
+def _apply_forced_regime(fresh: Dict[str, Any]) -> Dict[str, Any]:
+    forced = _SOFT_BTC_FORCE_REGIME
+    can_force = _SOFT_BTC_ALLOW_FORCE or _IS_DEBUG_ENV
+    if forced and not can_force:
+        reasons = list(fresh.get("reasons") or [])
+        reasons.append("forced_regime_ignored_non_debug")
+        fresh["reasons"] = reasons
+    elif forced in {BTC_REGIME_RISK_ON, BTC_REGIME_RISK_OFF, BTC_REGIME_CHOP, BTC_REGIME_SQUEEZE}:
+        reasons = list(fresh.get("reasons") or [])
+        reasons.append(f"forced_regime={forced}")
+        fresh["btc_regime"] = forced
+        fresh["btc_direction"] = "NEUTRAL"
+        fresh["btc_trend"] = forced == BTC_REGIME_RISK_ON
+        fresh["reasons"] = reasons
+    return fresh
+
+
+def _last_close_ms(now: float) -> int:
+    return int(now * 1000) // _BTC_CONTEXT_CLOSE_MS * _BTC_CONTEXT_CLOSE_MS
 
+
+def _context_fresh(now: float) -> bool:
+    """Computed after the last 15m close and not older than SOFT_BTC_TTL_SEC."""
+    if _BTC_CONTEXT_CACHE.get("value") is None:
+        return False
+    if int(_BTC_CONTEXT_CACHE.get("close_ms", 0)) != _last_close_ms(now):
+        return False
+    return now - float(_BTC_CONTEXT_CACHE.get("updated_at", 0.0)) < max(5, _SOFT_BTC_TTL_SEC)
+
+
+async def _refresh_btc_context() -> Dict[str, Any]:
     async with _BTC_CONTEXT_LOCK:
         now = time.time()
-        cached = _BTC_CONTEXT_CACHE.get("value")
-        if cached and now < float(_BTC_CONTEXT_CACHE.get("expires_at", 0.0)):
-            return dict(cached)
-
-        prev_regime = str((cached or {}).get("btc_regime") or BTC_REGIME_CHOP).upper()
-        fresh = await _fetch_btc_context_raw(prev_regime=prev_regime)
-        forced = _SOFT_BTC_FORCE_REGIME
-        can_force = _SOFT_BTC_ALLOW_FORCE or _IS_DEBUG_ENV
-        if forced and not can_force:
-            reasons = list(fresh.get("reasons") or [])
-            reasons.append("forced_regime_ignored_non_debug")
-            fresh["reasons"] = reasons
-        elif forced in {BTC_REGIME_RISK_ON, BTC_REGIME_RISK_OFF, BTC_REGIME_CHOP, BTC_REGIME_SQUEEZE}:
-            reasons = list(fresh.get("reasons") or [])
-            reasons.append(f"forced_regime={forced}")
-            fresh["btc_regime"] = forced
-            fresh["btc_direction"] = "NEUTRAL"
-            fresh["btc_trend"] = forced == BTC_REGIME_RISK_ON
-            fresh["reasons"] = reasons
-
-        _BTC_CONTEXT_CACHE["value"] = fresh
-        _BTC_CONTEXT_CACHE["expires_at"] = time.time() + max(5, _SOFT_BTC_TTL_SEC)
-        return dict(fresh)
+        if _context_fresh(now):
+            return _BTC_CONTEXT_CACHE["value"]
+
+        try:
+            raw = await get_klines_bundle("BTCUSDT", dict(_BTC_CONTEXT_LIMITS), forming=False)
+        except Exception as exc:
+            raw = {tf: exc for tf in _BTC_CONTEXT_LIMITS}
+        k15m_raw = raw["15m"]
+        if isinstance(k15m_raw, list):
+            k15m_raw = k15m_raw[-_BTC_REGIME_15M_LIMIT:]
+
+        cached = _BTC_CONTEXT_CACHE.get("value") or {}
+        prev_regime = str((cached.get("btc_regime") or {}).get("btc_regime") or BTC_REGIME_CHOP).upper()
+        value = {
+            "btc_regime": _apply_forced_regime(_btc_regime_from_klines(raw["1h"], k15m_raw, prev_regime=prev_regime)),
+            "market_regime": compute_market_regime(normalize_market_bundle(raw)),
+        }
+        _BTC_CONTEXT_CACHE["value"] = value
+        _BTC_CONTEXT_CACHE["updated_at"] = time.time()
+        _BTC_CONTEXT_CACHE["close_ms"] = _last_close_ms(now)
+        return value
+
+
+def _on_background_refresh_done(task: "asyncio.Task[Dict[str, Any]]") -> None:
+    global _BTC_REFRESH_TASK
+    if _BTC_REFRESH_TASK is task:
+        _BTC_REFRESH_TASK = None
+    if task.cancelled():
+        return
+    exc = task.exception()
+    if exc is not None:
+        logger.warning("[btc_context] background refresh failed: %r", exc, exc_info=exc)
+
+
+def _start_background_refresh() -> None:
+    global _BTC_REFRESH_TASK
+    if _BTC_CONTEXT_LOCK.locked() or (_BTC_REFRESH_TASK is not None and not _BTC_REFRESH_TASK.done()):
+        return
+    _BTC_REFRESH_TASK = asyncio.create_task(_refresh_btc_context())
+    _BTC_REFRESH_TASK.add_done_callback(_on_background_refresh_done)
+
+
+async def get_btc_market_context() -> Dict[str, Any]:
+    """
+    Shared BTC analysis: {"btc_regime": ..., "market_regime": ...}.
+
+    Both parts come from one BTCUSDT 1d/4h/1h/15m bundle and are recomputed
+    after each 15m close (or after SOFT_BTC_TTL_SEC inside a candle). One
+    refresh runs at a time; until BTC_CONTEXT_STALE_SEC has passed, callers
+    get the previous value while it runs. Treat the result as read-only.
+    """
+    now = time.time()
+    if _context_fresh(now):
+        return _BTC_CONTEXT_CACHE["value"]
+
+    cached = _BTC_CONTEXT_CACHE.get("value")
+    if cached is not None and now - float(_BTC_CONTEXT_CACHE.get("updated_at", 0.0)) < _BTC_CONTEXT_STALE_SEC:
+        _start_background_refresh()
+        return cached
+
+    return await _refresh_btc_context()
+
+
+async def get_btc_regime() -> Dict[str, Any]:
+    context = await get_btc_market_context()
+    return dict(context["btc_regime"])
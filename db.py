@@ -5,7 +5,9 @@ from typing import Iterable, List, Optional, Tuple
 
 from cutoff_config import get_effective_cutoff_ts
 from db_path import get_db_path
+from db_pool import DB_POOL
 from history_status import get_signal_badge, get_signal_status_key
+from signal_flags import is_test_signal, legacy_test_filter_sql
 from symbol_cache import get_blocked_symbols
 from utils.safe_math import safe_div, safe_pct
 
@@ -14,16 +16,16 @@ TRIAL_PUMP_LIMIT = 7
 
 
 def get_conn() -> sqlite3.Connection:
-    conn = sqlite3.connect(get_db_path(), check_same_thread=False, timeout=5.0)
+    """Pooled writer connection (see db_pool); close() returns it to the pool."""
+    conn = DB_POOL.writer()
+    conn.row_factory = sqlite3.Row
+    return conn
+
+
+def get_read_conn() -> sqlite3.Connection:
+    """Pooled read-only connection for helpers that never write."""
+    conn = DB_POOL.reader()
     conn.row_factory = sqlite3.Row
-    try:
-        conn.execute("PRAGMA journal_mode=WAL")
-    except sqlite3.Error:
-        pass
-    try:
-        conn.execute("PRAGMA busy_timeout=3000")
-    except sqlite3.Error:
-        pass
     return conn
 
 
@@ -265,11 +267,196 @@ def init_db() -> None:
             """
         )
         _recalculate_tp_zone_archive(conn)
+        _init_signal_events_is_test(conn)
+        _init_signal_history(conn)
         conn.commit()
     finally:
         conn.close()
 
 
+def _init_signal_events_is_test(conn: sqlite3.Connection) -> None:
+    # Тестовые рассылки раньше отсекались LIKE '%test%' по reason_json/breakdown_json
+    # в каждом запросе; теперь флаг считается при вставке. Индекс служит маркером
+    # миграции: пока его нет, один раз досчитываем is_test для старых строк.
+    cur = conn.execute(
+        "SELECT 1 FROM sqlite_master WHERE type='index' AND name='idx_signal_events_test_ts'"
+    )
+    if cur.fetchone() is None:
+        # триггеры истории пересоздаются в _init_signal_history уже без LIKE
+        for trigger in ("trg_signal_history_insert", "trg_signal_history_update", "trg_signal_history_delete"):
+            conn.execute(f"DROP TRIGGER IF EXISTS {trigger}")
+        cur = conn.execute(
+            f"""
+            UPDATE signal_events SET is_test = 1
+            WHERE is_test = 0 AND {legacy_test_filter_sql(("reason_json", "breakdown_json"))}
+            """
+        )
+        print(f"[db] signal_events is_test backfilled rows={cur.rowcount or 0}")
+    conn.execute("CREATE INDEX IF NOT EXISTS idx_signal_events_test_ts ON signal_events(is_test, ts)")
+    conn.execute(
+        "CREATE INDEX IF NOT EXISTS idx_signal_events_test_module_ts ON signal_events(is_test, module, ts)"
+    )
+
+
+# Материализованная история: одна строка на рассылку (module, UPPER(symbol), ts)
+# вместо полного прохода по signal_events с NOT EXISTS на каждый запрос.
+# Поддерживается триггерами, поэтому insert_signal_event и все UPDATE статусов
+# обновляют её автоматически.
+SIGNAL_HISTORY_DUP_WINDOW_SEC = 24 * 60 * 60
+
+
+def _history_side_sql(prefix: str) -> str:
+    return f"CASE WHEN UPPER(TRIM(COALESCE({prefix}side, ''))) IN ('LONG', 'BUY') THEN 'LONG' ELSE 'SHORT' END"
+
+
+def _history_status_group_sql(prefix: str) -> str:
+    status = f"UPPER(TRIM(COALESCE(NULLIF({prefix}result, ''), {prefix}status, '')))"
+    return (
+        f"CASE WHEN {status} IN ('TP1', 'TP2', 'BE', 'TP') THEN 'tp' "
+        f"WHEN {status} = 'SL' THEN 'sl' "
+        f"WHEN {status} IN ('EXP', 'EXPIRED', 'NO_FILL', 'NF', 'NEUTRAL') THEN 'neutral' "
+        "ELSE 'in_progress' END"
+    )
+
+
+def _history_is_test_sql(prefix: str) -> str:
+    return f"CASE WHEN COALESCE({prefix}is_test, 0) != 0 THEN 1 ELSE 0 END"
+
+
+def _history_superseded_sql(table: str) -> str:
+    # та же логика, что и NOT EXISTS в get_signal_history: есть более новая
+    # рассылка по этому символу в пределах суток
+    return f"""
+        EXISTS (
+            SELECT 1 FROM signal_events newer
+            WHERE newer.module = {table}.module
+              AND UPPER(newer.symbol) = {table}.symbol_key
+              AND newer.ts > {table}.ts
+              AND newer.ts - {table}.ts < {SIGNAL_HISTORY_DUP_WINDOW_SEC}
+              AND newer.id > {table}.id
+        )
+    """
+
+
+def rebuild_signal_history(conn: sqlite3.Connection) -> int:
+    conn.execute("DELETE FROM signal_history")
+    conn.execute(
+        f"""
+        INSERT INTO signal_history (id, module, symbol_key, ts, side_label, status_group, is_test, superseded)
+        SELECT se.id, se.module, UPPER(se.symbol), se.ts,
+               {_history_side_sql("se.")}, {_history_status_group_sql("se.")}, {_history_is_test_sql("se.")}, 0
+        FROM signal_events se
+        JOIN (
+            SELECT MAX(id) AS id FROM signal_events GROUP BY module, UPPER(symbol), ts
+        ) rep ON rep.id = se.id
+        """
+    )
+    conn.execute(f"UPDATE signal_history SET superseded = {_history_superseded_sql('signal_history')}")
+    cur = conn.execute("SELECT COUNT(*) FROM signal_history")
+    return int(cur.fetchone()[0])
+
+
+def _init_signal_history(conn: sqlite3.Connection) -> None:
+    conn.execute(
+        """
+        CREATE INDEX IF NOT EXISTS idx_signal_events_module_usymbol_ts
+        ON signal_events(module, UPPER(symbol), ts)
+        """
+    )
+    cur = conn.execute("SELECT 1 FROM sqlite_master WHERE type='table' AND name='signal_history'")
+    created = cur.fetchone() is None
+    conn.execute(
+        """
+        CREATE TABLE IF NOT EXISTS signal_history (
+            id INTEGER PRIMARY KEY,
+            module TEXT NOT NULL,
+            symbol_key TEXT NOT NULL,
+            ts INTEGER NOT NULL,
+            side_label TEXT NOT NULL,
+            status_group TEXT NOT NULL,
+            is_test INTEGER NOT NULL DEFAULT 0,
+            superseded INTEGER NOT NULL DEFAULT 0,
+            UNIQUE (module, symbol_key, ts)
+        )
+        """
+    )
+    conn.execute(
+        "CREATE INDEX IF NOT EXISTS idx_signal_history_page ON signal_history(module, ts DESC, id DESC)"
+    )
+    conn.execute(
+        """
+        CREATE INDEX IF NOT EXISTS idx_signal_history_dedup
+        ON signal_history(module, symbol_key, side_label, status_group, ts, id)
+        """
+    )
+    new_side = _history_side_sql("NEW.")
+    new_group = _history_status_group_sql("NEW.")
+    new_test = _history_is_test_sql("NEW.")
+    conn.execute(
+        f"""
+        CREATE TRIGGER IF NOT EXISTS trg_signal_history_insert AFTER INSERT ON signal_events
+        BEGIN
+            INSERT INTO signal_history (id, module, symbol_key, ts, side_label, status_group, is_test, superseded)
+            VALUES (NEW.id, NEW.module, UPPER(NEW.symbol), NEW.ts, {new_side}, {new_group}, {new_test}, 0)
+            ON CONFLICT (module, symbol_key, ts) DO UPDATE SET
+                id = excluded.id,
+                side_label = excluded.side_label,
+                status_group = excluded.status_group,
+                is_test = excluded.is_test,
+                superseded = 0
+            WHERE excluded.id > signal_history.id;
+            UPDATE signal_history SET superseded = 1
+            WHERE module = NEW.module
+              AND symbol_key = UPPER(NEW.symbol)
+              AND ts < NEW.ts
+              AND ts > NEW.ts - {SIGNAL_HISTORY_DUP_WINDOW_SEC}
+              AND id < NEW.id;
+        END
+        """
+    )
+    conn.execute(
+        f"""
+        CREATE TRIGGER IF NOT EXISTS trg_signal_history_update
+        AFTER UPDATE OF status, result, side, is_test ON signal_events
+        BEGIN
+            UPDATE signal_history SET
+                side_label = {new_side},
+                status_group = {new_group},
+                is_test = {new_test}
+            WHERE id = NEW.id;
+        END
+        """
+    )
+    conn.execute(
+        f"""
+        CREATE TRIGGER IF NOT EXISTS trg_signal_history_delete AFTER DELETE ON signal_events
+        BEGIN
+            UPDATE signal_history SET (id, side_label, status_group, is_test) = (
+                SELECT se.id, {_history_side_sql("se.")}, {_history_status_group_sql("se.")}, {_history_is_test_sql("se.")}
+                FROM signal_events se
+                WHERE se.module = OLD.module AND UPPER(se.symbol) = UPPER(OLD.symbol) AND se.ts = OLD.ts
+                ORDER BY se.id DESC
+                LIMIT 1
+            )
+            WHERE id = OLD.id
+              AND EXISTS (
+                SELECT 1 FROM signal_events se
+                WHERE se.module = OLD.module AND UPPER(se.symbol) = UPPER(OLD.symbol) AND se.ts = OLD.ts
+              );
+            DELETE FROM signal_history WHERE id = OLD.id;
+            UPDATE signal_history SET superseded = {_history_superseded_sql("signal_history")}
+            WHERE module = OLD.module
+              AND symbol_key = UPPER(OLD.symbol)
+              AND ts <= OLD.ts
+              AND ts > OLD.ts - {SIGNAL_HISTORY_DUP_WINDOW_SEC};
+        END
+        """
+    )
+    if created:
+        rows = rebuild_signal_history(conn)
+        print(f"[db] signal_history backfilled rows={rows}")
+
+
 def ensure_ai_public_state(*, start_balance_usd: float, risk_pct: float, leverage: float) -> None:
     conn = get_conn()
     try:
@@ -308,7 +495,7 @@ def ensure_ai_public_state(*, start_balance_usd: float, risk_pct: float, leverag
 
 
 def get_ai_public_state() -> dict | None:
-    conn = get_conn()
+    conn = get_read_conn()
     try:
         cur = conn.execute("SELECT * FROM ai_public_state WHERE id = 1")
         row = cur.fetchone()
@@ -557,7 +744,7 @@ def reset_ai_public_balance_to_start() -> dict | None:
         conn.close()
 
 def get_user_pref(user_id: int, key: str, default: int = 0) -> int:
-    conn = get_conn()
+    conn = get_read_conn()
     try:
         cur = conn.execute(
             "SELECT value FROM user_prefs WHERE user_id = ? AND key = ?",
@@ -588,7 +775,7 @@ def set_user_pref(user_id: int, key: str, value: int) -> None:
 
 
 def list_user_ids_with_pref(key: str, value: int = 1) -> List[int]:
-    conn = get_conn()
+    conn = get_read_conn()
     try:
         cur = conn.execute(
             "SELECT user_id FROM user_prefs WHERE key = ? AND value = ?",
@@ -704,7 +891,7 @@ def delete_user(user_id: int) -> None:
 
 
 def get_state(key: str, default: Optional[str] = None) -> Optional[str]:
-    conn = get_conn()
+    conn = get_read_conn()
     try:
         cur = conn.execute("SELECT value FROM state_kv WHERE key = ?", (key,))
         row = cur.fetchone()
@@ -754,7 +941,21 @@ def set_last_pumpdump_signal(signal: dict) -> None:
     set_state("last_pumpdump_signal", json.dumps(signal, ensure_ascii=False))
 
 
+_KV_TABLE: dict[str, str] = {}
+
+
 def _get_kv_table(conn: sqlite3.Connection) -> str:
+    # the table never changes while the process runs; resolve it once per db
+    path = get_db_path()
+    cached = _KV_TABLE.get(path)
+    if cached:
+        return cached
+    table = _resolve_kv_table(conn)
+    _KV_TABLE[path] = table
+    return table
+
+
+def _resolve_kv_table(conn: sqlite3.Connection) -> str:
     cur = conn.execute(
         "SELECT name FROM sqlite_master WHERE type='table' AND name IN ('state_kv', 'kv_store')"
     )
@@ -777,7 +978,13 @@ def _get_kv_table(conn: sqlite3.Connection) -> str:
 
 
 def kv_get_int(key: str, default: int = 0, *, ttl_sec: Optional[int] = None) -> int:
-    conn = get_conn()
+    if get_db_path() not in _KV_TABLE:
+        conn = get_conn()
+        try:
+            _get_kv_table(conn)
+        finally:
+            conn.close()
+    conn = get_read_conn()
     try:
         table = _get_kv_table(conn)
         cur = conn.execute(f"SELECT value, updated_at FROM {table} WHERE key = ?", (key,))
@@ -918,7 +1125,7 @@ def insert_signal_event(
                 float(tp1),
                 float(tp2),
                 status,
-                1 if is_test else 0,
+                1 if is_test_signal(symbol, reason_json, breakdown_json) else 0,
                 tg_message_id,
                 reason_json,
                 breakdown_json,
@@ -1152,7 +1359,7 @@ def list_signal_events_by_identity(
     symbol: str,
     ts: int,
 ) -> List[sqlite3.Row]:
-    conn = get_conn()
+    conn = get_read_conn()
     try:
         cur = conn.execute(
             """
@@ -1204,9 +1411,9 @@ def get_signal_history(
 ) -> list[sqlite3.Row]:
     duplicate_window_sec = 24 * 60 * 60
     since_ts = _history_since_ts(time_window)
-    conn = get_conn()
+    conn = get_read_conn()
     try:
-        clauses = ["(is_test IS NULL OR is_test = 0)"]
+        clauses = ["is_test = 0"]
         params: list[object] = []
         if user_id is not None:
             clauses.append("user_id = ?")
@@ -1217,14 +1424,6 @@ def get_signal_history(
         if since_ts is not None:
             clauses.append("ts >= ?")
             params.append(int(since_ts))
-        clauses.append(
-            "NOT ("
-            "symbol LIKE 'TEST%' OR "
-            "LOWER(COALESCE(reason_json, '')) LIKE '%test%' OR "
-            "LOWER(COALESCE(reason_json, '')) LIKE '%тест%' OR "
-            "LOWER(COALESCE(breakdown_json, '')) LIKE '%test%' OR "
-            "LOWER(COALESCE(breakdown_json, '')) LIKE '%тест%')"
-        )
         _append_cutoff_filter(clauses, params, include_legacy=include_legacy)
         _append_blocked_symbols_filter(clauses, params)
         where_clause = " AND ".join(clauses)
@@ -1295,9 +1494,9 @@ def count_signal_history(
 ) -> int:
     duplicate_window_sec = 24 * 60 * 60
     since_ts = _history_since_ts(time_window)
-    conn = get_conn()
+    conn = get_read_conn()
     try:
-        clauses = ["(is_test IS NULL OR is_test = 0)"]
+        clauses = ["is_test = 0"]
         params: list[object] = []
         if user_id is not None:
             clauses.append("user_id = ?")
@@ -1311,14 +1510,6 @@ def count_signal_history(
         if min_score is not None:
             clauses.append("score >= ?")
             params.append(float(min_score))
-        clauses.append(
-            "NOT ("
-            "symbol LIKE 'TEST%' OR "
-            "LOWER(COALESCE(reason_json, '')) LIKE '%test%' OR "
-            "LOWER(COALESCE(reason_json, '')) LIKE '%тест%' OR "
-            "LOWER(COALESCE(breakdown_json, '')) LIKE '%test%' OR "
-            "LOWER(COALESCE(breakdown_json, '')) LIKE '%тест%')"
-        )
         _append_cutoff_filter(clauses, params, include_legacy=include_legacy)
         _append_blocked_symbols_filter(clauses, params)
         where_clause = " AND ".join(clauses)
@@ -1350,6 +1541,162 @@ def count_signal_history(
         conn.close()
 
 
+
+def _signal_history_where(
+    time_window: str,
+    *,
+    module: str,
+    include_legacy: bool,
+) -> tuple[str, list[object]]:
+    # дедуп как в _dedupe_signals: по (module, symbol, side, status_group) виден только самый новый
+    clauses = [
+        "h.module = ?",
+        "h.is_test = 0",
+        "h.superseded = 0",
+        """NOT EXISTS (
+            SELECT 1 FROM signal_history h2
+            WHERE h2.module = h.module
+              AND h2.symbol_key = h.symbol_key
+              AND h2.side_label = h.side_label
+              AND h2.status_group = h.status_group
+              AND h2.is_test = 0
+              AND h2.superseded = 0
+              AND (h2.ts > h.ts OR (h2.ts = h.ts AND h2.id > h.id))
+              AND h.symbol_key != ''
+        )""",
+    ]
+    params: list[object] = [str(module)]
+    since_ts = _history_since_ts(time_window)
+    if since_ts is not None:
+        clauses.append("h.ts >= ?")
+        params.append(int(since_ts))
+    _append_cutoff_filter(clauses, params, include_legacy=include_legacy, field_name="h.ts")
+    _append_blocked_symbols_filter(clauses, params)
+    return " AND ".join(clauses), params
+
+
+def list_signal_history_page(
+    time_window: str,
+    *,
+    module: str = "ai_signals",
+    include_legacy: bool = False,
+    limit: int = 12,
+    before: tuple[int, int] | None = None,
+    offset: int = 0,
+) -> list[sqlite3.Row]:
+    """
+    Deduplicated history, newest first. ``before`` is the (created_at, id) of
+    the last row of the previous page (keyset); ``offset`` is only used when
+    the caller has no cursor.
+    """
+    where_clause, params = _signal_history_where(time_window, module=module, include_legacy=include_legacy)
+    if before is not None:
+        where_clause += " AND (h.ts < ? OR (h.ts = ? AND h.id < ?))"
+        params.extend([int(before[0]), int(before[0]), int(before[1])])
+        offset = 0
+    conn = get_read_conn()
+    try:
+        cur = conn.execute(
+            f"""
+            SELECT
+                se.id,
+                se.symbol,
+                se.side,
+                CAST(ROUND(se.score) AS INTEGER) AS score,
+                COALESCE(se.result, se.status) AS outcome,
+                se.result,
+                se.status,
+                se.state,
+                se.poi_touched_at,
+                se.activated_at,
+                se.ttl_minutes,
+                se.ts AS created_at,
+                se.poi_low AS entry_low,
+                se.poi_high AS entry_high,
+                se.tp1,
+                se.tp2,
+                se.tp1_hit,
+                se.tp2_hit,
+                se.sl AS sl_price,
+                se.entry_price,
+                se.poi_low,
+                se.poi_high,
+                se.timeframe,
+                se.max_profit_pct,
+                se.be_level_pct,
+                se.be_triggered
+            FROM signal_history h
+            JOIN signal_events se ON se.id = h.id
+            WHERE {where_clause}
+            ORDER BY h.ts DESC, h.id DESC
+            LIMIT ? OFFSET ?
+            """,
+            [*params, int(limit), int(offset)],
+        )
+        return cur.fetchall()
+    finally:
+        conn.close()
+
+
+def list_signal_history_outcomes(
+    time_window: str,
+    *,
+    module: str = "ai_signals",
+    include_legacy: bool = False,
+    min_score: int = 80,
+) -> list[sqlite3.Row]:
+    """
+    Deduplicated history with score >= min_score grouped by the fields the
+    summary classifies on: one row per (result, status, state, tp1_hit,
+    tp2_hit) with its count and BE-level sum (8.0 when unset).
+    """
+    where_clause, params = _signal_history_where(time_window, module=module, include_legacy=include_legacy)
+    conn = get_read_conn()
+    try:
+        cur = conn.execute(
+            f"""
+            SELECT
+                se.result,
+                se.status,
+                se.state,
+                se.tp1_hit,
+                se.tp2_hit,
+                COUNT(*) AS count,
+                SUM(CASE WHEN COALESCE(se.be_level_pct, 0) > 0 THEN se.be_level_pct ELSE 8.0 END) AS be_level_sum
+            FROM signal_history h
+            JOIN signal_events se ON se.id = h.id
+            WHERE {where_clause} AND CAST(ROUND(se.score) AS INTEGER) >= ?
+            GROUP BY se.result, se.status, se.state, se.tp1_hit, se.tp2_hit
+            """,
+            [*params, int(min_score)],
+        )
+        return cur.fetchall()
+    finally:
+        conn.close()
+
+
+def count_signal_history_page(
+    time_window: str,
+    *,
+    module: str = "ai_signals",
+    include_legacy: bool = False,
+) -> int:
+    where_clause, params = _signal_history_where(time_window, module=module, include_legacy=include_legacy)
+    conn = get_read_conn()
+    try:
+        cur = conn.execute(
+            f"""
+            SELECT COUNT(*) FROM signal_history h
+            JOIN signal_events se ON se.id = h.id
+            WHERE {where_clause}
+            """,
+            params,
+        )
+        return int(cur.fetchone()[0])
+    finally:
+        conn.close()
+
+
 def get_history_winrate_summary(
     time_window: str,
     user_id: int | None = None,
@@ -1358,9 +1705,9 @@ def get_history_winrate_summary(
 ) -> dict[str, object]:
     duplicate_window_sec = 24 * 60 * 60
     since_ts = _history_since_ts(time_window)
-    conn = get_conn()
+    conn = get_read_conn()
     try:
-        clauses = ["(is_test IS NULL OR is_test = 0)"]
+        clauses = ["is_test = 0"]
         params: list[object] = []
         if user_id is not None:
             clauses.append("user_id = ?")
@@ -1371,14 +1718,6 @@ def get_history_winrate_summary(
         if since_ts is not None:
             clauses.append("ts >= ?")
             params.append(int(since_ts))
-        clauses.append(
-            "NOT ("
-            "symbol LIKE 'TEST%' OR "
-            "LOWER(COALESCE(reason_json, '')) LIKE '%test%' OR "
-            "LOWER(COALESCE(reason_json, '')) LIKE '%тест%' OR "
-            "LOWER(COALESCE(breakdown_json, '')) LIKE '%test%' OR "
-            "LOWER(COALESCE(breakdown_json, '')) LIKE '%тест%')"
-        )
         _append_cutoff_filter(clauses, params, include_legacy=include_legacy)
         _append_blocked_symbols_filter(clauses, params)
         where_clause = " AND ".join(clauses)
@@ -1582,9 +1921,9 @@ def list_signal_events(
     offset: int,
     include_legacy: bool = False,
 ) -> List[sqlite3.Row]:
-    conn = get_conn()
+    conn = get_read_conn()
     try:
-        clauses = ["(is_test IS NULL OR is_test = 0)"]
+        clauses = ["is_test = 0"]
         params: list[object] = []
         if user_id is not None:
             clauses.append("user_id = ?")
@@ -1595,14 +1934,6 @@ def list_signal_events(
         if min_score is not None:
             clauses.append("score >= ?")
             params.append(float(min_score))
-        clauses.append(
-            "NOT ("
-            "symbol LIKE 'TEST%' OR "
-            "LOWER(COALESCE(reason_json, '')) LIKE '%test%' OR "
-            "LOWER(COALESCE(reason_json, '')) LIKE '%тест%' OR "
-            "LOWER(COALESCE(breakdown_json, '')) LIKE '%test%' OR "
-            "LOWER(COALESCE(breakdown_json, '')) LIKE '%тест%')"
-        )
         _append_cutoff_filter(clauses, params, include_legacy=include_legacy)
         _append_blocked_symbols_filter(clauses, params)
         where_clause = " AND ".join(clauses)
@@ -1628,9 +1959,9 @@ def get_signals_for_period(
     since_ts: int | None,
     include_legacy: bool = False,
 ) -> List[sqlite3.Row]:
-    conn = get_conn()
+    conn = get_read_conn()
     try:
-        clauses = ["(is_test IS NULL OR is_test = 0)"]
+        clauses = ["is_test = 0"]
         params: list[object] = []
         if user_id is not None:
             clauses.append("user_id = ?")
@@ -1638,14 +1969,6 @@ def get_signals_for_period(
         if since_ts is not None:
             clauses.append("ts >= ?")
             params.append(int(since_ts))
-        clauses.append(
-            "NOT ("
-            "symbol LIKE 'TEST%' OR "
-            "LOWER(COALESCE(reason_json, '')) LIKE '%test%' OR "
-            "LOWER(COALESCE(reason_json, '')) LIKE '%тест%' OR "
-            "LOWER(COALESCE(breakdown_json, '')) LIKE '%test%' OR "
-            "LOWER(COALESCE(breakdown_json, '')) LIKE '%тест%')"
-        )
         _append_cutoff_filter(clauses, params, include_legacy=include_legacy)
         _append_blocked_symbols_filter(clauses, params)
         where_clause = " AND ".join(clauses)
@@ -1665,22 +1988,14 @@ def get_signals_for_period(
 
 
 def list_open_signal_events(*, max_age_sec: int | None = None, include_legacy: bool = True) -> List[sqlite3.Row]:
-    conn = get_conn()
+    conn = get_read_conn()
     try:
-        clauses = ["status IN ('OPEN', 'ACTIVE')", "(is_test IS NULL OR is_test = 0)"]
+        clauses = ["status IN ('OPEN', 'ACTIVE')", "is_test = 0"]
         params: list[object] = []
         if max_age_sec is not None:
             since_ts = int(time.time()) - int(max_age_sec)
             clauses.append("ts >= ?")
             params.append(since_ts)
-        clauses.append(
-            "NOT ("
-            "symbol LIKE 'TEST%' OR "
-            "LOWER(COALESCE(reason_json, '')) LIKE '%test%' OR "
-            "LOWER(COALESCE(reason_json, '')) LIKE '%тест%' OR "
-            "LOWER(COALESCE(breakdown_json, '')) LIKE '%test%' OR "
-            "LOWER(COALESCE(breakdown_json, '')) LIKE '%тест%')"
-        )
         _append_cutoff_filter(clauses, params, include_legacy=include_legacy)
         _append_blocked_symbols_filter(clauses, params)
         where_clause = " AND ".join(clauses)
@@ -1705,9 +2020,9 @@ def count_signal_events(
     min_score: float | None,
     include_legacy: bool = False,
 ) -> int:
-    conn = get_conn()
+    conn = get_read_conn()
     try:
-        clauses = ["(is_test IS NULL OR is_test = 0)"]
+        clauses = ["is_test = 0"]
         params: list[object] = []
         if user_id is not None:
             clauses.append("user_id = ?")
@@ -1718,14 +2033,6 @@ def count_signal_events(
         if min_score is not None:
             clauses.append("score >= ?")
             params.append(float(min_score))
-        clauses.append(
-            "NOT ("
-            "symbol LIKE 'TEST%' OR "
-            "LOWER(COALESCE(reason_json, '')) LIKE '%test%' OR "
-            "LOWER(COALESCE(reason_json, '')) LIKE '%тест%' OR "
-            "LOWER(COALESCE(breakdown_json, '')) LIKE '%test%' OR "
-            "LOWER(COALESCE(breakdown_json, '')) LIKE '%тест%')"
-        )
         _append_cutoff_filter(clauses, params, include_legacy=include_legacy)
         _append_blocked_symbols_filter(clauses, params)
         where_clause = " AND ".join(clauses)
@@ -1784,7 +2091,7 @@ def get_pumpdump_history(
     offset: int = 0,
 ) -> list[sqlite3.Row]:
     since_ts = _history_since_ts(time_window)
-    conn = get_conn()
+    conn = get_read_conn()
     try:
         clauses: list[str] = []
         params: list[object] = []
@@ -1820,7 +2127,7 @@ def get_pumpdump_history(
 
 def count_pumpdump_history(*, time_window: str) -> int:
     since_ts = _history_since_ts(time_window)
-    conn = get_conn()
+    conn = get_read_conn()
     try:
         clauses: list[str] = []
         params: list[object] = []
@@ -1840,7 +2147,7 @@ def count_pumpdump_history(*, time_window: str) -> int:
 
 
 def get_pumpdump_event_by_id(event_id: int) -> sqlite3.Row | None:
-    conn = get_conn()
+    conn = get_read_conn()
     try:
         cur = conn.execute(
             """
@@ -1865,7 +2172,7 @@ def get_pumpdump_event_by_id(event_id: int) -> sqlite3.Row | None:
         conn.close()
 
 def get_last_signal_event_by_module(module: str) -> Optional[sqlite3.Row]:
-    conn = get_conn()
+    conn = get_read_conn()
     try:
         blocked = sorted(get_blocked_symbols())
         blocked_clause = ""
@@ -1879,14 +2186,7 @@ def get_last_signal_event_by_module(module: str) -> Optional[sqlite3.Row]:
             SELECT symbol, side, score, ts, reason_json, breakdown_json
             FROM signal_events
             WHERE module = ?
-              AND (is_test IS NULL OR is_test = 0)
-              AND NOT (
-                symbol LIKE 'TEST%' OR
-                LOWER(COALESCE(reason_json, '')) LIKE '%test%' OR
-                LOWER(COALESCE(reason_json, '')) LIKE '%тест%' OR
-                LOWER(COALESCE(breakdown_json, '')) LIKE '%test%' OR
-                LOWER(COALESCE(breakdown_json, '')) LIKE '%тест%'
-              )
+              AND is_test = 0
             """
             + blocked_clause
             + """
@@ -1907,9 +2207,9 @@ def get_signal_outcome_counts(
     min_score: float | None,
     include_legacy: bool = False,
 ) -> dict:
-    conn = get_conn()
+    conn = get_read_conn()
     try:
-        clauses = ["(is_test IS NULL OR is_test = 0)"]
+        clauses = ["is_test = 0"]
         params: list[object] = []
         if user_id is not None:
             clauses.append("user_id = ?")
@@ -1920,14 +2220,6 @@ def get_signal_outcome_counts(
         if min_score is not None:
             clauses.append("score >= ?")
             params.append(float(min_score))
-        clauses.append(
-            "NOT ("
-            "symbol LIKE 'TEST%' OR "
-            "LOWER(COALESCE(reason_json, '')) LIKE '%test%' OR "
-            "LOWER(COALESCE(reason_json, '')) LIKE '%тест%' OR "
-            "LOWER(COALESCE(breakdown_json, '')) LIKE '%test%' OR "
-            "LOWER(COALESCE(breakdown_json, '')) LIKE '%тест%')"
-        )
         _append_cutoff_filter(clauses, params, include_legacy=include_legacy)
         _append_blocked_symbols_filter(clauses, params)
         where_clause = " AND ".join(clauses)
@@ -1982,9 +2274,9 @@ def get_signal_score_bucket_counts(
     min_score: float | None,
     include_legacy: bool = False,
 ) -> dict[str, dict[str, int]]:
-    conn = get_conn()
+    conn = get_read_conn()
     try:
-        clauses = ["(is_test IS NULL OR is_test = 0)"]
+        clauses = ["is_test = 0"]
         params: list[object] = []
         if user_id is not None:
             clauses.append("user_id = ?")
@@ -1995,14 +2287,6 @@ def get_signal_score_bucket_counts(
         if min_score is not None:
             clauses.append("score >= ?")
             params.append(float(min_score))
-        clauses.append(
-            "NOT ("
-            "symbol LIKE 'TEST%' OR "
-            "LOWER(COALESCE(reason_json, '')) LIKE '%test%' OR "
-            "LOWER(COALESCE(reason_json, '')) LIKE '%тест%' OR "
-            "LOWER(COALESCE(breakdown_json, '')) LIKE '%test%' OR "
-            "LOWER(COALESCE(breakdown_json, '')) LIKE '%тест%')"
-        )
         _append_cutoff_filter(clauses, params, include_legacy=include_legacy)
         _append_blocked_symbols_filter(clauses, params)
         where_clause = " AND ".join(clauses)
@@ -2130,9 +2414,9 @@ def get_signal_avg_rr(
     score_max: float | None,
     include_legacy: bool = False,
 ) -> dict[str, float | int]:
-    conn = get_conn()
+    conn = get_read_conn()
     try:
-        clauses = ["(is_test IS NULL OR is_test = 0)"]
+        clauses = ["is_test = 0"]
         params: list[object] = []
         if user_id is not None:
             clauses.append("user_id = ?")
@@ -2149,14 +2433,6 @@ def get_signal_avg_rr(
         if score_max is not None:
             clauses.append("score <= ?")
             params.append(float(score_max))
-        clauses.append(
-            "NOT ("
-            "symbol LIKE 'TEST%' OR "
-            "LOWER(COALESCE(reason_json, '')) LIKE '%test%' OR "
-            "LOWER(COALESCE(reason_json, '')) LIKE '%тест%' OR "
-            "LOWER(COALESCE(breakdown_json, '')) LIKE '%test%' OR "
-            "LOWER(COALESCE(breakdown_json, '')) LIKE '%тест%')"
-        )
         _append_cutoff_filter(clauses, params, include_legacy=include_legacy)
         _append_blocked_symbols_filter(clauses, params)
         where_clause = " AND ".join(clauses)
@@ -2192,21 +2468,13 @@ def get_signal_event(
     event_id: int,
     include_legacy: bool = False,
 ) -> Optional[sqlite3.Row]:
-    conn = get_conn()
+    conn = get_read_conn()
     try:
         params: list[object] = [int(event_id)]
-        clauses = ["id = ?", "(is_test IS NULL OR is_test = 0)"]
+        clauses = ["id = ?", "is_test = 0"]
         if user_id is not None:
             clauses.append("user_id = ?")
             params.append(int(user_id))
-        clauses.append(
-            "NOT ("
-            "symbol LIKE 'TEST%' OR "
-            "LOWER(COALESCE(reason_json, '')) LIKE '%test%' OR "
-            "LOWER(COALESCE(reason_json, '')) LIKE '%тест%' OR "
-            "LOWER(COALESCE(breakdown_json, '')) LIKE '%test%' OR "
-            "LOWER(COALESCE(breakdown_json, '')) LIKE '%тест%')"
-        )
         _append_cutoff_filter(clauses, params, include_legacy=include_legacy)
         _append_blocked_symbols_filter(clauses, params)
         where_clause = " AND ".join(clauses)
@@ -2229,19 +2497,13 @@ def get_signal_event_by_message(
     tg_message_id: int,
     include_legacy: bool = False,
 ) -> Optional[sqlite3.Row]:
-    conn = get_conn()
+    conn = get_read_conn()
     try:
         params: list[object] = [int(user_id), int(tg_message_id)]
         clauses = [
             "user_id = ?",
             "tg_message_id = ?",
-            "(is_test IS NULL OR is_test = 0)",
-            "NOT ("
-            "symbol LIKE 'TEST%' OR "
-            "LOWER(COALESCE(reason_json, '')) LIKE '%test%' OR "
-            "LOWER(COALESCE(reason_json, '')) LIKE '%тест%' OR "
-            "LOWER(COALESCE(breakdown_json, '')) LIKE '%test%' OR "
-            "LOWER(COALESCE(breakdown_json, '')) LIKE '%тест%')",
+            "is_test = 0",
         ]
         _append_cutoff_filter(clauses, params, include_legacy=include_legacy)
         _append_blocked_symbols_filter(clauses, params)
@@ -2415,7 +2677,7 @@ def release_signal_result_notification_claim(event_id: int) -> None:
 
 
 def list_pending_result_notifications(limit: int = 200) -> List[sqlite3.Row]:
-    conn = get_conn()
+    conn = get_read_conn()
     try:
         cur = conn.execute(
             """
@@ -2423,7 +2685,7 @@ def list_pending_result_notifications(limit: int = 200) -> List[sqlite3.Row]:
             FROM signal_events
             WHERE result_notified = 0
               AND UPPER(COALESCE(result, status)) IN ('TP1', 'TP2', 'SL', 'EXP', 'NO_FILL', 'NF', 'BE', 'AMBIGUOUS')
-              AND (is_test IS NULL OR is_test = 0)
+              AND is_test = 0
             ORDER BY COALESCE(updated_at, ts) ASC, id ASC
             LIMIT ?
             """,
@@ -2437,34 +2699,13 @@ def list_pending_result_notifications(limit: int = 200) -> List[sqlite3.Row]:
 def purge_test_signals() -> int:
     conn = get_conn()
     try:
-        cur = conn.execute(
-            """
-            DELETE FROM signal_events
-            WHERE is_test = 1
-               OR symbol LIKE 'TEST%'
-               OR LOWER(COALESCE(reason_json, '')) LIKE '%test%'
-               OR LOWER(COALESCE(reason_json, '')) LIKE '%тест%'
-               OR LOWER(COALESCE(breakdown_json, '')) LIKE '%test%'
-               OR LOWER(COALESCE(breakdown_json, '')) LIKE '%тест%'
-            """
-        )
+        cur = conn.execute("DELETE FROM signal_events WHERE is_test = 1")
         total = cur.rowcount or 0
         cur = conn.execute(
             "SELECT name FROM sqlite_master WHERE type='table' AND name='signal_audit'"
         )
         if cur.fetchone() is not None:
-            cur = conn.execute(
-                """
-                DELETE FROM signal_audit
-                WHERE symbol LIKE 'TEST%'
-                   OR LOWER(COALESCE(reason_json, '')) LIKE '%test%'
-                   OR LOWER(COALESCE(reason_json, '')) LIKE '%тест%'
-                   OR LOWER(COALESCE(breakdown_json, '')) LIKE '%test%'
-                   OR LOWER(COALESCE(breakdown_json, '')) LIKE '%тест%'
-                   OR LOWER(COALESCE(notes, '')) LIKE '%test%'
-                   OR LOWER(COALESCE(notes, '')) LIKE '%тест%'
-                """
-            )
+            cur = conn.execute("DELETE FROM signal_audit WHERE is_test = 1")
             total += cur.rowcount or 0
         conn.commit()
         return total
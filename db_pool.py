@@ -0,0 +1,252 @@
+"""
+Long-lived SQLite connections for bot.db.
+
+db.py, signal_audit_db.py and alert_dedup_db.py borrow connections from
+DB_POOL instead of opening one per call: a single writer connection
+(serialised by an RLock, SQLite allows one writer anyway) and a small pool of
+query_only reader connections. Connections stay open, so PRAGMAs run once and
+sqlite3's per-connection statement cache keeps repeated queries prepared.
+
+Borrowed connections keep the sqlite3.Connection interface; close() hands
+them back to the pool (rolling back anything left uncommitted). run_db()
+executes a blocking helper on the dedicated DB thread so async handlers can
+await it instead of doing disk I/O on the event loop. DB_POOL.transaction()
+groups calls to the existing write helpers into one commit.
+"""
+
+from __future__ import annotations
+
+import asyncio
+import os
+import queue
+import sqlite3
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager
+from functools import partial
+from typing import Any, Callable, Iterator, Optional, TypeVar
+
+from db_path import get_db_path
+
+DB_READERS = int(os.getenv("DB_READERS", "4"))
+DB_STATEMENT_CACHE = int(os.getenv("DB_STATEMENT_CACHE", "256"))
+DB_BUSY_TIMEOUT_MS = int(os.getenv("DB_BUSY_TIMEOUT_MS", "3000"))
+
+T = TypeVar("T")
+
+
+class PooledConnection:
+    """A borrowed connection: behaves like sqlite3.Connection, close() returns it."""
+
+    __slots__ = ("_conn", "_release", "_deferred")
+
+    def __init__(
+        self,
+        conn: sqlite3.Connection,
+        release: Callable[[sqlite3.Connection], None],
+        *,
+        deferred: bool = False,
+    ) -> None:
+        self._conn = conn
+        self._release = release
+        # borrowed inside DB_POOL.transaction(): the outer block commits
+        self._deferred = deferred
+
+    @property
+    def row_factory(self):
+        return self._conn.row_factory
+
+    @row_factory.setter
+    def row_factory(self, value) -> None:
+        self._conn.row_factory = value
+
+    def __getattr__(self, name: str) -> Any:
+        conn = self._conn
+        if conn is None:
+            raise sqlite3.ProgrammingError("Cannot operate on a closed database.")
+        return getattr(conn, name)
+
+    def commit(self) -> None:
+        if self._conn is None:
+            raise sqlite3.ProgrammingError("Cannot operate on a closed database.")
+        if not self._deferred:
+            self._conn.commit()
+
+    def close(self) -> None:
+        conn, self._conn = self._conn, None
+        if conn is not None:
+            self._release(conn)
+
+    def __enter__(self) -> "PooledConnection":
+        return self
+
+    def __exit__(self, exc_type, exc, tb) -> None:
+        # same as sqlite3.Connection: commit or roll back, but keep it open
+        if exc_type is None:
+            self.commit()
+        else:
+            self._conn.rollback()
+
+
+class DbPool:
+    def __init__(self, *, readers: int = DB_READERS) -> None:
+        self.readers = max(1, readers)
+        self._path: Optional[str] = None
+        self._writer: Optional[sqlite3.Connection] = None
+        self._writer_lock = threading.RLock()
+        self._writer_depth = 0
+        self._transaction_depth = 0
+        self._idle_readers: queue.LifoQueue[sqlite3.Connection] = queue.LifoQueue()
+        self._open_readers = 0
+        self._state_lock = threading.Lock()
+        self.overflow_readers = 0
+
+    def _open(self, *, readonly: bool) -> sqlite3.Connection:
+        conn = sqlite3.connect(
+            self._path,
+            check_same_thread=False,
+            timeout=5.0,
+            cached_statements=DB_STATEMENT_CACHE,
+        )
+        for pragma in ("PRAGMA journal_mode=WAL", f"PRAGMA busy_timeout={DB_BUSY_TIMEOUT_MS}"):
+            try:
+                conn.execute(pragma)
+            except sqlite3.Error:
+                pass
+        if readonly:
+            conn.execute("PRAGMA query_only=1")
+        return conn
+
+    def _check_path(self) -> None:
+        # DB_PATH may be changed at runtime (tests, maintenance scripts)
+        path = get_db_path()
+        if path != self._path:
+            with self._writer_lock:
+                self._close_all()
+                self._path = path
+
+    def writer(self) -> PooledConnection:
+        self._check_path()
+        self._writer_lock.acquire()
+        try:
+            if self._writer is None:
+                self._writer = self._open(readonly=False)
+            self._writer_depth += 1
+        except Exception:
+            self._writer_lock.release()
+            raise
+        return PooledConnection(
+            self._writer,
+            self._release_writer,
+            deferred=self._transaction_depth > 0,
+        )
+
+    @contextmanager
+    def transaction(self) -> Iterator[PooledConnection]:
+        """
+        Hold the writer for a block of write helpers and commit them together.
+
+        Writer connections borrowed inside the block skip their own commit();
+        the block commits once on exit or rolls everything back on error. The
+        helpers must not call rollback() themselves, that would discard the
+        whole block.
+        """
+        conn = self.writer()
+        try:
+            if self._transaction_depth == 0 and not conn.in_transaction:
+                # sqlite3 only opens a transaction implicitly before DML; without
+                # this, the first SAVEPOINT would open one and its RELEASE commit it
+                conn.execute("BEGIN IMMEDIATE")
+        except BaseException:
+            conn.close()
+            raise
+        self._transaction_depth += 1
+        try:
+            try:
+                yield conn
+            finally:
+                self._transaction_depth -= 1
+            conn.commit()
+        except BaseException:
+            if self._transaction_depth == 0:
+                conn.rollback()
+            raise
+        finally:
+            conn.close()
+
+    def _release_writer(self, conn: sqlite3.Connection) -> None:
+        try:
+            self._writer_depth -= 1
+            if self._writer_depth == 0:
+                if conn.in_transaction:
+                    conn.rollback()
+                conn.row_factory = None
+        finally:
+            self._writer_lock.release()
+
+    def reader(self) -> PooledConnection:
+        self._check_path()
+        try:
+            conn = self._idle_readers.get_nowait()
+        except queue.Empty:
+            conn = self._open(readonly=True)
+            with self._state_lock:
+                self._open_readers += 1
+                if self._open_readers > self.readers:
+                    self.overflow_readers += 1
+        return PooledConnection(conn, self._release_reader)
+
+    def _release_reader(self, conn: sqlite3.Connection) -> None:
+        if conn.in_transaction:
+            conn.rollback()
+        conn.row_factory = None
+        with self._state_lock:
+            keep = self._idle_readers.qsize() < self.readers
+            if not keep:
+                self._open_readers -= 1
+        if keep:
+            self._idle_readers.put(conn)
+        else:
+            conn.close()
+
+    def _close_all(self) -> None:
+        if self._writer is not None:
+            self._writer.close()
+            self._writer = None
+        while True:
+            try:
+                conn = self._idle_readers.get_nowait()
+            except queue.Empty:
+                break
+            conn.close()
+            with self._state_lock:
+                self._open_readers -= 1
+
+    def close(self) -> None:
+        with self._writer_lock:
+            self._close_all()
+            self._path = None
+
+    def snapshot(self) -> dict:
+        return {
+            "path": self._path,
+            "readers_open": self._open_readers,
+            "readers_idle": self._idle_readers.qsize(),
+            "overflow_readers": self.overflow_readers,
+        }
+
+
+DB_POOL = DbPool()
+
+_DB_EXECUTOR = ThreadPoolExecutor(max_workers=1, thread_name_prefix="db")
+
+
+async def run_db(func: Callable[..., T], *args: Any, **kwargs: Any) -> T:
+    """Run a blocking DB helper on the dedicated DB thread."""
+    loop = asyncio.get_running_loop()
+    return await loop.run_in_executor(_DB_EXECUTOR, partial(func, *args, **kwargs))
+
+
+def shutdown_db_pool() -> None:
+    _DB_EXECUTOR.shutdown(wait=True)
+    DB_POOL.close()
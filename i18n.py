@@ -1,5 +1,7 @@
 from __future__ import annotations
 
+import string
+from functools import lru_cache
 from typing import Any
 
 
@@ -589,6 +591,7 @@ _TRANSLATIONS: dict[str, dict[str, str]] = {
         "TEST_NOTIFY_TEXT": "🧪 Тестовое уведомление: доставка работает.",
         "TEST_NOTIFY_ERROR": "❌ Ошибка: {error}",
         "PURGE_TESTS_DONE": "✅ Удалено тестовых сигналов: {removed}",
+        "REBUILD_STATS_DONE": "✅ Статистика пересчитана, строк агрегатов: {rows}",
         "PURGE_SYMBOL_DONE": "✅ {symbol}: удалено signal_events={events}, signal_audit={audit}",
         "CMD_USAGE_LOCK": "Использование: /lock <id>",
         "CMD_USAGE_UNLOCK": "Использование: /unlock <id>",
@@ -1508,6 +1511,7 @@ _TRANSLATIONS: dict[str, dict[str, str]] = {
         "TEST_NOTIFY_TEXT": "🧪 Test notification: delivery works.",
         "TEST_NOTIFY_ERROR": "❌ Error: {error}",
         "PURGE_TESTS_DONE": "✅ Test signals removed: {removed}",
+        "REBUILD_STATS_DONE": "✅ Stats rebuilt, rollup rows: {rows}",
         "PURGE_SYMBOL_DONE": "✅ {symbol}: deleted signal_events={events}, signal_audit={audit}",
         "CMD_USAGE_LOCK": "Usage: /lock <id>",
         "CMD_USAGE_UNLOCK": "Usage: /unlock <id>",
@@ -1849,6 +1853,59 @@ _TRANSLATIONS: dict[str, dict[str, str]] = {
 }
 
 
+_Template = tuple[tuple[str, str | None, str], ...]
+
+# скомпилированный каталог: lang -> key -> (сырая строка, разобранный шаблон или None)
+_COMPILED: dict[str, dict[str, tuple[str, _Template | None]]] = {}
+_LABEL_KEYS: set[str] = set()
+_LABEL_INDEX: dict[str, str] | None = None
+_ALL_LABELS: dict[str, list[str]] = {}
+_FORMATTER = string.Formatter()
+
+
+def _compile_template(value: str) -> _Template | None:
+    """(literal, field, spec) parts for str.format, None when there is nothing to fill in."""
+    parts = []
+    for literal, field, spec, conversion in _FORMATTER.parse(value):
+        if field is not None and (conversion or not field.isidentifier() or "{" in (spec or "")):
+            # exotic fields ({0}, {a.b}, {x!r}, nested specs): let str.format handle them
+            return ((value, "", ""),)
+        parts.append((literal, field, spec or ""))
+    if all(field is None for _, field, _ in parts):
+        return None
+    return tuple(parts)
+
+
+def _catalog(lang_code: str) -> dict[str, tuple[str, _Template | None]]:
+    # каждый язык компилируется при первом обращении, с подстановкой ru для пустых ключей
+    catalog = _COMPILED.get(lang_code)
+    if catalog is not None:
+        return catalog
+    source = _TRANSLATIONS.get(lang_code, {})
+    fallback = _TRANSLATIONS.get("ru", {})
+    catalog = {}
+    for key in source.keys() | fallback.keys():
+        value = source.get(key) or fallback.get(key)
+        if value:
+            catalog[key] = (value, _compile_template(value))
+    _COMPILED[lang_code] = catalog
+    return catalog
+
+
+def _render(value: str, template: _Template | None, fmt: dict[str, Any]) -> str:
+    if template is None:
+        return value
+    if len(template) == 1 and template[0][1] == "":
+        return value.format(**fmt)
+    out = []
+    for literal, field, spec in template:
+        out.append(literal)
+        if field is not None:
+            out.append(format(fmt[field], spec))
+    return "".join(out)
+
+
+@lru_cache(maxsize=256)
 def normalize_lang(lang: str | None) -> str:
     if not lang:
         return "ru"
@@ -1861,13 +1918,36 @@ def normalize_lang(lang: str | None) -> str:
 
 
 def t(lang: str | None, key: str, **fmt: Any) -> str:
-    lang_code = normalize_lang(lang)
-    lang_dict = _TRANSLATIONS.get(lang_code, {})
-    value = lang_dict.get(key) or _TRANSLATIONS.get("ru", {}).get(key) or key
+    entry = _catalog(normalize_lang(lang)).get(key)
+    if entry is None:
+        return key.format(**fmt) if fmt else key
+    value, template = entry
     if fmt:
-        return value.format(**fmt)
+        return _render(value, template, fmt)
     return value
 
 
 def all_labels(key: str) -> list[str]:
-    return [t("ru", key), t("en", key)]
+    labels = _ALL_LABELS.get(key)
+    if labels is None:
+        labels = [t("ru", key), t("en", key)]
+        _ALL_LABELS[key] = labels
+    return labels
+
+
+def register_labels(*keys: str) -> None:
+    """Mark keys as reply-keyboard labels that label_key() maps text back to."""
+    global _LABEL_INDEX
+    _LABEL_KEYS.update(keys)
+    _LABEL_INDEX = None
+
+
+def label_key(text: str | None) -> str | None:
+    """Key of a registered reply-keyboard label in any language, one dict lookup."""
+    global _LABEL_INDEX
+    if not text:
+        return None
+    if _LABEL_INDEX is None:
+        # only registered keys: other catalog entries may share a button's text
+        _LABEL_INDEX = {t(lang_code, key): key for key in sorted(_LABEL_KEYS) for lang_code in ("en", "ru")}
+    return _LABEL_INDEX.get(text)
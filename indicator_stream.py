@@ -0,0 +1,363 @@
+"""
+Incremental EMA / RSI / ATR state per (symbol, tf, indicator, period).
+
+A stream keeps, for every candle it has seen, the recursion value of the
+indicator seeded at the stream's first candle (its anchor), so advancing by
+one closed candle is O(1). Callers still pass fixed-size windows (the last
+N candles of a fetch), and trading_core seeds each recursion at the window's
+first candle. Both recursions are linear in their seed, so the window value
+is recovered from the stream in O(1):
+
+    window(s, e) = stream(e) - decay ** (e - t) * (stream(t) - seed(s))
+
+where t is the window's seed index (s for EMA, s + period for the Wilder
+averages) and seed(s) is the window's own seed (its first close, or the mean
+of its first `period` inputs). For a window starting at the anchor the
+correction term is exactly zero, so the results match the full recomputation
+up to floating point rounding.
+
+The stored head candle may still have been forming when it was absorbed, so
+it is re-checked against every new window. A gap, a rewritten history or a
+window reaching behind the stored history rebuilds the stream from that
+window. A stream keeps STREAM_SLACK candles of history beyond the longest
+window it was rebuilt for, and is charged for the entries it actually holds.
+"""
+
+from __future__ import annotations
+
+import threading
+from collections import deque
+from dataclasses import dataclass, field
+from typing import List, Optional, Tuple
+
+from ai_types import CandleFrame, CandleSeries
+from bounded_cache import BoundedCache, env_bytes
+from kline_store import interval_to_ms
+from utils.safe_math import EPS
+
+# history kept beyond the window, so the next few sliding windows still fit
+STREAM_SLACK = 32
+# measured with tracemalloc over 200 streams of 120/250-candle CandleFrame
+# windows: per candle (close time, close, plus the EMA value or one input and
+# one average per Wilder component), and per stream (deque blocks, the object)
+_ENTRY_BYTES = {"ema": 105, "rsi": 180, "atr": 140}
+_STREAM_BYTES = 4000
+
+_Row = Tuple[int, float, float, float]
+
+
+def _row(candles: CandleSeries, pos: int) -> _Row:
+    if isinstance(candles, CandleFrame):
+        return (
+            int(candles.close_time[pos]),
+            candles.high[pos],
+            candles.low[pos],
+            candles.close[pos],
+        )
+    candle = candles[pos]
+    return int(candle.close_time or 0), candle.high, candle.low, candle.close
+
+
+def _close_time(candles: CandleSeries, pos: int) -> int:
+    if isinstance(candles, CandleFrame):
+        return int(candles.close_time[pos])
+    return int(candles[pos].close_time or 0)
+
+
+@dataclass
+class _Stream:
+    kind: str
+    period: int
+    step_ms: int
+    # absolute index of cts[0]; the anchor is the index the recursion is seeded at
+    base: int = 0
+    anchor: int = 0
+    rebuilds: int = 0
+    cts: deque = field(default_factory=deque)
+    closes: deque = field(default_factory=deque)
+    # EMA values
+    values: deque = field(default_factory=deque)
+    # one float column per Wilder component: (gain, loss) for RSI, (TR,) for ATR
+    inputs: List[deque] = field(default_factory=list)
+    averages: List[deque] = field(default_factory=list)
+    # (high, low) of the head, ATR only: older candles were final when they stopped
+    # being the head, so only the head can differ from a later window
+    head_range: Optional[Tuple[float, float]] = None
+
+    @property
+    def head(self) -> int:
+        return self.base + len(self.cts) - 1
+
+    def nbytes(self) -> int:
+        return _STREAM_BYTES + _ENTRY_BYTES[self.kind] * len(self.cts)
+
+    def _columns(self) -> List[deque]:
+        if self.kind == "ema":
+            return [self.cts, self.closes, self.values]
+        return [self.cts, self.closes, *self.inputs, *self.averages]
+
+    def _input(self, row: _Row, prev_close: float) -> tuple:
+        _, high, low, close = row
+        if self.kind == "atr":
+            return (max(high - low, abs(high - prev_close), abs(low - prev_close)),)
+        diff = close - prev_close
+        return (diff if diff > 0 else 0, -diff if diff < 0 else 0)
+
+    def rebuild(self, candles: CandleSeries, n: int) -> None:
+        # never shrink: the key may also serve a longer window
+        maxlen = max(self.cts.maxlen or 0, n + STREAM_SLACK)
+        width = 1 if self.kind == "atr" else 2
+        self.rebuilds += 1
+        self.base = self.anchor = 0
+        self.cts = deque(maxlen=maxlen)
+        self.closes = deque(maxlen=maxlen)
+        if self.kind == "ema":
+            self.values = deque(maxlen=maxlen)
+        else:
+            self.inputs = [deque(maxlen=maxlen) for _ in range(width)]
+            self.averages = [deque(maxlen=maxlen) for _ in range(width)]
+        self.head_range = None
+        for pos in range(n):
+            self.append(_row(candles, pos))
+
+    def _averages_at(self, pos: int) -> Optional[tuple]:
+        first = self.averages[0][pos]
+        if first is None:
+            return None
+        return tuple(column[pos] for column in self.averages)
+
+    def append(self, row: _Row) -> None:
+        idx = self.head + 1
+        offset = idx - self.anchor
+        full = len(self.cts) == self.cts.maxlen
+        if self.kind == "ema":
+            if offset == 0:
+                value = row[3]
+            else:
+                k = 2 / (self.period + 1)
+                value = row[3] * k + self.values[-1] * (1 - k)
+            self.values.append(value)
+        else:
+            if offset == 0:
+                inputs = averages = None
+            else:
+                inputs = self._input(row, self.closes[-1])
+                if offset < self.period:
+                    averages = None
+                elif offset == self.period:
+                    stored = len(self.cts)
+                    averages = tuple(
+                        (sum(column[pos] for pos in range(stored - self.period + 1, stored)) + x) / self.period
+                        for column, x in zip(self.inputs, inputs)
+                    )
+                else:
+                    keep = self.period - 1
+                    averages = tuple(
+                        (column[-1] * keep + x) / self.period for column, x in zip(self.averages, inputs)
+                    )
+            for pos, column in enumerate(self.inputs):
+                column.append(None if inputs is None else inputs[pos])
+            for pos, column in enumerate(self.averages):
+                column.append(None if averages is None else averages[pos])
+        if full:
+            self.base += 1
+        self.cts.append(row[0])
+        self.closes.append(row[3])
+        if self.kind == "atr":
+            self.head_range = (row[1], row[2])
+
+    def pop(self) -> None:
+        for column in self._columns():
+            column.pop()
+        # the new head's range is not kept; it was final when it stopped being the head
+        self.head_range = None
+
+    def _same(self, idx: int, row: _Row) -> bool:
+        pos = idx - self.base
+        if self.cts[pos] != row[0] or self.closes[pos] != row[3]:
+            return False
+        if self.kind != "atr" or idx != self.head or self.head_range is None:
+            return True
+        return self.head_range == (row[1], row[2])
+
+    def sync(self, candles: CandleSeries, n: int) -> Optional[Tuple[int, int]]:
+        """
+        Absorb the window's new candles and return its absolute (start, end)
+        indices, or None when the window cannot be served from this stream.
+        """
+        last = _row(candles, n - 1)
+        if not self.cts:
+            self.rebuild(candles, n)
+            return self.base, self.head
+        head_ct = self.cts[-1]
+        if last[0] >= head_ct:
+            gap = last[0] - head_ct
+            if gap % self.step_ms:
+                self.rebuild(candles, n)
+                return self.base, self.head
+            pos = n - 1 - gap // self.step_ms
+            if pos < 0 or _close_time(candles, pos) != head_ct:
+                self.rebuild(candles, n)
+                return self.base, self.head
+            if not self._same(self.head, _row(candles, pos)):
+                # the head was a forming candle when it was stored
+                self.pop()
+                pos -= 1
+                if pos < 0 or not self.cts or not self._same(self.head, _row(candles, pos)):
+                    self.rebuild(candles, n)
+                    return self.base, self.head
+            for next_pos in range(pos + 1, n):
+                row = _row(candles, next_pos)
+                if row[0] != self.cts[-1] + self.step_ms:
+                    self.rebuild(candles, n)
+                    return self.base, self.head
+                self.append(row)
+            end = self.head
+            owned = True
+        else:
+            # an older window: answer from history, leave the head alone
+            offset = head_ct - last[0]
+            if offset % self.step_ms:
+                return None
+            end = self.head - offset // self.step_ms
+            if end < self.base or not self._same(end, last):
+                return None
+            owned = False
+        start = end - (n - 1)
+        if start < self.base or start < self.anchor or self.cts[start - self.base] != _close_time(candles, 0):
+            if not owned:
+                return None
+            self.rebuild(candles, n)
+            return self.base, self.head
+        return start, end
+
+    def ema_at(self, start: int, idx: int) -> float:
+        value = self.values[idx - self.base]
+        if start == self.anchor:
+            return value
+        decay = 1 - 2 / (self.period + 1)
+        pos = start - self.base
+        return value - decay ** (idx - start) * (self.values[pos] - self.closes[pos])
+
+    def wilder_at(self, start: int, idx: int) -> tuple:
+        value = self._averages_at(idx - self.base)
+        if start == self.anchor:
+            return value
+        seed_idx = start + self.period
+        seed = tuple(
+            sum(column[pos - self.base] for pos in range(start + 1, seed_idx + 1)) / self.period
+            for column in self.inputs
+        )
+        if idx == seed_idx:
+            return seed
+        factor = ((self.period - 1) / self.period) ** (idx - seed_idx)
+        stream_seed = self._averages_at(seed_idx - self.base)
+        return tuple(v - factor * (a - b) for v, a, b in zip(value, stream_seed, seed))
+
+
+# the AI universe (~250 symbols) x ~10 (tf, indicator, period) streams, each
+# holding a window of up to ~250 candles plus STREAM_SLACK at ~140 B per candle
+# on average: 250 * 10 * (4000 + 282 * 140) B ~ 110 MB
+_STREAMS: BoundedCache[Tuple[str, str, str, int], _Stream] = BoundedCache(
+    "indicator_streams",
+    max_bytes=env_bytes("INDICATOR_STREAM_MAX_MB", 128),
+    ttl_sec=2 * 86400,
+    sizeof=lambda stream: stream.nbytes(),
+)
+_LOCK = threading.Lock()
+
+
+def _window(symbol: str, tf: str, kind: str, period: int, candles: CandleSeries):
+    """
+    (stream, start, end) for a window the stream already covered, or None when
+    it must be computed directly: unsupported, an old window the stream cannot
+    answer, or the stream had to be (re)built from this window. A rebuild costs
+    the same as a direct computation, so its callers go through the close-time
+    cache instead.
+    """
+    step_ms = interval_to_ms(tf)
+    n = len(candles)
+    if step_ms <= 0 or n == 0 or _close_time(candles, n - 1) <= 0:
+        return None
+    key = (symbol, tf, kind, period)
+    stream = _STREAMS.get(key)
+    if stream is None:
+        stream = _Stream(kind, period, step_ms)
+        stream.rebuild(candles, n)
+        _STREAMS.set(key, stream)
+        return None
+    rebuilds = stream.rebuilds
+    nbytes = stream.nbytes()
+    span = stream.sync(candles, n)
+    if stream.nbytes() != nbytes:
+        _STREAMS.resize(key)
+    if span is None or stream.rebuilds != rebuilds:
+        return None
+    return stream, span[0], span[1]
+
+
+def stream_ema_tail(
+    symbol: str,
+    tf: str,
+    candles: CandleSeries,
+    period: int,
+    tail: int = 1,
+) -> Optional[List[float]]:
+    """
+    Last `tail` values of the EMA series over the window ([] when it is shorter
+    than `period`), or None when the window is not served from a stream.
+    """
+    period = int(period)
+    if len(candles) < period:
+        return []
+    with _LOCK:
+        found = _window(symbol, tf, "ema", period, candles)
+        if found is None:
+            return None
+        stream, start, end = found
+        first = max(start, end - tail + 1)
+        return [stream.ema_at(start, idx) for idx in range(first, end + 1)]
+
+
+def stream_value(
+    symbol: str,
+    tf: str,
+    candles: CandleSeries,
+    name: str,
+    period: int,
+) -> Tuple[bool, Optional[float]]:
+    """
+    (served, value) for "ema" / "atr" / "rsi" over the window, matching
+    compute_ema / compute_atr / _compute_rsi_series(...)[-1] in trading_core.
+    served is False when the caller has to compute (or look up) the value.
+    """
+    if name == "ema":
+        values = stream_ema_tail(symbol, tf, candles, period)
+        if values is None:
+            return False, None
+        return True, values[-1] if values else None
+    if name not in {"atr", "rsi"}:
+        return False, None
+    period = max(1, int(period))
+    n = len(candles)
+    if name == "atr" and n < period + 1:
+        return True, None
+    if name == "rsi" and n < period + 2:
+        # too short for a single Wilder step: the RSI series is all 50s
+        return True, 50.0
+    with _LOCK:
+        found = _window(symbol, tf, name, period, candles)
+        if found is None:
+            return False, None
+        stream, start, end = found
+        averages = stream.wilder_at(start, end)
+    if name == "atr":
+        return True, averages[0]
+    avg_gain, avg_loss = averages
+    if avg_loss <= EPS:
+        return True, 100.0
+    return True, round(100 - 100 / (1 + avg_gain / avg_loss), 2)
+
+
+def get_stream_stats() -> dict[str, int]:
+    return _STREAMS.stats()
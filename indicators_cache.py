@@ -1,17 +1,38 @@
 from __future__ import annotations
 
-from typing import Dict, Tuple, Optional
+from typing import Callable, List, Optional, Sequence, Tuple
 
-from ai_types import Candle
-from trading_core import _compute_rsi_series, compute_atr, compute_ema
+import indicators_vectorized
+from ai_types import CandleFrame, CandleSeries
+from bounded_cache import BoundedCache, env_bytes
+from indicator_stream import get_stream_stats, stream_ema_tail, stream_value
+from trading_core import _column, _compute_rsi_series, compute_atr, compute_ema
 
-_INDICATOR_CACHE: Dict[Tuple[str, str, int, str, int], Optional[float]] = {}
 _MAX_CACHE_SIZE = 10000
+# results for windows the indicator streams do not serve (e.g. 1M candles, or
+# the window a stream was just rebuilt from);
+# keys carry the last close time, so old entries are never read again: LRU + 1 day TTL
+_INDICATOR_CACHE: BoundedCache[Tuple[str, str, int, str, int], Optional[float]] = BoundedCache(
+    "indicators",
+    max_bytes=env_bytes("INDICATOR_CACHE_MAX_MB", 4),
+    max_entries=_MAX_CACHE_SIZE,
+    ttl_sec=86400,
+)
+_MISSING = object()
 
 
-def _get_last_close_time(candles: list[Candle]) -> int | None:
+def get_indicator_cache_stats() -> dict[str, dict[str, int]]:
+    return {
+        "indicators": _INDICATOR_CACHE.stats(),
+        "indicator_streams": get_stream_stats(),
+    }
+
+
+def _get_last_close_time(candles: CandleSeries) -> int | None:
     if not candles:
         return None
+    if isinstance(candles, CandleFrame):
+        return candles.close_time[-1]
     return candles[-1].close_time
 
 
@@ -19,39 +40,42 @@ def _cache_get(
     key: Tuple[str, str, int, str, int],
     compute: callable,
 ) -> Optional[float]:
-    if key in _INDICATOR_CACHE:
-        return _INDICATOR_CACHE[key]
+    cached = _INDICATOR_CACHE.get(key, _MISSING)
+    if cached is not _MISSING:
+        return cached
     value = compute()
-    _INDICATOR_CACHE[key] = value
-    if len(_INDICATOR_CACHE) > _MAX_CACHE_SIZE:
-        for old_key in list(_INDICATOR_CACHE.keys())[: _MAX_CACHE_SIZE // 2]:
-            _INDICATOR_CACHE.pop(old_key, None)
+    _INDICATOR_CACHE.set(key, value)
     return value
 
 
 def get_cached_ema(
     symbol: str,
     tf: str,
-    candles: list[Candle],
+    candles: CandleSeries,
     period: int,
 ) -> Optional[float]:
     last_close_time = _get_last_close_time(candles)
     if last_close_time is None:
         return None
-    closes = [c.close for c in candles]
+    served, value = stream_value(symbol, tf, candles, "ema", period)
+    if served:
+        return value
     key = (symbol, tf, last_close_time, "ema", period)
-    return _cache_get(key, lambda: compute_ema(closes, period))
+    return _cache_get(key, lambda: compute_ema(_column(candles, "close"), period))
 
 
 def get_cached_atr(
     symbol: str,
     tf: str,
-    candles: list[Candle],
+    candles: CandleSeries,
     period: int,
 ) -> Optional[float]:
     last_close_time = _get_last_close_time(candles)
     if last_close_time is None:
         return None
+    served, value = stream_value(symbol, tf, candles, "atr", period)
+    if served:
+        return value
     key = (symbol, tf, last_close_time, "atr", period)
     return _cache_get(key, lambda: compute_atr(candles, period))
 
@@ -59,16 +83,69 @@ def get_cached_atr(
 def get_cached_rsi(
     symbol: str,
     tf: str,
-    candles: list[Candle],
+    candles: CandleSeries,
     period: int = 14,
 ) -> float:
     last_close_time = _get_last_close_time(candles)
     if last_close_time is None:
         return 50.0
-    closes = [c.close for c in candles]
+    served, value = stream_value(symbol, tf, candles, "rsi", period)
+    if served:
+        return value if value is not None else 50.0
     key = (symbol, tf, last_close_time, "rsi", period)
     cached = _cache_get(
         key,
-        lambda: (_compute_rsi_series(closes, period)[-1] if closes else 50.0),
+        lambda: (_compute_rsi_series(_column(candles, "close"), period)[-1] if candles else 50.0),
     )
     return cached if cached is not None else 50.0
+
+
+def get_cached_ema_tail(
+    symbol: str,
+    tf: str,
+    candles: CandleSeries,
+    period: int,
+    count: int,
+) -> List[float]:
+    """Last `count` values of the EMA series over the window, [] when it is shorter than `period`."""
+    values = stream_ema_tail(symbol, tf, candles, period, count)
+    if values is None:
+        values = indicators_vectorized.ema_series(_column(candles, "close"), period)[-count:]
+    return values
+
+
+def get_cached_batch(
+    symbols: Sequence[str],
+    tf: str,
+    frames: Sequence[CandleSeries],
+    name: str,
+    period: int,
+    compute: Callable[[List[CandleSeries]], List[Optional[float]]],
+) -> List[Optional[float]]:
+    """
+    Batch form of get_cached_*: windows served by the indicator streams or
+    cached keys are returned as is, all misses go through a single compute()
+    call and are stored under the same keys.
+    """
+    results: List[Optional[float]] = [None] * len(frames)
+    missing: List[Tuple[int, Tuple[str, str, int, str, int]]] = []
+    for idx, (symbol, candles) in enumerate(zip(symbols, frames)):
+        last_close_time = _get_last_close_time(candles)
+        if last_close_time is None:
+            continue
+        served, value = stream_value(symbol, tf, candles, name, period)
+        if served:
+            results[idx] = value
+            continue
+        key = (symbol, tf, last_close_time, name, period)
+        cached = _INDICATOR_CACHE.get(key, _MISSING)
+        if cached is not _MISSING:
+            results[idx] = cached
+        else:
+            missing.append((idx, key))
+    if missing:
+        values = compute([frames[idx] for idx, _ in missing])
+        for (idx, key), value in zip(missing, values):
+            _INDICATOR_CACHE.set(key, value)
+            results[idx] = value
+    return results
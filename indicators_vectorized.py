@@ -0,0 +1,274 @@
+"""
+Whole-series indicator kernels used by trading_core when INDICATOR_ENGINE=vectorized.
+
+Window statistics are computed from prefix sums (rolling mean / variance in O(n)
+regardless of the window length), pivots from shifted-slice comparisons, and the
+Wilder / EMA recursions run over pre-computed diff and true-range columns with
+no per-element helper calls. Outputs match the reference loops in trading_core
+up to floating point rounding.
+"""
+
+from __future__ import annotations
+
+from itertools import accumulate
+from math import sqrt
+from operator import sub
+from typing import List, Optional, Sequence, Tuple
+
+from utils.safe_math import EPS
+
+
+def prefix_sums(values: Sequence[float]) -> List[float]:
+    return list(accumulate(values, initial=0.0))
+
+
+def rolling_mean(values: Sequence[float], period: int) -> List[float]:
+    """Mean of every full window of ``period`` values (len(values) - period + 1 items)."""
+    period = max(1, int(period))
+    n = len(values)
+    if n < period:
+        return []
+    sums = prefix_sums(values)
+    return [(hi - lo) / period for hi, lo in zip(sums[period:], sums[: n - period + 1])]
+
+
+def bollinger_bands(
+    closes: Sequence[float], period: int = 20, mult: float = 2.0
+) -> Tuple[List[float], List[float], List[float]]:
+    n = len(closes)
+    if n < period:
+        return [closes[-1]] * n, [closes[-1]] * n, [closes[-1]] * n
+
+    # shift by the first close so the sum-of-squares trick keeps its precision
+    base = closes[0]
+    shifted = [x - base for x in closes]
+    sums = prefix_sums(shifted)
+    sq_sums = prefix_sums([x * x for x in shifted])
+
+    middles = list(closes[: period - 1])
+    uppers = list(middles)
+    lowers = list(middles)
+    for i in range(period - 1, n):
+        lo = i + 1 - period
+        mean_shifted = (sums[i + 1] - sums[lo]) / period
+        var = (sq_sums[i + 1] - sq_sums[lo]) / period - mean_shifted * mean_shifted
+        std = sqrt(var) if var > 0 else 0.0
+        m = mean_shifted + base
+        middles.append(m)
+        uppers.append(m + mult * std)
+        lowers.append(m - mult * std)
+    return middles, uppers, lowers
+
+
+def _strict_extrema(values: Sequence[float], left: int, right: int, *, highs: bool) -> List[bool]:
+    n = len(values)
+    center = values[left : n - right]
+    flags = [True] * len(center)
+    for j in range(1, left + 1):
+        other = values[left - j : n - right - j]
+        if highs:
+            flags = [f and c > o for f, c, o in zip(flags, center, other)]
+        else:
+            flags = [f and c < o for f, c, o in zip(flags, center, other)]
+    for j in range(1, right + 1):
+        other = values[left + j : n - right + j]
+        if highs:
+            flags = [f and c > o for f, c, o in zip(flags, center, other)]
+        else:
+            flags = [f and c < o for f, c, o in zip(flags, center, other)]
+    return flags
+
+
+def pivot_points(
+    highs: Sequence[float],
+    lows: Sequence[float],
+    left: int = 2,
+    right: int = 2,
+) -> tuple[list[Tuple[int, float]], list[Tuple[int, float]]]:
+    n = min(len(highs), len(lows))
+    if n - right <= left:
+        return [], []
+    highs = highs[:n]
+    lows = lows[:n]
+    high_flags = _strict_extrema(highs, left, right, highs=True)
+    low_flags = _strict_extrema(lows, left, right, highs=False)
+    swing_highs = [(i + left, highs[i + left]) for i, flag in enumerate(high_flags) if flag]
+    swing_lows = [(i + left, lows[i + left]) for i, flag in enumerate(low_flags) if flag]
+    return swing_highs, swing_lows
+
+
+def rsi_series(closes: Sequence[float], period: int = 14) -> List[float]:
+    period = max(1, int(period))
+    n = len(closes)
+    if n < period + 1:
+        return [50.0] * n
+
+    diffs = list(map(sub, closes[1:], closes[:-1]))
+    seed = diffs[:period]
+    avg_gain = sum(d if d > 0 else 0 for d in seed) / period
+    avg_loss = sum(-d if d < 0 else 0 for d in seed) / period
+
+    keep = period - 1
+    out = [50.0] * (period + 1)
+    append = out.append
+    for diff in diffs[period:]:
+        gain = diff if diff > 0 else 0
+        loss = -diff if diff < 0 else 0
+        avg_gain = (avg_gain * keep + gain) / period
+        avg_loss = (avg_loss * keep + loss) / period
+        if avg_loss <= EPS:
+            append(100.0)
+        else:
+            append(round(100 - 100 / (1 + avg_gain / avg_loss), 2))
+    return out
+
+
+def true_ranges(highs: Sequence[float], lows: Sequence[float], closes: Sequence[float]) -> List[float]:
+    n = min(len(highs), len(lows), len(closes))
+    if n == 0:
+        return []
+    trs = [float(highs[0] - lows[0])]
+    trs.extend(
+        max(h - l, abs(h - pc), abs(l - pc))
+        for h, l, pc in zip(highs[1:n], lows[1:n], closes[: n - 1])
+    )
+    return trs
+
+
+def atr_series(
+    highs: Sequence[float], lows: Sequence[float], closes: Sequence[float], period: int = 14
+) -> List[float]:
+    period = max(1, int(period))
+    trs = true_ranges(highs, lows, closes)
+    n = len(trs)
+    if n == 0:
+        return []
+    if n < period + 1:
+        return [s / (i + 1) for i, s in enumerate(accumulate(trs))]
+
+    first_atr = sum(trs[1 : period + 1]) / period
+    keep = period - 1
+    out = [first_atr] * (period + 1)
+    append = out.append
+    prev = first_atr
+    for tr in trs[period + 1 :]:
+        prev = (prev * keep + tr) / period
+        append(prev)
+    return out
+
+
+def atr_last(
+    highs: Sequence[float], lows: Sequence[float], closes: Sequence[float], period: int = 14
+) -> Optional[float]:
+    period = max(1, int(period))
+    if len(closes) < period + 1:
+        return None
+    trs = true_ranges(highs, lows, closes)
+    atr = sum(trs[1 : period + 1]) / period
+    keep = period - 1
+    for tr in trs[period + 1 :]:
+        atr = (atr * keep + tr) / period
+    return atr
+
+
+def ema_series(closes: Sequence[float], period: int) -> List[float]:
+    if len(closes) < period:
+        return []
+    k = 2 / (period + 1)
+    decay = 1 - k
+    ema = closes[0]
+    out = [ema]
+    append = out.append
+    for price in closes[1:]:
+        ema = price * k + ema * decay
+        append(ema)
+    return out
+
+
+def ema_last(closes: Sequence[float], period: int) -> Optional[float]:
+    if len(closes) < period:
+        return None
+    k = 2 / (period + 1)
+    decay = 1 - k
+    ema = closes[0]
+    for price in closes[1:]:
+        ema = price * k + ema * decay
+    return ema
+
+
+# ---- multi-symbol kernels -------------------------------------------------
+# Each takes one column per symbol, all of the same length, and advances the
+# recursion for every symbol at once, one time step (row) at a time.
+
+
+def batch_ema_last(columns: Sequence[Sequence[float]], period: int) -> List[Optional[float]]:
+    if not columns:
+        return []
+    n = len(columns[0])
+    if n < period:
+        return [None] * len(columns)
+    k = 2 / (period + 1)
+    decay = 1 - k
+    rows = iter(zip(*columns))
+    emas = list(next(rows))
+    for row in rows:
+        emas = [price * k + ema * decay for price, ema in zip(row, emas)]
+    return emas
+
+
+def batch_rsi_last(columns: Sequence[Sequence[float]], period: int = 14) -> List[float]:
+    if not columns:
+        return []
+    period = max(1, int(period))
+    n = len(columns[0])
+    if n <= period + 1:
+        return [50.0] * len(columns)
+
+    rows = list(zip(*columns))
+    diffs = [list(map(sub, cur, prev)) for prev, cur in zip(rows[:-1], rows[1:])]
+    gain_sums = [0] * len(columns)
+    loss_sums = [0] * len(columns)
+    for row in diffs[:period]:
+        gain_sums = [s + (d if d > 0 else 0) for s, d in zip(gain_sums, row)]
+        loss_sums = [s + (-d if d < 0 else 0) for s, d in zip(loss_sums, row)]
+    avg_gains = [s / period for s in gain_sums]
+    avg_losses = [s / period for s in loss_sums]
+
+    keep = period - 1
+    for row in diffs[period:]:
+        avg_gains = [(g * keep + (d if d > 0 else 0)) / period for g, d in zip(avg_gains, row)]
+        avg_losses = [(l * keep + (-d if d < 0 else 0)) / period for l, d in zip(avg_losses, row)]
+    return [
+        100.0 if loss <= EPS else round(100 - 100 / (1 + gain / loss), 2)
+        for gain, loss in zip(avg_gains, avg_losses)
+    ]
+
+
+def batch_atr_last(
+    highs: Sequence[Sequence[float]],
+    lows: Sequence[Sequence[float]],
+    closes: Sequence[Sequence[float]],
+    period: int = 14,
+) -> List[Optional[float]]:
+    if not closes:
+        return []
+    period = max(1, int(period))
+    n = len(closes[0])
+    if n < period + 1:
+        return [None] * len(closes)
+
+    high_rows = list(zip(*highs))
+    low_rows = list(zip(*lows))
+    close_rows = list(zip(*closes))
+    tr_rows = [
+        [max(h - l, abs(h - pc), abs(l - pc)) for h, l, pc in zip(high_rows[i], low_rows[i], close_rows[i - 1])]
+        for i in range(1, n)
+    ]
+    sums = [0] * len(closes)
+    for row in tr_rows[:period]:
+        sums = [s + tr for s, tr in zip(sums, row)]
+    atrs = [s / period for s in sums]
+    keep = period - 1
+    for row in tr_rows[period:]:
+        atrs = [(atr * keep + tr) / period for atr, tr in zip(atrs, row)]
+    return atrs
@@ -0,0 +1,260 @@
+"""
+Closed klines persisted across restarts (klines.db, next to bot.db).
+
+Nothing here touches the disk on the asyncio loop: writes are queued to one
+background writer thread that batches them into a single commit, and reads
+run on a single reader thread. Each thread keeps one long-lived connection.
+"""
+
+import asyncio
+import json
+import os
+import queue
+import sqlite3
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from functools import partial
+from pathlib import Path
+from typing import Any, Callable, Optional, TypeVar
+
+from db_path import get_db_path
+from kline_store import interval_to_ms
+
+KLINES_DB_ENABLED = os.getenv("KLINES_DB_ENABLED", "1").strip().lower() in ("1", "true", "yes", "on")
+KLINES_DB_MAX_ROWS = int(os.getenv("KLINES_DB_MAX_ROWS", "1000"))
+# how long the writer keeps collecting saves before one commit
+KLINES_DB_FLUSH_SEC = float(os.getenv("KLINES_DB_FLUSH_SEC", "2"))
+_WRITE_BATCH_MAX = 5000
+
+T = TypeVar("T")
+
+
+def get_klines_db_path() -> str:
+    path = os.getenv("KLINES_DB_PATH")
+    if path:
+        return path
+    return str(Path(get_db_path()).with_name("klines.db"))
+
+
+def _connect() -> sqlite3.Connection:
+    conn = sqlite3.connect(get_klines_db_path(), timeout=5.0)
+    try:
+        conn.execute("PRAGMA journal_mode=WAL")
+        conn.execute("PRAGMA synchronous=NORMAL")
+    except sqlite3.Error:
+        pass
+    return conn
+
+
+def init_kline_db() -> None:
+    Path(get_klines_db_path()).parent.mkdir(parents=True, exist_ok=True)
+    conn = _connect()
+    try:
+        conn.execute(
+            """
+            CREATE TABLE IF NOT EXISTS klines (
+                symbol TEXT NOT NULL,
+                interval TEXT NOT NULL,
+                open_time INTEGER NOT NULL,
+                close_time INTEGER NOT NULL,
+                row_json TEXT NOT NULL,
+                PRIMARY KEY (symbol, interval, open_time)
+            ) WITHOUT ROWID
+            """
+        )
+        conn.commit()
+    finally:
+        conn.close()
+
+
+def _closed_rows(symbol: str, interval: str, rows: list, now_ms: int) -> list[tuple]:
+    # closed candles never change, so the forming candle is never written
+    return [
+        (symbol, interval, int(row[0]), int(row[6]), json.dumps(row, separators=(",", ":")))
+        for row in rows
+        if isinstance(row, (list, tuple)) and len(row) > 6 and int(row[6]) < now_ms
+    ]
+
+
+def _write_batch(conn: sqlite3.Connection, batch: list[tuple[str, str, list, int]]) -> int:
+    """Insert every queued save and trim each touched series, then commit once."""
+    inserted = 0
+    newest: dict[tuple[str, str], int] = {}
+    for symbol, interval, rows, now_ms in batch:
+        closed = _closed_rows(symbol, interval, rows, now_ms)
+        if not closed:
+            continue
+        cur = conn.executemany(
+            "INSERT OR IGNORE INTO klines(symbol, interval, open_time, close_time, row_json) VALUES(?,?,?,?,?)",
+            closed,
+        )
+        inserted += max(cur.rowcount, 0)
+        key = (symbol, interval)
+        newest[key] = max(newest.get(key, 0), max(item[2] for item in closed))
+    if KLINES_DB_MAX_ROWS > 0:
+        for (symbol, interval), open_time in newest.items():
+            interval_ms = interval_to_ms(interval)
+            if interval_ms > 0:
+                conn.execute(
+                    "DELETE FROM klines WHERE symbol=? AND interval=? AND open_time < ?",
+                    (symbol, interval, open_time - KLINES_DB_MAX_ROWS * interval_ms),
+                )
+    conn.commit()
+    return inserted
+
+
+class _KlineWriter:
+    """Single background thread that owns the write connection."""
+
+    def __init__(self) -> None:
+        self._queue: queue.Queue = queue.Queue()
+        self._thread: Optional[threading.Thread] = None
+        self._lock = threading.Lock()
+
+    def submit(self, symbol: str, interval: str, rows: list, now_ms: int) -> None:
+        with self._lock:
+            if self._thread is None or not self._thread.is_alive():
+                self._thread = threading.Thread(target=self._run, name="klines-db-writer", daemon=True)
+                self._thread.start()
+        self._queue.put((symbol, interval, rows, now_ms))
+
+    def close(self, timeout: float = 10.0) -> None:
+        with self._lock:
+            thread, self._thread = self._thread, None
+        if thread is not None and thread.is_alive():
+            self._queue.put(None)
+            thread.join(timeout)
+
+    def _run(self) -> None:
+        conn = _connect()
+        try:
+            stop = False
+            while not stop:
+                item = self._queue.get()
+                if item is None:
+                    break
+                batch = [item]
+                deadline = time.monotonic() + KLINES_DB_FLUSH_SEC
+                while len(batch) < _WRITE_BATCH_MAX:
+                    remaining = deadline - time.monotonic()
+                    try:
+                        item = self._queue.get(timeout=remaining) if remaining > 0 else self._queue.get_nowait()
+                    except queue.Empty:
+                        break
+                    if item is None:
+                        stop = True
+                        break
+                    batch.append(item)
+                try:
+                    _write_batch(conn, batch)
+                except sqlite3.Error as exc:
+                    conn.rollback()
+                    print(f"[kline_db] write failed ({len(batch)} saves): {exc}")
+        finally:
+            conn.close()
+
+
+_WRITER = _KlineWriter()
+_READ_EXECUTOR = ThreadPoolExecutor(max_workers=1, thread_name_prefix="klines-db-reader")
+# only touched on the reader thread
+_READER: Optional[sqlite3.Connection] = None
+
+
+def _reader() -> sqlite3.Connection:
+    global _READER
+    if _READER is None:
+        _READER = _connect()
+    return _READER
+
+
+def save_closed_klines(symbol: str, interval: str, rows: list, now_ms: int) -> None:
+    """Queue candles for the writer thread; only the already closed ones are stored."""
+    if rows:
+        _WRITER.submit(symbol, interval, list(rows), now_ms)
+
+
+def run_reader(fn: Callable[..., T], *args: Any) -> T:
+    """Run a read helper on the reader thread from synchronous code (startup)."""
+    return _READ_EXECUTOR.submit(fn, *args).result()
+
+
+async def run_reader_async(fn: Callable[..., T], *args: Any) -> T:
+    loop = asyncio.get_running_loop()
+    return await loop.run_in_executor(_READ_EXECUTOR, partial(fn, *args))
+
+
+def shutdown_kline_db() -> None:
+    """Flush queued writes and close both connections."""
+    _WRITER.close()
+
+    def _close_reader() -> None:
+        global _READER
+        if _READER is not None:
+            _READER.close()
+            _READER = None
+
+    _READ_EXECUTOR.submit(_close_reader).result()
+    _READ_EXECUTOR.shutdown(wait=True)
+
+
+def load_closed_range(symbol: str, interval: str, start_ms: int, limit: int) -> list:
+    """
+    Closed candles from start_ms on, cut at the first gap so callers only get
+    a contiguous run that matches what Binance would return for startTime.
+    """
+    interval_ms = interval_to_ms(interval)
+    if interval_ms <= 0 or limit <= 0:
+        return []
+    cur = _reader().execute(
+        """
+        SELECT open_time, row_json FROM klines
+        WHERE symbol=? AND interval=? AND open_time >= ?
+        ORDER BY open_time
+        LIMIT ?
+        """,
+        (symbol, interval, int(start_ms), int(limit)),
+    )
+    fetched = cur.fetchall()
+    if not fetched or fetched[0][0] - start_ms >= interval_ms:
+        return []
+    rows = []
+    expected = fetched[0][0]
+    for open_time, row_json in fetched:
+        if open_time != expected:
+            break
+        rows.append(json.loads(row_json))
+        expected = open_time + interval_ms
+    return rows
+
+
+def load_recent_series(per_series: int) -> dict[tuple[str, str], list]:
+    """Newest ``per_series`` closed candles of every stored (symbol, interval)."""
+    cur = _reader().execute(
+        """
+        SELECT symbol, interval, row_json FROM (
+            SELECT symbol, interval, open_time, row_json,
+                   ROW_NUMBER() OVER (
+                       PARTITION BY symbol, interval ORDER BY open_time DESC
+                   ) AS rn
+            FROM klines
+        )
+        WHERE rn <= ?
+        ORDER BY symbol, interval, open_time
+        """,
+        (int(per_series),),
+    )
+    series: dict[tuple[str, str], list] = {}
+    for symbol, interval, row_json in cur:
+        series.setdefault((symbol, interval), []).append(json.loads(row_json))
+    return {key: _contiguous_tail(rows, interval_to_ms(key[1])) for key, rows in series.items()}
+
+
+def _contiguous_tail(rows: list, interval_ms: int) -> list:
+    # a restart after downtime leaves a hole; only the run after it is usable
+    if interval_ms <= 0:
+        return rows
+    start = len(rows) - 1
+    while start > 0 and int(rows[start][0]) - int(rows[start - 1][0]) == interval_ms:
+        start -= 1
+    return rows[start:]
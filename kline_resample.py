@@ -0,0 +1,137 @@
+"""
+Higher-timeframe klines built locally from a lower-timeframe base series.
+
+Binance candles of every interval are aligned to the same UTC grid
+(kline_store.forming_open_ms), so a 15m/1h/4h/1d candle is exactly the
+aggregate of the 5m (or 1m) candles inside it: first open, max high, min
+low, last close and summed volumes/trades. Volumes are summed as Decimal,
+so the derived rows carry the same strings Binance would return.
+
+Only complete buckets are emitted, plus the trailing forming bucket; a
+bucket with a missing base candle is dropped rather than returned wrong.
+"""
+
+from __future__ import annotations
+
+from decimal import Decimal, InvalidOperation
+from typing import Sequence
+
+from kline_store import forming_open_ms, interval_to_ms
+
+# raw kline columns that are summed across the bucket
+_SUM_COLUMNS = (5, 7, 9, 10)
+_TRADES_COLUMN = 8
+
+
+def resample_ratio(base_interval: str, target_interval: str) -> int:
+    """Number of base candles per target candle, 0 when it cannot be derived."""
+    base_ms = interval_to_ms(base_interval)
+    target_ms = interval_to_ms(target_interval)
+    if base_ms <= 0 or target_ms <= base_ms or target_ms % base_ms:
+        return 0
+    if target_interval.strip().endswith("w"):
+        # weekly buckets start on Monday, which only day-or-smaller bases align to
+        if interval_to_ms("1d") % base_ms:
+            return 0
+    return target_ms // base_ms
+
+
+def _decimal_sum(values: list[str]) -> str:
+    try:
+        total = sum((Decimal(value) for value in values), Decimal(0))
+    except (InvalidOperation, TypeError):
+        return str(sum(float(value) for value in values))
+    places = max((len(value.split(".", 1)[1]) if "." in value else 0) for value in values)
+    return f"{total:.{places}f}"
+
+
+def _aggregate(bucket_open: int, target_ms: int, rows: list[list]) -> list:
+    first = rows[0]
+    out = list(first)
+    out[0] = bucket_open
+    out[2] = max((row[2] for row in rows), key=float)
+    out[3] = min((row[3] for row in rows), key=float)
+    out[4] = rows[-1][4]
+    if len(out) > 6:
+        out[6] = bucket_open + target_ms - 1
+    for idx in _SUM_COLUMNS:
+        if len(out) > idx:
+            out[idx] = _decimal_sum([str(row[idx]) for row in rows])
+    if len(out) > _TRADES_COLUMN:
+        out[_TRADES_COLUMN] = sum(int(row[_TRADES_COLUMN]) for row in rows)
+    return out
+
+
+def resample_klines(
+    rows: Sequence[list],
+    base_interval: str,
+    target_interval: str,
+    *,
+    now_ms: int,
+) -> list[list]:
+    """
+    Aggregate raw base klines (open_time order) into target_interval klines.
+
+    The last bucket is kept while incomplete only if it is the one forming at
+    now_ms, mirroring the forming candle Binance returns.
+    """
+    ratio = resample_ratio(base_interval, target_interval)
+    if ratio <= 0 or not rows:
+        return []
+    base_ms = interval_to_ms(base_interval)
+    target_ms = interval_to_ms(target_interval)
+    forming_bucket = forming_open_ms(target_interval, now_ms)
+
+    out: list[list] = []
+    bucket: list[list] = []
+    bucket_open: int | None = None
+
+    def _flush() -> None:
+        if bucket_open is None or not bucket:
+            return
+        complete = len(bucket) == ratio
+        if complete or bucket_open == forming_bucket:
+            out.append(_aggregate(bucket_open, target_ms, bucket))
+
+    for row in rows:
+        open_time = int(row[0])
+        row_bucket = forming_open_ms(target_interval, open_time)
+        if row_bucket != bucket_open:
+            _flush()
+            bucket = []
+            bucket_open = row_bucket
+        expected = bucket_open + len(bucket) * base_ms
+        if open_time != expected:
+            # gap inside the bucket: it can no longer be complete
+            bucket_open = None
+            bucket = []
+            continue
+        bucket.append(row)
+    _flush()
+    return out
+
+
+def base_limit_for(base_interval: str, target_interval: str, limit: int) -> int:
+    """Base candles needed for `limit` target candles, plus one bucket of alignment slack."""
+    ratio = resample_ratio(base_interval, target_interval)
+    return (limit + 1) * ratio if ratio > 0 else 0
+
+
+def klines_match(derived: Sequence[list], direct: Sequence[list]) -> bool:
+    """Closed-candle OHLCV equality, used to spot-check derived series against Binance."""
+    direct_by_open = {int(row[0]): row for row in direct}
+    compared = 0
+    for row in derived[:-1]:
+        other = direct_by_open.get(int(row[0]))
+        if other is None:
+            continue
+        for idx in (1, 2, 3, 4):
+            if float(row[idx]) != float(other[idx]):
+                return False
+        try:
+            if Decimal(str(row[5])) != Decimal(str(other[5])):
+                return False
+        except InvalidOperation:
+            return False
+        compared += 1
+    return compared > 0
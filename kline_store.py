@@ -0,0 +1,228 @@
+from __future__ import annotations
+
+import os
+import time
+from collections import deque
+from dataclasses import dataclass, field
+from typing import Optional
+
+from bounded_cache import BoundedCache, approx_size, env_bytes
+
+_INTERVAL_UNITS_MS = {"s": 1000, "m": 60_000, "h": 3_600_000, "d": 86_400_000, "w": 604_800_000}
+BINANCE_KLINES_MAX_LIMIT = 1000
+# Binance weekly candles open on Monday 00:00 UTC, the epoch was a Thursday
+_WEEK_OFFSET_MS = 4 * 86_400_000
+
+
+def interval_to_ms(interval: str) -> int:
+    interval = (interval or "").strip()
+    if len(interval) < 2:
+        return 0
+    unit = interval[-1]
+    if unit == "M":
+        return 0
+    multiplier = _INTERVAL_UNITS_MS.get(unit.lower())
+    if multiplier is None:
+        return 0
+    try:
+        return int(interval[:-1]) * multiplier
+    except ValueError:
+        return 0
+
+
+def forming_open_ms(interval: str, now_ms: int) -> int | None:
+    """
+    open_time of the candle forming at now_ms, i.e. the close of the last one.
+    None for intervals without a fixed length (1M).
+    """
+    interval_ms = interval_to_ms(interval)
+    if interval_ms <= 0:
+        return None
+    offset = _WEEK_OFFSET_MS if interval.strip().endswith("w") else 0
+    return (now_ms - offset) // interval_ms * interval_ms + offset
+
+
+def _env_int(name: str, default: int) -> int:
+    value = os.getenv(name)
+    if value is None:
+        return default
+    try:
+        return int(value)
+    except ValueError:
+        return default
+
+
+# a refresh this soon after a close may still see the closed candle changing
+KLINES_CLOSE_SETTLE_MS = _env_int("KLINES_CLOSE_SETTLE_MS", 1000)
+
+
+@dataclass
+class _KlineSeries:
+    rows: deque
+    refreshed_at: float = 0.0
+    # kept current by a live stream, so the TTL does not apply
+    live: bool = False
+
+
+@dataclass
+class KlineStore:
+    """
+    Ring buffer of raw Binance klines per (symbol, interval).
+
+    Candles are kept in open_time order. merge() appends only candles newer than
+    the last stored one and overwrites the last stored candle in place, because
+    that is the one that may still be forming.
+
+    Series live in a BoundedCache: least recently read series are dropped once
+    max_bytes is exceeded, and series not refreshed for ttl_sec expire.
+    """
+
+    capacity: int = 500
+    max_bytes: int = 0
+    ttl_sec: float = 0.0
+    _series: BoundedCache[tuple[str, str], _KlineSeries] = field(init=False, repr=False)
+
+    def __post_init__(self) -> None:
+        self._series = BoundedCache(
+            "klines",
+            max_bytes=self.max_bytes,
+            ttl_sec=self.ttl_sec,
+            sizeof=lambda series: approx_size(series.rows),
+        )
+
+    def get(self, key: tuple[str, str]) -> Optional[list]:
+        series = self._series.get(key)
+        if series is None or not series.rows:
+            return None
+        return list(series.rows)
+
+    def tail(self, key: tuple[str, str], limit: int) -> Optional[list]:
+        """Last `limit` stored candles without touching LRU order or hit stats."""
+        series = self._series.peek(key)
+        if series is None or not series.rows:
+            return None
+        return list(series.rows)[-limit:]
+
+    def size(self, key: tuple[str, str]) -> int:
+        series = self._series.peek(key)
+        return len(series.rows) if series is not None else 0
+
+    def refreshed_at(self, key: tuple[str, str]) -> float:
+        series = self._series.peek(key)
+        return series.refreshed_at if series is not None else 0.0
+
+    def is_live(self, key: tuple[str, str]) -> bool:
+        series = self._series.peek(key)
+        return bool(series is not None and series.live and series.rows)
+
+    def is_fresh(
+        self,
+        key: tuple[str, str],
+        now: float,
+        *,
+        forming_ttl: float | None,
+        fallback_ttl: float,
+    ) -> bool:
+        """
+        Whether the stored series can be served without a request.
+
+        Closed candles never change, so the series only goes stale when a
+        candle closes after its last refresh. forming_ttl=None means the
+        caller ignores the forming candle; otherwise that candle may be at
+        most forming_ttl seconds old.
+        """
+        series = self._series.peek(key)
+        if series is None or not series.rows:
+            return False
+        if series.live:
+            return True
+        boundary = forming_open_ms(key[1], int(now * 1000))
+        if boundary is None:
+            return now - series.refreshed_at < (fallback_ttl if forming_ttl is None else forming_ttl)
+        if series.refreshed_at * 1000 < boundary + KLINES_CLOSE_SETTLE_MS:
+            return False
+        if forming_ttl is None:
+            return True
+        return now - series.refreshed_at < forming_ttl
+
+    def set_live(self, key: tuple[str, str], live: bool) -> None:
+        series = self._series.peek(key)
+        if series is not None:
+            series.live = live
+
+    def last_open_time(self, key: tuple[str, str]) -> int | None:
+        series = self._series.peek(key)
+        if series is None or not series.rows:
+            return None
+        return int(series.rows[-1][0])
+
+    def plan_refresh(self, key: tuple[str, str], limit: int, now_ms: int) -> tuple[int, int] | None:
+        """
+        Return (start_ms, fetch_limit) for a delta request, or None when the
+        stored series cannot be topped up and a full window must be fetched.
+        """
+        series = self._series.peek(key)
+        if series is None or len(series.rows) < limit:
+            return None
+        interval_ms = interval_to_ms(key[1])
+        if interval_ms <= 0:
+            return None
+        last_open = int(series.rows[-1][0])
+        # +1 for the stored (possibly forming) candle that gets re-fetched
+        missing = max(0, (now_ms - last_open) // interval_ms) + 1
+        fetch_limit = missing + 1
+        if fetch_limit > min(self.capacity, BINANCE_KLINES_MAX_LIMIT):
+            return None
+        return last_open, fetch_limit
+
+    def replace(self, key: tuple[str, str], rows: list, now: float) -> None:
+        previous = self._series.peek(key)
+        live = previous.live if previous is not None else False
+        # idle TTL runs on wall time: warm starts store series with refreshed_at=0
+        self._series.set(key, _KlineSeries(deque(rows, maxlen=self.capacity), now, live), now=time.time())
+
+    def merge(self, key: tuple[str, str], rows: list, now: float) -> int:
+        """Merge fresh rows into the stored series, return number of appended candles."""
+        series = self._series.peek(key)
+        if series is None or not series.rows:
+            self.replace(key, rows, now)
+            return len(rows)
+        if not rows:
+            series.refreshed_at = now
+            self._series.resize(key, now=time.time())
+            return 0
+        interval_ms = interval_to_ms(key[1])
+        last_open = int(series.rows[-1][0])
+        first_open = int(rows[0][0])
+        if first_open <= int(series.rows[0][0]) or (
+            interval_ms > 0 and first_open > last_open + interval_ms
+        ):
+            # new window covers the stored one, or leaves a gap after it: start over
+            self.replace(key, rows, now)
+            return len(rows)
+        appended = 0
+        for row in rows:
+            open_time = int(row[0])
+            last_open = int(series.rows[-1][0])
+            if open_time == last_open:
+                series.rows[-1] = row
+            elif open_time > last_open:
+                series.rows.append(row)
+                appended += 1
+        series.refreshed_at = now
+        # appended rows grow the series and the refresh restarts its idle TTL
+        self._series.resize(key, now=time.time())
+        return appended
+
+    def drop(self, key: tuple[str, str]) -> None:
+        self._series.pop(key, None)
+
+    def stats(self) -> dict[str, int]:
+        return self._series.stats()
+
+
+KLINE_STORE = KlineStore(
+    capacity=_env_int("KLINES_STORE_CAPACITY", 500),
+    max_bytes=env_bytes("KLINES_CACHE_MAX_MB", 256),
+    ttl_sec=_env_int("KLINES_CACHE_IDLE_SEC", 2 * 86400),
+)
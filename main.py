@@ -10,7 +10,7 @@ import random
 import re
 from contextlib import suppress
 from datetime import datetime, timezone, timedelta
-from typing import Any, Dict, List, Awaitable
+from typing import Any, Dict, List, Awaitable, Callable
 
 from aiogram import Bot, Dispatcher, F
 from aiogram.client.default import DefaultBotProperties
@@ -30,8 +30,10 @@ from binance_rest import (
     close_shared_session,
     get_shared_session,
     get_binance_metrics_snapshot,
+    get_memory_cache_stats,
     reset_binance_metrics,
     fetch_klines,
+    warm_klines_cache,
 )
 from pump_detector import (
     MIN_VOLUME_5M_USDT,
@@ -43,6 +45,7 @@ from pump_detector import (
     PUMPDUMP_1M_LIMIT,
     PUMPDUMP_5M_INTERVAL,
     PUMPDUMP_5M_LIMIT,
+    PUMP_TRIGGER_EVALUATOR,
     format_pump_message,
     get_candidate_symbols,
     scan_pumps_chunk,
@@ -65,6 +68,8 @@ from signals import (
     apply_btc_soft_gate,
 )
 from config import cfg
+from signal_compute import shutdown_deep_executor
+from market_stream import MARKET_STREAM, MARKET_STREAM_ENABLED, market_stream_loop
 from symbol_cache import (
     filter_tradeable_symbols,
     get_all_usdt_symbols,
@@ -109,8 +114,9 @@ from db import (
     insert_signal_event,
     list_signal_events,
     list_signal_events_by_identity,
-    get_signal_history,
-    count_signal_history,
+    list_signal_history_page,
+    list_signal_history_outcomes,
+    count_signal_history_page,
     list_open_signal_events,
     count_signal_events,
     get_signal_outcome_counts,
@@ -146,7 +152,26 @@ from db_path import ensure_db_writable, get_db_path
 from history_status import get_signal_badge, get_signal_status_key
 from market_cache import get_spot_24h, get_ticker_request_count, reset_ticker_request_count
 from btc_context import get_btc_regime
+from indicators_cache import get_indicator_cache_stats
 from alert_dedup_db import init_alert_dedup, can_send
+from db_pool import DB_POOL, run_db, shutdown_db_pool
+from kline_db import shutdown_kline_db
+from telegram_delivery import TELEGRAM_DELIVERY, DeliveryThrottle
+from render_cache import RenderCache, RenderedMessage
+from broadcast_recipients import (
+    STATUS_BUCKET_OFF,
+    STATUS_DEDUP,
+    STATUS_INVALID,
+    STATUS_LOCKED,
+    STATUS_NOTIFICATIONS_OFF,
+    STATUS_PAYWALL,
+    STATUS_SEND,
+    STATUS_TRIAL_EXHAUSTED,
+    record_pumpdump_deliveries,
+    resolve_ai_recipients,
+    resolve_pumpdump_recipients,
+    resolve_signal_event_recipients,
+)
 from status_utils import is_notify_enabled
 from message_templates import (
     format_signal_poi_touched_message,
@@ -160,6 +185,7 @@ from signal_audit_db import (
     count_signals_sent_since,
     init_signal_audit_tables,
     insert_signal_audit,
+    rebuild_signal_stats,
 )
 from signal_audit_worker import (
     signal_audit_worker_loop,
@@ -825,7 +851,8 @@ def _save_pump_message_state(
     expanded_text: str,
     lang: str,
     symbol: str,
-) -> None:
+    persist: bool = True,
+) -> dict[str, Any]:
     _pump_state_cleanup()
     state = {
         "ts": int(time.time()),
@@ -836,12 +863,14 @@ def _save_pump_message_state(
         "symbol": str(symbol or ""),
     }
     _PUMP_MESSAGE_STATE[(int(chat_id), int(message_id))] = state
-    _persist_toggle_state(
-        prefix=_PUMP_TOGGLE_STATE_KEY_PREFIX,
-        chat_id=chat_id,
-        message_id=message_id,
-        state=state,
-    )
+    if persist:
+        _persist_toggle_state(
+            prefix=_PUMP_TOGGLE_STATE_KEY_PREFIX,
+            chat_id=chat_id,
+            message_id=message_id,
+            state=state,
+        )
+    return state
 
 
 def _get_pump_message_state(chat_id: int, message_id: int) -> dict[str, Any] | None:
@@ -1169,7 +1198,7 @@ def _clean_lang(lang: str | None) -> str | None:
 
 
 def get_user_lang(chat_id: int) -> str | None:
-    conn = sqlite3.connect(get_db_path())
+    conn = DB_POOL.reader()
     try:
         cur = conn.execute("SELECT language FROM users WHERE chat_id = ?", (chat_id,))
         row = cur.fetchone()
@@ -1279,7 +1308,7 @@ def list_ai_subscribers() -> List[int]:
     subs = set(list_user_ids_with_pref("ai_signals_enabled", 1))
 
     # legacy fallback (не мешает после миграции)
-    conn = sqlite3.connect(get_db_path())
+    conn = DB_POOL.reader()
     try:
         cur = conn.cursor()
         try:
@@ -1439,7 +1468,27 @@ async def lang_select_callback(callback: CallbackQuery):
         )
 
 
-@dp.message(F.text.in_(i18n.all_labels("MENU_AI")))
+# обработчики кнопок reply-клавиатуры: ключ i18n -> handler
+_MENU_BUTTON_HANDLERS: dict[str, Callable[[Message], Awaitable[Any]]] = {}
+
+
+def menu_button(key: str):
+    """Register a reply-keyboard button handler, routed by menu_button_dispatch."""
+
+    def decorator(handler: Callable[[Message], Awaitable[Any]]):
+        i18n.register_labels(key)
+        _MENU_BUTTON_HANDLERS[key] = handler
+        return handler
+
+    return decorator
+
+
+@dp.message(F.text.func(lambda text: i18n.label_key(text) is not None))
+async def menu_button_dispatch(message: Message):
+    await _MENU_BUTTON_HANDLERS[i18n.label_key(message.text)](message)
+
+
+@menu_button("MENU_AI")
 async def ai_signals_menu(message: Message):
     lang = _resolve_user_lang(message.chat.id)
     status = (
@@ -1453,7 +1502,7 @@ async def ai_signals_menu(message: Message):
     )
 
 
-@dp.message(F.text.in_(i18n.all_labels("MENU_PD")))
+@menu_button("MENU_PD")
 async def pumpdump_menu(message: Message):
     lang = _resolve_user_lang(message.chat.id)
     status = (
@@ -1951,6 +2000,10 @@ def _format_signal_list_row(
     return row_text
 
 
+# (module, window, include_legacy, total, page) -> (created_at, id) последней строки страницы
+_HISTORY_PAGE_CURSORS: dict[tuple[str, str, bool, int, int], tuple[int, int]] = {}
+
+
 def _get_history_page(
     *,
     time_window: str,
@@ -1960,40 +2013,43 @@ def _get_history_page(
     include_legacy: bool = False,
     module: str = "ai_signals",
 ) -> tuple[int, int, int, list[dict]]:
-    raw_total = count_signal_history(
-        time_window=time_window,
-        user_id=viewer_user_id,
-        min_score=None,
-        include_legacy=include_legacy,
+    # история общая для всех пользователей (viewer_user_id оставлен для совместимости)
+    total = count_signal_history_page(
+        time_window,
         module=module,
+        include_legacy=include_legacy,
     )
-
-    if raw_total <= 0:
+    if total <= 0:
         return 1, 1, 0, []
 
-    # Сначала получаем весь отфильтрованный срез за период,
-    # затем применяем то же дедуп-правило, что и для отображения кнопок.
-    all_rows = [
+    pages = max(1, (total + page_size - 1) // page_size)
+    page_value = max(1, min(page, pages))
+    cursor_key = (module, time_window, include_legacy, total)
+    before = _HISTORY_PAGE_CURSORS.get((*cursor_key, page_value - 1)) if page_value > 1 else None
+    page_rows = [
         dict(row)
-        for row in get_signal_history(
-            time_window=time_window,
-            user_id=viewer_user_id,
-            limit=raw_total,
-            offset=0,
-            include_legacy=include_legacy,
+        for row in list_signal_history_page(
+            time_window,
             module=module,
+            include_legacy=include_legacy,
+            limit=page_size,
+            before=before,
+            offset=(page_value - 1) * page_size,
         )
     ]
-    deduped_rows = _dedupe_signals(all_rows)
-    total = len(deduped_rows)
-    pages = max(1, (total + page_size - 1) // page_size)
-    page_value = max(1, min(page, pages))
-    offset = (page_value - 1) * page_size
-    page_rows = deduped_rows[offset : offset + page_size]
+    if page_rows:
+        if len(_HISTORY_PAGE_CURSORS) > 1000:
+            _HISTORY_PAGE_CURSORS.clear()
+        last = page_rows[-1]
+        _HISTORY_PAGE_CURSORS[(*cursor_key, page_value)] = (
+            _safe_int(last.get("created_at"), 0),
+            _safe_int(last.get("id"), 0),
+        )
     return page_value, pages, total, page_rows
 
 
-def _history_summary_from_rows(rows: list[dict[str, Any]]) -> dict[str, Any]:
+def _history_summary_from_outcomes(rows: list[dict[str, Any]]) -> dict[str, Any]:
+    """Summary over the score >= 80 outcome groups of list_signal_history_outcomes."""
     totals = {
         "tp": 0,
         "be": 0,
@@ -2006,31 +2062,28 @@ def _history_summary_from_rows(rows: list[dict[str, Any]]) -> dict[str, Any]:
     be_level_count = 0
 
     for row in rows:
-        score = _safe_int(row.get("score"), 0)
-        if score < 80:
-            continue
+        count = _safe_int(row.get("count"), 0)
 
         status_label = _signal_list_status_label(row)
         icon = _history_row_icon(row)
 
         if status_label == "TP":
-            totals["tp"] += 1
+            totals["tp"] += count
         elif status_label == "BE":
-            totals["be"] += 1
+            totals["be"] += count
             try:
-                raw_be_level = float(row.get("be_level_pct") or 0.0)
-                be_level_sum += raw_be_level if raw_be_level > 0 else 8.0
-                be_level_count += 1
+                be_level_sum += float(row.get("be_level_sum") or 0.0)
+                be_level_count += count
             except (TypeError, ValueError):
                 pass
         elif status_label == "SL":
-            totals["sl"] += 1
+            totals["sl"] += count
         elif status_label == "EXP":
-            totals["expired_no_entry"] += 1
+            totals["expired_no_entry"] += count
         elif icon == "🔵":
-            totals["no_confirmation"] += 1
+            totals["no_confirmation"] += count
         else:
-            totals["in_progress"] += 1
+            totals["in_progress"] += count
 
     trades = totals["tp"] + totals["be"] + totals["sl"]
     winrate = round(((totals["tp"] + totals["be"]) / trades) * 100.0, 1) if trades else None
@@ -2296,25 +2349,15 @@ async def _render_history(*, callback: CallbackQuery, time_window: str, page: in
             include_legacy=include_legacy,
             module=module,
         )
-        raw_total = count_signal_history(
-            time_window=time_window,
-            user_id=None,
-            min_score=None,
-            include_legacy=include_legacy,
-            module=module,
-        )
-        all_rows = [
+        outcomes = [
             dict(row)
-            for row in get_signal_history(
-                time_window=time_window,
-                user_id=None,
-                limit=raw_total,
-                offset=0,
-                include_legacy=include_legacy,
+            for row in list_signal_history_outcomes(
+                time_window,
                 module=module,
+                include_legacy=include_legacy,
             )
         ]
-        history_summary = _history_summary_from_rows(_dedupe_signals(all_rows))
+        history_summary = _history_summary_from_outcomes(outcomes)
     else:
         page_size = 12
         total = count_pumpdump_history(time_window=time_window)
@@ -2722,7 +2765,8 @@ async def notify_signal_activation(signal: dict) -> bool:
     if entry_price <= 0:
         return False
 
-    updated_rows = activate_signal_events(
+    updated_rows = await run_db(
+        activate_signal_events,
         module=module,
         symbol=symbol,
         ts=ts_value,
@@ -2734,24 +2778,11 @@ async def notify_signal_activation(signal: dict) -> bool:
 
     _ = await _ai_public_on_activation(signal)
 
-    events = list_signal_events_by_identity(module=module, symbol=symbol, ts=ts_value)
+    events = await run_db(list_signal_events_by_identity, module=module, symbol=symbol, ts=ts_value)
     if not events:
         return False
 
-    sent = False
-    for row in events:
-        event = dict(row)
-        if str(event.get("status", "")).upper() != "ACTIVE":
-            continue
-        user_id = int(event.get("user_id", 0))
-        if user_id <= 0:
-            continue
-        if is_user_locked(user_id) or not is_sub_active(user_id):
-            continue
-        if not is_notify_enabled(user_id, "ai_signals"):
-            continue
-
-        lang = _resolve_user_lang(user_id)
+    def _render(lang: str, _variant: Any) -> RenderedMessage:
         message_text = format_signal_activation_message(
             lang=lang,
             symbol=symbol,
@@ -2765,17 +2796,35 @@ async def notify_signal_activation(signal: dict) -> bool:
             market_direction=signal.get("btc_direction"),
             market_trend=signal.get("btc_trend"),
         )
+        return RenderedMessage(
+            message_text,
+            message_text,
+            InlineKeyboardMarkup(inline_keyboard=[[build_binance_button(lang, symbol)]]),
+        )
+
+    renders = RenderCache(_render)
+    user_ids = [
+        int(dict(row).get("user_id", 0))
+        for row in events
+        if str(dict(row).get("status", "")).upper() == "ACTIVE"
+    ]
+    decisions = await run_db(resolve_signal_event_recipients, user_ids)
+    sent = False
+    for decision in decisions:
+        if decision.status != STATUS_SEND:
+            continue
+        user_id = decision.chat_id
+        message = renders.get(_clean_lang(decision.language) or "ru")
         try:
             await bot.send_message(
                 user_id,
-                message_text,
+                message.text,
                 disable_notification=_disable_notification_for_event(
                     user_id=user_id,
                     event_type="ACTIVE_CONFIRMED",
+                    sound_entry_enabled=decision.sound_entry_enabled,
                 ),
-                reply_markup=InlineKeyboardMarkup(
-                    inline_keyboard=[[build_binance_button(lang, symbol)]],
-                ),
+                reply_markup=message.reply_markup,
             )
             sent = True
         except Exception as exc:
@@ -2795,7 +2844,8 @@ async def notify_signal_poi_touched(signal: dict) -> bool:
         return False
 
     touched_at = int(signal.get("poi_touched_at") or time.time())
-    updated_rows = mark_signal_events_poi_touched(
+    updated_rows = await run_db(
+        mark_signal_events_poi_touched,
         module=module,
         symbol=symbol,
         ts=ts_value,
@@ -2804,23 +2854,11 @@ async def notify_signal_poi_touched(signal: dict) -> bool:
     if updated_rows <= 0:
         return False
 
-    events = list_signal_events_by_identity(module=module, symbol=symbol, ts=ts_value)
+    events = await run_db(list_signal_events_by_identity, module=module, symbol=symbol, ts=ts_value)
     if not events:
         return False
 
-    sent = False
-    for row in events:
-        event = dict(row)
-        if str(event.get("state", "")).upper() != "POI_TOUCHED":
-            continue
-        user_id = int(event.get("user_id", 0))
-        if user_id <= 0:
-            continue
-        if is_user_locked(user_id) or not is_sub_active(user_id):
-            continue
-        if not is_notify_enabled(user_id, "ai_signals"):
-            continue
-        lang = _resolve_user_lang(user_id)
+    def _render(lang: str, _variant: Any) -> RenderedMessage:
         message_text = format_signal_poi_touched_message(
             lang=lang,
             symbol=symbol,
@@ -2832,17 +2870,35 @@ async def notify_signal_poi_touched(signal: dict) -> bool:
             market_direction=signal.get("btc_direction"),
             market_trend=signal.get("btc_trend"),
         )
+        return RenderedMessage(
+            message_text,
+            message_text,
+            InlineKeyboardMarkup(inline_keyboard=[[build_binance_button(lang, symbol)]]),
+        )
+
+    renders = RenderCache(_render)
+    user_ids = [
+        int(dict(row).get("user_id", 0))
+        for row in events
+        if str(dict(row).get("state", "")).upper() == "POI_TOUCHED"
+    ]
+    decisions = await run_db(resolve_signal_event_recipients, user_ids)
+    sent = False
+    for decision in decisions:
+        if decision.status != STATUS_SEND:
+            continue
+        user_id = decision.chat_id
+        message = renders.get(_clean_lang(decision.language) or "ru")
         try:
             await bot.send_message(
                 user_id,
-                message_text,
+                message.text,
                 disable_notification=_disable_notification_for_event(
                     user_id=user_id,
                     event_type="POI_TOUCHED",
+                    sound_entry_enabled=decision.sound_entry_enabled,
                 ),
-                reply_markup=InlineKeyboardMarkup(
-                    inline_keyboard=[[build_binance_button(lang, symbol)]],
-                ),
+                reply_markup=message.reply_markup,
             )
             sent = True
         except Exception as exc:
@@ -2867,55 +2923,58 @@ async def notify_signal_progress(signal: dict, event_type: str) -> bool:
     if not module or not symbol or ts_value <= 0:
         return False
 
-    events = list_signal_events_by_identity(module=module, symbol=symbol, ts=ts_value)
+    events = await run_db(list_signal_events_by_identity, module=module, symbol=symbol, ts=ts_value)
     if not events:
         return False
 
-    sent = False
-    for row in events:
-        event = dict(row)
-        user_id = int(event.get("user_id", 0))
-        if user_id <= 0:
-            continue
-        if is_user_locked(user_id) or not is_sub_active(user_id):
-            continue
-        if not is_notify_enabled(user_id, "ai_signals"):
-            continue
-
-        lang = _resolve_user_lang(user_id)
-        side = str(signal.get("direction", "")).upper()
-        try:
-            if normalized == "BE_ACTIVATED":
-                be_trigger_price = float(signal.get("be_trigger_price") or 0.0)
-                max_profit_pct = float(signal.get("max_profit_pct") or 0.0)
-                entry_price = float(signal.get("entry_price") or 0.0)
-                title_key = "SIGNAL_BE_TRIGGERED_HEADER"
-                be_level_pct = float(signal.get("be_level_pct") or 8.0)
-                message_lines = [
-                    i18n.t(lang, title_key),
+    side = str(signal.get("direction", "")).upper()
+
+    def _render(lang: str, _variant: Any) -> RenderedMessage:
+        if normalized == "BE_ACTIVATED":
+            be_trigger_price = float(signal.get("be_trigger_price") or 0.0)
+            max_profit_pct = float(signal.get("max_profit_pct") or 0.0)
+            entry_price = float(signal.get("entry_price") or 0.0)
+            title_key = "SIGNAL_BE_TRIGGERED_HEADER"
+            be_level_pct = float(signal.get("be_level_pct") or 8.0)
+            message_lines = [
+                i18n.t(lang, title_key),
+                "",
+                f"{ui_symbol(symbol)} {side}",
+                i18n.t(lang, "SIGNAL_RESULT_ENTRY_LINE", entry=_format_price(entry_price)) if entry_price > 0 else "",
+                i18n.t(lang, "SIGNAL_BE_LEVEL_LINE", level=f"{be_level_pct:.0f}", price=_format_price(be_trigger_price)) if be_trigger_price > 0 else i18n.t(lang, "SIGNAL_BE_LEVEL_ONLY_LINE", level=f"{be_level_pct:.0f}"),
+                i18n.t(lang, "SIGNAL_BE_MAX_PNL_LINE", pnl=f"{max_profit_pct:.2f}"),
+                i18n.t(lang, "SIGNAL_RESULT_SCORE_LINE", score=int(signal.get("score", 0))),
+            ]
+            message_text = "\n".join([line for line in message_lines if line])
+        else:
+            message_text = "\n".join(
+                [
+                    i18n.t(lang, "SIGNAL_PROGRESS_TP1_HEADER"),
                     "",
                     f"{ui_symbol(symbol)} {side}",
-                    i18n.t(lang, "SIGNAL_RESULT_ENTRY_LINE", entry=_format_price(entry_price)) if entry_price > 0 else "",
-                    i18n.t(lang, "SIGNAL_BE_LEVEL_LINE", level=f"{be_level_pct:.0f}", price=_format_price(be_trigger_price)) if be_trigger_price > 0 else i18n.t(lang, "SIGNAL_BE_LEVEL_ONLY_LINE", level=f"{be_level_pct:.0f}"),
-                    i18n.t(lang, "SIGNAL_BE_MAX_PNL_LINE", pnl=f"{max_profit_pct:.2f}"),
-                    i18n.t(lang, "SIGNAL_RESULT_SCORE_LINE", score=int(signal.get("score", 0))),
                 ]
-                message_text = "\n".join([line for line in message_lines if line])
-            else:
-                message_text = "\n".join(
-                    [
-                        i18n.t(lang, "SIGNAL_PROGRESS_TP1_HEADER"),
-                        "",
-                        f"{ui_symbol(symbol)} {side}",
-                    ]
-                )
+            )
+        return RenderedMessage(
+            message_text,
+            message_text,
+            InlineKeyboardMarkup(inline_keyboard=[[build_binance_button(lang, symbol)]]),
+        )
+
+    renders = RenderCache(_render)
+    user_ids = [int(dict(row).get("user_id", 0)) for row in events]
+    decisions = await run_db(resolve_signal_event_recipients, user_ids)
+    sent = False
+    for decision in decisions:
+        if decision.status != STATUS_SEND:
+            continue
+        user_id = decision.chat_id
+        try:
+            message = renders.get(_clean_lang(decision.language) or "ru")
             await bot.send_message(
                 user_id,
-                message_text,
+                message.text,
                 disable_notification=False,
-                reply_markup=InlineKeyboardMarkup(
-                    inline_keyboard=[[build_binance_button(lang, symbol)]],
-                ),
+                reply_markup=message.reply_markup,
             )
             sent = True
         except Exception as exc:
@@ -3505,7 +3564,7 @@ def _format_archive_detail_view(event: dict, lang: str, *, expanded: bool, acces
     return "\n".join(compact_lines)
 
 
-@dp.message(F.text.in_(i18n.all_labels("MENU_STATS")))
+@menu_button("MENU_STATS")
 async def stats_menu(message: Message):
     lang = _resolve_user_lang(message.chat.id)
     await message.answer(
@@ -5371,7 +5430,7 @@ async def test_admin(message: Message):
     )
 
 
-@dp.message(F.text.in_(i18n.all_labels("SYS_DIAG_ADMIN")))
+@menu_button("SYS_DIAG_ADMIN")
 async def test_admin_button(message: Message):
     lang = get_user_lang(message.chat.id) or "ru"
     if message.from_user is None or not is_admin(message.from_user.id):
@@ -5380,7 +5439,7 @@ async def test_admin_button(message: Message):
     await test_admin(message)
 
 
-@dp.message(F.text.in_(i18n.all_labels("SYS_CHANNEL_PANEL")))
+@menu_button("SYS_CHANNEL_PANEL")
 async def admin_channel_panel_entry(message: Message):
     lang = get_user_lang(message.chat.id) or "ru"
     if message.from_user is None or not is_admin(message.from_user.id):
@@ -5392,7 +5451,7 @@ async def admin_channel_panel_entry(message: Message):
     )
 
 
-@dp.message(F.text.in_(i18n.all_labels("SYS_TEST_AI")))
+@menu_button("SYS_TEST_AI")
 async def test_ai_signal_all(message: Message):
     lang = get_user_lang(message.chat.id) or "ru"
     if message.from_user is None or not is_admin(message.from_user.id):
@@ -5436,7 +5495,7 @@ async def test_ai_signal_all(message: Message):
 
 
 
-@dp.message(F.text.in_(i18n.all_labels("SYS_TEST_PD")))
+@menu_button("SYS_TEST_PD")
 async def test_pumpdump_signal_all(message: Message):
     lang = get_user_lang(message.chat.id) or "ru"
     if message.from_user is None or not is_admin(message.from_user.id):
@@ -5509,6 +5568,16 @@ async def purge_tests_cmd(message: Message):
     await message.answer(i18n.t(lang, "PURGE_TESTS_DONE", removed=removed))
 
 
+@dp.message(Command("rebuild_stats"))
+async def rebuild_stats_cmd(message: Message):
+    lang = get_user_lang(message.chat.id) or "ru"
+    if message.from_user is None or not is_admin(message.from_user.id):
+        await message.answer(i18n.t(lang, "NO_ACCESS"))
+        return
+    rows = await run_db(rebuild_signal_stats)
+    await message.answer(i18n.t(lang, "REBUILD_STATS_DONE", rows=rows))
+
+
 @dp.message(Command("purge"))
 async def purge_symbol_cmd(message: Message):
     lang = get_user_lang(message.chat.id) or "ru"
@@ -5788,20 +5857,22 @@ async def status_cmd(message: Message):
     await message.answer(_format_user_bot_status(message.chat.id))
 
 
-@dp.message(F.text.in_(i18n.all_labels("MENU_SYSTEM")))
+@menu_button("MENU_SYSTEM")
 async def system_menu(message: Message):
     await show_system_menu(message)
 
 
+_INVERSION_TOGGLE_LABELS = frozenset(
+    i18n.t(lang, "INVERSION_TOGGLE_BUTTON", state=i18n.t(lang, state_key))
+    for lang in ("ru", "en")
+    for state_key in ("INVERSION_STATE_ON", "INVERSION_STATE_OFF")
+)
+
+
 def _is_inversion_toggle_text(text: str | None) -> bool:
     if not isinstance(text, str):
         return False
-    return text in {
-        i18n.t("ru", "INVERSION_TOGGLE_BUTTON", state=i18n.t("ru", "INVERSION_STATE_ON")),
-        i18n.t("ru", "INVERSION_TOGGLE_BUTTON", state=i18n.t("ru", "INVERSION_STATE_OFF")),
-        i18n.t("en", "INVERSION_TOGGLE_BUTTON", state=i18n.t("en", "INVERSION_STATE_ON")),
-        i18n.t("en", "INVERSION_TOGGLE_BUTTON", state=i18n.t("en", "INVERSION_STATE_OFF")),
-    }
+    return text in _INVERSION_TOGGLE_LABELS
 
 
 @dp.message(F.text.func(_is_inversion_toggle_text))
@@ -5908,7 +5979,7 @@ def _build_sys_how_bot_works_payload(lang: str, expanded: bool) -> tuple[str, In
     return text, markup
 
 
-@dp.message(F.text.in_(i18n.all_labels("SYS_HOW_BOT_WORKS")))
+@menu_button("SYS_HOW_BOT_WORKS")
 async def system_how_bot_works(message: Message):
     lang = get_user_lang(message.chat.id) or "ru"
     text, inline_markup = _build_sys_how_bot_works_payload(lang, expanded=False)
@@ -5937,7 +6008,7 @@ async def about_collapse_callback(callback: CallbackQuery) -> None:
         await callback.message.edit_text(text, reply_markup=inline_markup)
 
 
-@dp.message(F.text.in_(i18n.all_labels("SYS_PAY")))
+@menu_button("SYS_PAY")
 async def subscription_offer_message(message: Message):
     if message.from_user is None:
         return
@@ -6267,7 +6338,7 @@ async def admin_channel_test_callback(callback: CallbackQuery):
     await callback.answer(f"❌ Ошибка отправки: {short_reason}", show_alert=True)
 
 
-@dp.message(F.text.in_(i18n.all_labels("SYS_USERS")))
+@menu_button("SYS_USERS")
 async def users_list(message: Message):
     if message.from_user is None or not is_admin(message.from_user.id):
         return
@@ -6465,7 +6536,7 @@ async def user_delete_callback(callback: CallbackQuery):
     await callback.message.edit_text(text, reply_markup=markup)
 
 
-@dp.message(F.text.in_(i18n.all_labels("SYS_STATUS")))
+@menu_button("SYS_STATUS")
 async def status_button(message: Message):
     is_admin_user = is_admin(message.from_user.id) if message.from_user else False
     await message.answer(
@@ -6478,7 +6549,7 @@ async def status_button(message: Message):
     )
 
 
-@dp.message(F.text.in_(i18n.all_labels("SYS_DIAG")))
+@menu_button("SYS_DIAG")
 async def diagnostics_button(message: Message):
     is_admin_user = is_admin(message.from_user.id) if message.from_user else False
     await message.answer(
@@ -6768,10 +6839,17 @@ def _is_signal_entry_sound_enabled(user_id: int) -> bool:
     return bool(get_user_pref(user_id, "sound_signal_entry_enabled", 1))
 
 
-def _disable_notification_for_event(*, user_id: int, event_type: str) -> bool:
+def _disable_notification_for_event(
+    *,
+    user_id: int,
+    event_type: str,
+    sound_entry_enabled: bool | None = None,
+) -> bool:
     normalized_event = _normalize_signal_status(str(event_type or "").upper())
     if normalized_event in LOUD_NOTIFICATION_EVENTS:
-        return not _is_signal_entry_sound_enabled(user_id)
+        if sound_entry_enabled is None:
+            sound_entry_enabled = _is_signal_entry_sound_enabled(user_id)
+        return not sound_entry_enabled
     if normalized_event in LOUD_CLOSE_EVENTS:
         return False
     if normalized_event in SILENT_CLOSE_EVENTS:
@@ -7212,7 +7290,7 @@ async def send_signal_to_all(
 
     skipped_dedup = 0
     skipped_no_subs = 0
-    subscribers = list(list_ai_subscribers())
+    subscribers = list(await run_db(list_ai_subscribers))
     meta = signal_dict.get("meta") if isinstance(signal_dict, dict) else {}
     is_test = bool(signal_dict.get("is_test") or (isinstance(meta, dict) and meta.get("test")))
     effective_bypass_cooldown = bypass_cooldown or is_test
@@ -7241,7 +7319,8 @@ async def send_signal_to_all(
     except (TypeError, ValueError):
         lifecycle_ts = 0
     sent_at = lifecycle_ts if lifecycle_ts > 0 else int(time.time())
-    insert_signal_audit(
+    await run_db(
+        insert_signal_audit,
         _strip_runtime_signal_fields(signal_dict),
         tier="free",
         module="ai_signals",
@@ -7279,6 +7358,7 @@ async def send_signal_to_all(
         reply_markup: InlineKeyboardMarkup | None = None,
         disable_web_page_preview: bool | None = None,
         parse_mode: str | None = None,
+        sound_entry_enabled: bool = True,
     ):
         send_kwargs: dict[str, Any] = {}
         if reply_markup is not None:
@@ -7288,6 +7368,7 @@ async def send_signal_to_all(
         send_kwargs["disable_notification"] = _disable_notification_for_event(
             user_id=target_chat_id,
             event_type=event_type,
+            sound_entry_enabled=sound_entry_enabled,
         )
         send_kwargs["parse_mode"] = parse_mode
         try:
@@ -7301,8 +7382,76 @@ async def send_signal_to_all(
             send_kwargs["parse_mode"] = None
             return await bot.send_message(target_chat_id, text, **send_kwargs)
 
-    for chat_id in recipients:
-        if chat_id <= 0:
+    signal_score_value = int(round(float(signal_dict.get("score", 0) or 0)))
+    is_regular_bucket = signal_score_value < 90
+    bucket_pref_key = _alerts_pref_key_for_bucket(_alerts_bucket_from_score(signal_score_value))
+    decisions = await run_db(
+        resolve_ai_recipients,
+        recipients,
+        admin_chat_id=admin_chat_id,
+        full_access_ids={chat_id for chat_id in recipients if allow_admin_bypass and is_admin(chat_id)},
+        bucket_pref_key=bucket_pref_key,
+        dedup_feature="ai_signals",
+        dedup_key=dedup_key,
+        cooldown_sec=None if effective_bypass_cooldown else COOLDOWN_FREE_SEC,
+        check_access=not is_test,
+        paywall_cooldown_sec=PAYWALL_COOLDOWN_SEC,
+    )
+
+    def _record_error(chat_id: int, exc: BaseException, label: str) -> None:
+        stats["errors"] += 1
+        sample = {
+            "user_id": chat_id,
+            "chat_id": chat_id,
+            "error_class": exc.__class__.__name__,
+            "error_text": str(exc),
+        }
+        if len(stats["error_samples"]) < 5:
+            stats["error_samples"].append(sample)
+        print(
+            f"[{log_tag}] error user_id={chat_id} chat_id={chat_id} "
+            f"err={exc.__class__.__name__}: {exc}"
+        )
+        logger.error(f"[{log_tag}] {label} user_id=%s chat_id=%s", chat_id, chat_id, exc_info=exc)
+
+    signal_parse_mode = None if is_test else "HTML"
+    paywall_parse_mode = None if is_test else "HTML"
+    def _render(lang: str, variant: str) -> RenderedMessage:
+        if variant == "test":
+            text = build_test_ai_signal(lang)
+            return RenderedMessage(text, text)
+        if variant == "paywall":
+            text = _build_ai_paywall_preview(signal_dict, lang)
+            return RenderedMessage(text, text, _subscription_kb_for("ai", lang))
+        try:
+            collapsed_text, expanded_text = _build_signal_text_variants(
+                signal_dict,
+                lang,
+                is_admin_user=variant == "admin",
+            )
+        except Exception:
+            fallback_symbol = _signal_symbol_text(str(signal_dict.get("symbol") or ""))
+            fallback_side = (
+                i18n.t(lang, "SIGNAL_SHORT_SIDE_LONG")
+                if str(signal_dict.get("direction") or "").lower() == "long"
+                else i18n.t(lang, "SIGNAL_SHORT_SIDE_SHORT")
+            )
+            collapsed_text = i18n.t(
+                lang,
+                "SIGNAL_SHORT_SYMBOL_SIDE_LINE",
+                symbol=fallback_symbol,
+                side=fallback_side,
+            )
+            expanded_text = collapsed_text
+        return RenderedMessage(collapsed_text, expanded_text)
+
+    # текст и клавиатура собираются один раз на (язык, вариант), а не на каждого получателя
+    renders = RenderCache(_render)
+
+    jobs: list[dict[str, Any]] = []
+    for decision in decisions:
+        chat_id = decision.chat_id
+        if decision.status == STATUS_INVALID:
             stats["errors"] += 1
             sample = {
                 "user_id": chat_id,
@@ -7318,12 +7467,12 @@ async def send_signal_to_all(
             )
             continue
 
-        if is_user_locked(chat_id):
+        if decision.status == STATUS_LOCKED:
             stats["locked"] += 1
             print(f"[{log_tag}] skip locked user_id={chat_id} chat_id={chat_id}")
             continue
 
-        if chat_id != admin_chat_id and not get_user_pref(chat_id, "ai_signals_enabled", 0):
+        if decision.status == STATUS_NOTIFICATIONS_OFF:
             stats["skipped_notifications_off"] += 1
             print(
                 f"[{log_tag}] skip notifications_off user_id={chat_id} "
@@ -7331,217 +7480,94 @@ async def send_signal_to_all(
             )
             continue
 
-        signal_score_value = int(round(float(signal_dict.get("score", 0) or 0)))
-        is_regular_bucket = signal_score_value < 90
-        if chat_id != admin_chat_id:
-            bucket_pref_key = _alerts_pref_key_for_bucket(_alerts_bucket_from_score(signal_score_value))
-            if not get_user_pref(chat_id, bucket_pref_key, 1):
-                stats["skipped_notifications_off"] += 1
-                print(
-                    f"[{log_tag}] skip bucket_off={bucket_pref_key} user_id={chat_id} "
-                    f"chat_id={chat_id}"
-                )
-                continue
+        if decision.status == STATUS_BUCKET_OFF:
+            stats["skipped_notifications_off"] += 1
+            print(
+                f"[{log_tag}] skip bucket_off={bucket_pref_key} user_id={chat_id} "
+                f"chat_id={chat_id}"
+            )
+            continue
 
         # индивидуальный cooldown на пользователя
-        if not effective_bypass_cooldown:
-            if not can_send(chat_id, "ai_signals", dedup_key, COOLDOWN_FREE_SEC):
-                skipped_dedup += 1
-                continue
-        lang = get_user_lang(chat_id) or "ru"
-        signal_reply_markup = None
+        if decision.status == STATUS_DEDUP:
+            skipped_dedup += 1
+            continue
+        if decision.status == STATUS_TRIAL_EXHAUSTED:
+            stats["skipped_notifications_off"] += 1
+            continue
+        lang = _clean_lang(decision.language) or "ru"
+        job: dict[str, Any] = {
+            "chat_id": chat_id,
+            "lang": lang,
+            "kind": "signal",
+            "should_log": False,
+            "sound_entry_enabled": decision.sound_entry_enabled,
+        }
         if is_test:
-            message_text = build_test_ai_signal(lang)
-            should_log = False
-            kind = "signal"
+            job["message"] = renders.get(lang, "test")
+        elif decision.status == STATUS_PAYWALL:
+            job["kind"] = "paywall"
+            job["message"] = renders.get(lang, "paywall")
+            stats["paywall"] += 1
         else:
-            is_admin_user = allow_admin_bypass and is_admin(chat_id)
-            try:
-                collapsed_text, expanded_text = _build_signal_text_variants(
-                    signal_dict,
-                    lang,
-                    is_admin_user=is_admin_user,
-                )
-                message_text = collapsed_text
-            except Exception:
-                fallback_symbol = _signal_symbol_text(str(signal_dict.get("symbol") or ""))
-                fallback_side = (
-                    i18n.t(lang, "SIGNAL_SHORT_SIDE_LONG")
-                    if str(signal_dict.get("direction") or "").lower() == "long"
-                    else i18n.t(lang, "SIGNAL_SHORT_SIDE_SHORT")
-                )
-                message_text = i18n.t(
-                    lang,
-                    "SIGNAL_SHORT_SYMBOL_SIDE_LINE",
-                    symbol=fallback_symbol,
-                    side=fallback_side,
-                )
-                collapsed_text = message_text
-                expanded_text = message_text
-            should_log = True
-            kind = "signal"
-            access_level = "FULL"
-            if is_admin_user or is_sub_active(chat_id):
-                access_level = "FULL"
-            else:
-                ensure_trial_defaults(chat_id)
-                allowed, left = try_consume_trial(chat_id, "trial_ai_left", 1)
-                if not allowed:
-                    if _should_send_paywall(chat_id, "ai"):
-                        kind = "paywall"
-                        should_log = False
-                        message_text = _build_ai_paywall_preview(signal_dict, lang)
-                    else:
-                        stats["skipped_notifications_off"] += 1
-                        continue
-                else:
-                    access_level = "FULL"
-                    trial_suffix = i18n.t(
+            message = renders.get(lang, "admin" if allow_admin_bypass and is_admin(chat_id) else "user")
+            if decision.trial_left is not None:
+                message = message.with_suffix(
+                    i18n.t(
                         lang,
                         "TRIAL_SUFFIX_AI",
-                        left=left,
+                        left=decision.trial_left,
                         limit=TRIAL_AI_LIMIT,
                     )
-                    collapsed_text = collapsed_text + trial_suffix
-                    expanded_text = expanded_text + trial_suffix
-                    message_text = collapsed_text
-
-        if kind == "paywall":
-            stats["paywall"] += 1
-
-        signal_parse_mode = None if is_test else "HTML"
-        paywall_parse_mode = None if is_test else "HTML"
+                )
+            job["message"] = message
+            job["should_log"] = True
+        jobs.append(job)
 
+    async def _deliver_job(job: dict[str, Any]) -> None:
+        chat_id = job["chat_id"]
         try:
-            if kind == "paywall":
+            if job["kind"] == "paywall":
                 res = await _send_with_safe_fallback(
                     chat_id,
-                    message_text,
+                    job["message"].text,
                     event_type="STATUS",
                     parse_mode=paywall_parse_mode,
-                    reply_markup=_subscription_kb_for("ai", lang),
+                    sound_entry_enabled=job["sound_entry_enabled"],
+                    reply_markup=job["message"].reply_markup,
                 )
             else:
                 res = await _send_with_safe_fallback(
                     chat_id,
-                    message_text,
+                    job["message"].text,
                     event_type="NEW_SIGNAL",
                     parse_mode=signal_parse_mode,
+                    sound_entry_enabled=job["sound_entry_enabled"],
                     disable_web_page_preview=True,
-                    reply_markup=signal_reply_markup,
+                    reply_markup=job["message"].reply_markup,
                 )
-            stats["sent"] += 1
-            if chat_id == admin_chat_id:
-                stats["admin_received"] = True
-            print(f"[{log_tag}] send ok user_id={chat_id} chat_id={chat_id}")
-        except TelegramRetryAfter as exc:
-            wait_seconds = float(exc.retry_after) + random.uniform(0.05, 0.2)
-            print(
-                f"[{log_tag}] floodwait user_id={chat_id} chat_id={chat_id} "
-                f"retry_after={exc.retry_after:.2f}s"
-            )
-            await asyncio.sleep(wait_seconds)
-            try:
-                if kind == "paywall":
-                    res = await _send_with_safe_fallback(
-                        chat_id,
-                        message_text,
-                        event_type="STATUS",
-                        parse_mode=paywall_parse_mode,
-                        reply_markup=_subscription_kb_for("ai", lang),
-                    )
-                else:
-                    res = await _send_with_safe_fallback(
-                        chat_id,
-                        message_text,
-                        event_type="NEW_SIGNAL",
-                        parse_mode=signal_parse_mode,
-                        disable_web_page_preview=True,
-                    )
-                stats["sent"] += 1
-                if chat_id == admin_chat_id:
-                    stats["admin_received"] = True
-                print(f"[{log_tag}] send ok after retry user_id={chat_id} chat_id={chat_id}")
-            except Exception as retry_exc:
-                stats["errors"] += 1
-                sample = {
-                    "user_id": chat_id,
-                    "chat_id": chat_id,
-                    "error_class": retry_exc.__class__.__name__,
-                    "error_text": str(retry_exc),
-                }
-                if len(stats["error_samples"]) < 5:
-                    stats["error_samples"].append(sample)
-                print(
-                    f"[{log_tag}] error user_id={chat_id} chat_id={chat_id} "
-                    f"err={retry_exc.__class__.__name__}: {retry_exc}"
-                )
-                logger.exception(
-                    f"[{log_tag}] retry failed user_id=%s chat_id=%s", chat_id, chat_id
-                )
-                continue
         except TelegramForbiddenError as exc:
-            stats["errors"] += 1
             stats["error_blocked"] += 1
-            set_user_pref(chat_id, "tg_blocked", 1)
-            set_user_pref(chat_id, "ai_signals_enabled", 0)
-            sample = {
-                "user_id": chat_id,
-                "chat_id": chat_id,
-                "error_class": exc.__class__.__name__,
-                "error_text": str(exc),
-            }
-            if len(stats["error_samples"]) < 5:
-                stats["error_samples"].append(sample)
-            print(
-                f"[{log_tag}] error user_id={chat_id} chat_id={chat_id} "
-                f"err={exc.__class__.__name__}: {exc}"
-            )
-            logger.exception(f"[{log_tag}] forbidden user_id=%s chat_id=%s", chat_id, chat_id)
-            continue
+            _record_error(chat_id, exc, "forbidden")
+            await run_db(set_user_pref, chat_id, "tg_blocked", 1)
+            await run_db(set_user_pref, chat_id, "ai_signals_enabled", 0)
+            return
         except TelegramBadRequest as exc:
-            stats["errors"] += 1
             stats["error_invalid_chat"] += 1
-            set_user_pref(chat_id, "invalid_chat_id", 1)
-            sample = {
-                "user_id": chat_id,
-                "chat_id": chat_id,
-                "error_class": exc.__class__.__name__,
-                "error_text": str(exc),
-            }
-            if len(stats["error_samples"]) < 5:
-                stats["error_samples"].append(sample)
-            print(
-                f"[{log_tag}] error user_id={chat_id} chat_id={chat_id} "
-                f"err={exc.__class__.__name__}: {exc}"
-            )
-            logger.exception(
-                f"[{log_tag}] bad request user_id=%s chat_id=%s", chat_id, chat_id
-            )
-            continue
-        except Exception as exc:
-            stats["errors"] += 1
-            sample = {
-                "user_id": chat_id,
-                "chat_id": chat_id,
-                "error_class": exc.__class__.__name__,
-                "error_text": str(exc),
-            }
-            if len(stats["error_samples"]) < 5:
-                stats["error_samples"].append(sample)
-            print(
-                f"[{log_tag}] error user_id={chat_id} chat_id={chat_id} "
-                f"err={exc.__class__.__name__}: {exc}"
-            )
-            logger.exception(f"[{log_tag}] unexpected send error user_id=%s chat_id=%s", chat_id, chat_id)
-            continue
+            _record_error(chat_id, exc, "bad request")
+            await run_db(set_user_pref, chat_id, "invalid_chat_id", 1)
+            return
+        stats["sent"] += 1
+        if chat_id == admin_chat_id:
+            stats["admin_received"] = True
+        print(f"[{log_tag}] send ok user_id={chat_id} chat_id={chat_id}")
 
-        if is_test or not should_log:
-            await asyncio.sleep(random.uniform(0.05, 0.15))
-            continue
+        if is_test or not job["should_log"]:
+            return
 
         try:
-            event_id = insert_signal_event(
+            event_id = await run_db(
+                insert_signal_event,
                 ts=sent_at,
                 user_id=chat_id,
                 module="ai_signals",
@@ -7564,22 +7590,27 @@ async def send_signal_to_all(
             )
         except Exception as exc:
             print(f"[ai_signals] Failed to log signal event for {chat_id}: {exc}")
-            await asyncio.sleep(random.uniform(0.05, 0.15))
-            continue
+            return
 
         with suppress(Exception):
             await bot.edit_message_reply_markup(
                 chat_id=chat_id,
                 message_id=int(res.message_id),
                 reply_markup=_signal_inline_kb(
-                    lang=lang,
+                    lang=job["lang"],
                     symbol=symbol,
                     signal_id=event_id,
                     expanded=False,
-                    access_level=access_level if not is_test else "FULL",
+                    access_level="FULL",
                 ),
             )
-        await asyncio.sleep(random.uniform(0.05, 0.15))
+
+    results = await TELEGRAM_DELIVERY.deliver(jobs, _deliver_job, chat_id_of=lambda job: job["chat_id"])
+    for result in results:
+        if result.error is None:
+            continue
+        label = "retry failed" if isinstance(result.error, TelegramRetryAfter) else "unexpected send error"
+        _record_error(result.chat_id, result.error, label)
     return stats if return_stats else stats["sent"]
 
 
@@ -7660,7 +7691,8 @@ async def _deliver_pumpdump_signal_stats(
     ts_value = int(float(signal.get("detected_at") or time.time()))
     side_value = "PUMP" if str(signal.get("type") or "").lower() == "pump" else "DUMP"
     try:
-        insert_pumpdump_event(
+        await run_db(
+            insert_pumpdump_event,
             ts=ts_value,
             symbol=symbol,
             side=side_value,
@@ -7672,131 +7704,127 @@ async def _deliver_pumpdump_signal_stats(
     except Exception as exc:
         _log_throttled("pd_event_insert", "insert_pumpdump_event failed: %s", exc)
 
-    for chat_id in subscribers:
-        try:
-            lang = get_user_lang(chat_id) or "ru"
-            collapsed_text = format_pump_message(signal, lang, expanded=False)
-            expanded_text = format_pump_message(signal, lang, expanded=True)
-            if prefix_key:
-                prefix_text = i18n.t(lang, prefix_key)
-                collapsed_text = f"{prefix_text}{collapsed_text}"
-                expanded_text = f"{prefix_text}{expanded_text}"
-            if suffix_key:
-                suffix_text = i18n.t(lang, suffix_key)
-                collapsed_text = f"{collapsed_text}\n\n{suffix_text}"
-                expanded_text = f"{expanded_text}\n\n{suffix_text}"
-
-            is_admin_user = is_admin(chat_id) if allow_admin_bypass else False
-            if not is_admin_user:
-                if not bypass_limits:
-                    if get_pumpdump_daily_count(chat_id, date_key) >= PUMP_DAILY_LIMIT:
-                        continue
-                if is_user_locked(chat_id):
-                    locked_count += 1
-                    continue
-            if not bypass_cooldown:
-                time_bucket = int(time.time() // PUMP_COOLDOWN_GLOBAL_SEC)
-                dedup_global = f"pumpdump:global:{time_bucket}"
-                if not can_send(
-                    chat_id,
-                    "pumpdump",
-                    dedup_global,
-                    PUMP_COOLDOWN_GLOBAL_SEC,
-                ):
-                    continue
-                dedup_symbol = f"pumpdump:{symbol}"
-                if not can_send(
-                    chat_id,
-                    "pumpdump",
-                    dedup_symbol,
-                    PUMP_COOLDOWN_SYMBOL_SEC,
-                ):
-                    continue
+    def _render(lang: str, variant: str) -> RenderedMessage:
+        if variant == "paywall":
+            text = _build_pd_paywall_preview(signal, lang)
+            return RenderedMessage(text, text, _subscription_kb_for("pump", lang))
+        collapsed_text = format_pump_message(signal, lang, expanded=False)
+        expanded_text = format_pump_message(signal, lang, expanded=True)
+        if prefix_key:
+            prefix_text = i18n.t(lang, prefix_key)
+            collapsed_text = f"{prefix_text}{collapsed_text}"
+            expanded_text = f"{prefix_text}{expanded_text}"
+        if suffix_key:
+            suffix_text = i18n.t(lang, suffix_key)
+            collapsed_text = f"{collapsed_text}\n\n{suffix_text}"
+            expanded_text = f"{expanded_text}\n\n{suffix_text}"
+        return RenderedMessage(collapsed_text, expanded_text)
+
+    # текст и клавиатура собираются один раз на (язык, вариант), а не на каждого получателя
+    renders = RenderCache(_render)
+
+    cooldowns = None
+    if not bypass_cooldown:
+        time_bucket = int(time.time() // PUMP_COOLDOWN_GLOBAL_SEC)
+        cooldowns = [
+            (f"pumpdump:global:{time_bucket}", PUMP_COOLDOWN_GLOBAL_SEC),
+            (f"pumpdump:{symbol}", PUMP_COOLDOWN_SYMBOL_SEC),
+        ]
+    try:
+        decisions = await run_db(
+            resolve_pumpdump_recipients,
+            list(subscribers),
+            full_access_ids={chat_id for chat_id in subscribers if allow_admin_bypass and is_admin(chat_id)},
+            date_key=date_key,
+            daily_limit=None if bypass_limits else PUMP_DAILY_LIMIT,
+            cooldowns=cooldowns,
+            paywall_cooldown_sec=PAYWALL_COOLDOWN_SEC,
+        )
+    except Exception as e:
+        print(f"[pumpdump] recipients failed symbol={symbol}: {e}")
+        decisions = []
+        error_count += len(subscribers)
+
+    jobs: list[dict[str, Any]] = []
+    for decision in decisions:
+        lang = _clean_lang(decision.language) or "ru"
+        if decision.status == STATUS_LOCKED:
+            locked_count += 1
+            continue
+        if decision.status == STATUS_PAYWALL:
+            jobs.append({"chat_id": decision.chat_id, "lang": lang, "paywall": True, "message": renders.get(lang, "paywall")})
+            continue
+        if decision.status != STATUS_SEND:
+            continue
+        message = renders.get(lang, "full")
+        if not decision.full_access and decision.trial_left is not None:
+            message = message.with_suffix(
+                i18n.t(lang, "TRIAL_SUFFIX_PD", left=decision.trial_left, limit=TRIAL_PUMP_LIMIT)
+            )
+        jobs.append({"chat_id": decision.chat_id, "lang": lang, "paywall": False, "message": message})
 
-            if is_admin_user or is_sub_active(chat_id):
-                sent_message = await bot.send_message(
-                    chat_id,
-                    collapsed_text,
-                    parse_mode="Markdown",
-                )
-                _save_pump_message_state(
-                    chat_id=chat_id,
-                    message_id=int(sent_message.message_id),
-                    collapsed_text=collapsed_text,
-                    expanded_text=expanded_text,
-                    lang=lang,
-                    symbol=symbol,
-                )
-                with suppress(Exception):
-                    await bot.edit_message_reply_markup(
-                        chat_id=chat_id,
-                        message_id=int(sent_message.message_id),
-                        reply_markup=_pump_toggle_inline_kb(
-                            lang=lang,
-                            chat_id=chat_id,
-                            message_id=int(sent_message.message_id),
-                            expanded=False,
-                            symbol=symbol,
-                        ),
-                    )
-                increment_pumpdump_daily_count(chat_id, date_key)
-                sent_count += 1
-                recipient_count += 1
-                continue
+    # per-send bookkeeping is written in one DB-thread call after the broadcast
+    toggle_states: list[tuple[str, str]] = []
+    delivered_ids: list[int] = []
 
-            ensure_trial_defaults(chat_id)
-            allowed, left = try_consume_trial(chat_id, "trial_pump_left", 1)
-            if allowed:
-                trial_suffix = i18n.t(
-                    lang,
-                    "TRIAL_SUFFIX_PD",
-                    left=left,
-                    limit=TRIAL_PUMP_LIMIT,
-                )
-                collapsed_with_trial = collapsed_text + trial_suffix
-                expanded_with_trial = expanded_text + trial_suffix
-                sent_message = await bot.send_message(
-                    chat_id,
-                    collapsed_with_trial,
-                    parse_mode="Markdown",
-                )
-                _save_pump_message_state(
+    async def _deliver_job(job: dict[str, Any]) -> None:
+        nonlocal sent_count, paywall_count, recipient_count
+        chat_id = job["chat_id"]
+        message = job["message"]
+        if job["paywall"]:
+            await bot.send_message(
+                chat_id,
+                message.text,
+                reply_markup=message.reply_markup,
+            )
+            paywall_count += 1
+            recipient_count += 1
+            return
+        sent_message = await bot.send_message(
+            chat_id,
+            message.text,
+            parse_mode="Markdown",
+        )
+        sent_count += 1
+        recipient_count += 1
+        state = _save_pump_message_state(
+            chat_id=chat_id,
+            message_id=int(sent_message.message_id),
+            collapsed_text=message.collapsed,
+            expanded_text=message.expanded,
+            lang=job["lang"],
+            symbol=symbol,
+            persist=False,
+        )
+        toggle_states.append(
+            (
+                _toggle_state_key(_PUMP_TOGGLE_STATE_KEY_PREFIX, chat_id, int(sent_message.message_id)),
+                json.dumps(state, ensure_ascii=False, separators=(",", ":")),
+            )
+        )
+        with suppress(Exception):
+            await bot.edit_message_reply_markup(
+                chat_id=chat_id,
+                message_id=int(sent_message.message_id),
+                reply_markup=_pump_toggle_inline_kb(
+                    lang=job["lang"],
                     chat_id=chat_id,
                     message_id=int(sent_message.message_id),
-                    collapsed_text=collapsed_with_trial,
-                    expanded_text=expanded_with_trial,
-                    lang=lang,
+                    expanded=False,
                     symbol=symbol,
-                )
-                with suppress(Exception):
-                    await bot.edit_message_reply_markup(
-                        chat_id=chat_id,
-                        message_id=int(sent_message.message_id),
-                        reply_markup=_pump_toggle_inline_kb(
-                            lang=lang,
-                            chat_id=chat_id,
-                            message_id=int(sent_message.message_id),
-                            expanded=False,
-                            symbol=symbol,
-                        ),
-                    )
-                increment_pumpdump_daily_count(chat_id, date_key)
-                sent_count += 1
-                recipient_count += 1
-            else:
-                if not _should_send_paywall(chat_id, "pump"):
-                    continue
-                await bot.send_message(
-                    chat_id,
-                    _build_pd_paywall_preview(signal, lang),
-                    reply_markup=_subscription_kb_for("pump", lang),
-                )
-                paywall_count += 1
-                recipient_count += 1
-        except Exception as e:
-            print(f"[pumpdump] send failed chat_id={chat_id} symbol={symbol}: {e}")
+                ),
+            )
+        delivered_ids.append(chat_id)
+
+    results = await TELEGRAM_DELIVERY.deliver(jobs, _deliver_job, chat_id_of=lambda job: job["chat_id"])
+    for result in results:
+        if result.error is not None:
+            print(f"[pumpdump] send failed chat_id={result.chat_id} symbol={symbol}: {result.error}")
             error_count += 1
-            continue
+    try:
+        await run_db(record_pumpdump_deliveries, toggle_states, delivered_ids, date_key)
+    except Exception as exc:
+        logger.warning("[pumpdump] delivery bookkeeping failed symbol=%s: %s", symbol, exc)
     return {
         "sent": sent_count + paywall_count,
         "locked": locked_count,
@@ -7826,18 +7854,89 @@ async def _deliver_pumpdump_signal(
     return stats["sent"] - stats["paywall"], stats["recipient_count"]
 
 
+async def _dispatch_pumpdump_signal(
+    bot: Bot,
+    sig: Dict[str, Any],
+    subscribers: list,
+    last_sent: dict[str, int],
+    now_min: int,
+) -> int:
+    symbol = sig["symbol"]
+    if last_sent.get(symbol) == now_min:
+        return 0
+
+    last_sent[symbol] = now_min
+    sent_delta, _ = await _deliver_pumpdump_signal(
+        bot=bot,
+        signal=sig,
+        symbol=symbol,
+        subscribers=subscribers,
+        allow_admin_bypass=True,
+    )
+    try:
+        ok_channel, reason_channel = await _send_free_pumpdump_to_channel(sig, symbol=symbol, lang="ru")
+        if ok_channel:
+            logger.info("[channel_free] pump sent symbol=%s", symbol)
+        else:
+            logger.info("[channel_free] pump skipped symbol=%s reason=%s", symbol, reason_channel)
+    except Exception:
+        logger.exception("[channel_free] pump send failed symbol=%s", symbol)
+
+    if sent_delta > 0:
+        direction = "PUMP" if sig.get("type") == "pump" else "DUMP"
+        set_last_pumpdump_signal(
+            {
+                "symbol": symbol,
+                "ts": int(time.time()),
+                "direction": direction,
+                "change_5m": sig.get("change_5m"),
+            }
+        )
+    return sent_delta
+
+
+def _pump_scan_state() -> dict:
+    if not hasattr(pump_scan_once, "state"):
+        pump_scan_once.state = {
+            "last_sent": {},
+        }
+    return pump_scan_once.state
+
+
+async def pump_trigger_loop(bot: Bot) -> None:
+    """Deliver pumps found by the streamed-candle evaluator as soon as they trigger."""
+    while True:
+        sig = await PUMP_TRIGGER_EVALUATOR.next_signal()
+        try:
+            symbol = sig["symbol"]
+            if symbol.upper() in _get_pump_excluded_symbols():
+                continue
+            subscribers = get_pumpdump_subscribers()
+            if not subscribers:
+                continue
+            print(
+                f"[pumpdump] stream trigger {symbol} type={sig.get('type')} "
+                f"1m={sig.get('change_1m')}% 5m={sig.get('change_5m')}% volx={sig.get('volume_mul')}"
+            )
+            await _dispatch_pumpdump_signal(
+                bot,
+                sig,
+                subscribers,
+                _pump_scan_state()["last_sent"],
+                int(time.time() // 60),
+            )
+        except Exception:
+            logger.exception("[pumpdump] stream trigger delivery failed")
+
+
 async def pump_scan_once(bot: Bot) -> None:
     start = time.time()
     BUDGET = 35
     log_level = int(os.getenv("PUMPDUMP_LOG_LEVEL", "1"))  # 0=off,1=cycle,2=candidates,3=sends
     print("[PUMP] scan_once start")
-    if not hasattr(pump_scan_once, "state"):
-        pump_scan_once.state = {
-            "last_sent": {},
-        }
 
     try:
-        state = pump_scan_once.state
+        state = _pump_scan_state()
 
         subscribers = get_pumpdump_subscribers()
 
@@ -7980,40 +8079,8 @@ async def pump_scan_once(bot: Bot) -> None:
             if time.time() - start > BUDGET:
                 print("[PUMP] budget exceeded, stopping early")
                 break
-            symbol = sig["symbol"]
-            update_current_symbol("pumpdump", symbol)
-
-            if last_sent.get(symbol) == now_min:
-                continue
-
-            last_sent[symbol] = now_min
-            sent_delta, _ = await _deliver_pumpdump_signal(
-                bot=bot,
-                signal=sig,
-                symbol=symbol,
-                subscribers=subscribers,
-                allow_admin_bypass=True,
-            )
-            sent_count += sent_delta
-            try:
-                ok_channel, reason_channel = await _send_free_pumpdump_to_channel(sig, symbol=symbol, lang="ru")
-                if ok_channel:
-                    logger.info("[channel_free] pump sent symbol=%s", symbol)
-                else:
-                    logger.info("[channel_free] pump skipped symbol=%s reason=%s", symbol, reason_channel)
-            except Exception:
-                logger.exception("[channel_free] pump send failed symbol=%s", symbol)
-
-            if sent_delta > 0:
-                direction = "PUMP" if sig.get("type") == "pump" else "DUMP"
-                set_last_pumpdump_signal(
-                    {
-                        "symbol": symbol,
-                        "ts": int(time.time()),
-                        "direction": direction,
-                        "change_5m": sig.get("change_5m"),
-                    }
-                )
+            update_current_symbol("pumpdump", sig["symbol"])
+            sent_count += await _dispatch_pumpdump_signal(bot, sig, subscribers, last_sent, now_min)
 
         cycle_sec = time.time() - cycle_start
         current_symbol = MODULES.get("pumpdump").current_symbol if "pumpdump" in MODULES else None
@@ -8476,6 +8543,12 @@ async def ai_scan_once() -> None:
         ticker_count = get_ticker_request_count("ai_signals")
         req_count = metrics.get("requests_total")
         klines_count = metrics.get("candles_received")
+        memory_stats = get_memory_cache_stats()
+        memory_stats.update(get_indicator_cache_stats())
+        memory_str = " ".join(
+            f"{name}={stats['entries']}/{stats['bytes'] // (1024 * 1024)}MB ev={stats['evictions']}"
+            for name, stats in memory_stats.items()
+        )
         print(
             "[AI] "
             f"universe={total} chunk={len(chunk)} cursor={new_cursor} "
@@ -8496,7 +8569,7 @@ async def ai_scan_once() -> None:
                 f"req={req_count} klines={klines_count} "
                 f"klines_hits={cache_stats.get('hits')} klines_misses={cache_stats.get('misses')} "
                 f"klines_inflight={cache_stats.get('inflight_awaits')} "
-                f"ticker_req={ticker_count}"
+                f"ticker_req={ticker_count} cache_mem=[{memory_str}]"
             ),
         )
     except Exception as e:
@@ -8515,6 +8588,7 @@ async def ai_scan_once() -> None:
 async def main():
     global bot
     bot = Bot(token=BOT_TOKEN, default=DefaultBotProperties(parse_mode="HTML"))
+    bot.session.middleware(DeliveryThrottle())
     set_signal_result_notifier(notify_signal_result_short)
     set_signal_activation_notifier(notify_signal_activation)
     set_signal_poi_touched_notifier(notify_signal_poi_touched)
@@ -8522,6 +8596,7 @@ async def main():
     set_signal_finalizer_notifier(notify_signal_finalized)
     print("Бот запущен!")
     init_app_db()
+    warm_klines_cache()
 
     async def _delayed_task(delay_sec: float, coro: Awaitable[Any]):
         await asyncio.sleep(delay_sec)
@@ -8539,9 +8614,18 @@ async def main():
     )
     audit_task = asyncio.create_task(_delayed_task(18, signal_audit_worker_loop()))
     watchdog_task = asyncio.create_task(watchdog())
+    stream_tasks: list[asyncio.Task] = []
+    if MARKET_STREAM_ENABLED:
+        MARKET_STREAM.add_kline_listener(PUMP_TRIGGER_EVALUATOR.on_kline)
+        stream_tasks.append(asyncio.create_task(market_stream_loop(get_top_usdt_symbols_by_volume)))
+        stream_tasks.append(asyncio.create_task(pump_trigger_loop(bot)))
     try:
         await dp.start_polling(bot)
     finally:
+        for task in stream_tasks:
+            task.cancel()
+            with suppress(asyncio.CancelledError):
+                await task
         signals_task.cancel()
         with suppress(asyncio.CancelledError):
             await signals_task
@@ -8555,6 +8639,9 @@ async def main():
         with suppress(asyncio.CancelledError):
             await watchdog_task
         await close_shared_session()
+        shutdown_deep_executor()
+        shutdown_kline_db()
+        shutdown_db_pool()
 
 
 if __name__ == "__main__":
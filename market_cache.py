@@ -81,6 +81,52 @@ async def _refresh_futures(ttl_sec: int) -> List[Dict[str, Any]]:
         return _futures_cache.get("data") or []
 
 
+def apply_spot_mini_tickers(events: List[Dict[str, Any]], now: float | None = None) -> int:
+    """
+    Fold miniTicker stream events into the spot 24h snapshot. Rows keep the
+    REST field names, so readers of get_spot_24h() see no difference.
+
+    Events only update rows of an existing REST snapshot: miniTicker lacks
+    the REST-only fields, so symbols missing from it wait for the next
+    REST refresh, and without a snapshot nothing is applied.
+    """
+    data = _spot_cache.get("data")
+    if not data:
+        return 0
+    by_symbol = {row.get("symbol"): row for row in data if isinstance(row, dict)}
+    applied = 0
+    for event in events:
+        symbol = event.get("s") if isinstance(event, dict) else None
+        if not symbol:
+            continue
+        row = by_symbol.get(symbol)
+        if row is None:
+            continue
+        row.update(
+            {
+                "lastPrice": event.get("c"),
+                "openPrice": event.get("o"),
+                "highPrice": event.get("h"),
+                "lowPrice": event.get("l"),
+                "volume": event.get("v"),
+                "quoteVolume": event.get("q"),
+                "closeTime": event.get("E"),
+            }
+        )
+        try:
+            open_price = float(event.get("o") or 0.0)
+            last_price = float(event.get("c") or 0.0)
+        except (TypeError, ValueError):
+            open_price = 0.0
+        if open_price > 0:
+            row["priceChange"] = f"{last_price - open_price:.8f}"
+            row["priceChangePercent"] = f"{(last_price - open_price) / open_price * 100:.3f}"
+        applied += 1
+    if applied:
+        _spot_cache["updated_at"] = time.time() if now is None else now
+    return applied
+
+
 async def get_spot_24h(ttl_sec: int = SPOT_TICKER_24H_TTL_SEC) -> List[Dict[str, Any]]:
     if _fresh(_spot_cache, ttl_sec):
         return _spot_cache["data"] or []
@@ -1,29 +1,41 @@
-import asyncio
-import time
 from statistics import mean
 from typing import Any, Dict, List, Optional
 
 from ai_types import Candle
-from binance_rest import get_klines
 from utils_klines import normalize_klines
 from trading_core import _compute_rsi_series, compute_ema, detect_trend_and_structure
 
 
 DIVISION_EPS = 1e-12
+MARKET_REGIME_LIMITS = {
+    "1d": 60,
+    "4h": 120,
+    "1h": 120,
+    "15m": 160,
+}
 
 
 async def get_market_regime() -> Dict[str, Any]:
     """
     Определяет режим рынка по BTCUSDT.
 
+    Считается один раз на закрытие 15m свечи вместе с get_btc_regime
+    (общий сервис в btc_context), все вызовы в цикле получают копию.
+    """
+    from btc_context import get_btc_market_context
+
+    context = await get_btc_market_context()
+    return dict(context["market_regime"])
+
+
+def compute_market_regime(data: Optional[Dict[str, List[Candle]]]) -> Dict[str, Any]:
+    """
     Codex:
       - можно сюда добавить DXY, VIX, Total Market Cap, Funding и т.п.
       - сейчас простая эвристика:
           • тренд BTC на 1d
           • среднедневная волатильность за 30 дней
     """
-    symbol = "BTCUSDT"
-    data = await _fetch_direct_bundle(symbol, ("1d", "4h", "1h", "15m"))
     candles_1d: List[Candle] = data.get("1d") or [] if data else []
     candles_4h: List[Candle] = data.get("4h") or [] if data else []
     candles_1h: List[Candle] = data.get("1h") or [] if data else []
@@ -106,23 +118,14 @@ async def get_market_regime() -> Dict[str, Any]:
     }
 
 
-async def _fetch_direct_bundle(
-    symbol: str,
-    tfs: tuple[str, ...],
-) -> Optional[Dict[str, List[Candle]]]:
-    limits = {
-        "1d": 60,
-        "4h": 120,
-        "1h": 120,
-        "15m": 160,
-    }
-    tasks = [asyncio.create_task(get_klines(symbol, tf, limits[tf])) for tf in tfs]
-    results = await asyncio.gather(*tasks, return_exceptions=True)
+def normalize_market_bundle(raw: Dict[str, Any]) -> Optional[Dict[str, List[Candle]]]:
+    """Raw klines per timeframe -> candles, None when any timeframe is missing or short."""
     bundle: Dict[str, List[Candle]] = {}
-    for tf, result in zip(tfs, results):
+    for tf, limit in MARKET_REGIME_LIMITS.items():
+        result = raw.get(tf)
         if isinstance(result, BaseException) or not isinstance(result, list):
             return None
-        candles = normalize_klines(result)
+        candles = normalize_klines(result[-limit:])
         if not candles or len(candles) < 20:
             return None
         bundle[tf] = candles
@@ -0,0 +1,250 @@
+"""
+Binance combined-stream ingestion for klines and the spot miniTicker.
+
+Streamed candles go into the same KLINE_STORE that binance_rest.fetch_klines
+reads, and miniTicker events into the market_cache spot snapshot, so the
+scanners keep calling get_klines()/get_spot_24h() and are served from memory
+while the stream is up. A series is only marked live after a REST top-up
+following (re)connect; missed candles or a dropped connection clear the flag,
+and reads fall back to REST until the next backfill.
+"""
+
+from __future__ import annotations
+
+import asyncio
+import json
+import os
+import time
+from dataclasses import dataclass, field
+from typing import Awaitable, Callable, Optional
+
+import aiohttp
+
+from binance_rest import merge_stream_kline, refresh_klines, set_klines_live
+from market_cache import apply_spot_mini_tickers
+
+MARKET_STREAM_ENABLED = os.getenv("MARKET_STREAM_ENABLED", "0").strip().lower() in ("1", "true", "yes", "on")
+BINANCE_WS_BASE_URL = os.getenv("BINANCE_WS_BASE_URL", "wss://stream.binance.com:9443")
+MARKET_STREAM_INTERVALS = tuple(
+    item.strip() for item in os.getenv("MARKET_STREAM_INTERVALS", "1m,5m").split(",") if item.strip()
+)
+MARKET_STREAM_MAX_SYMBOLS = int(os.getenv("MARKET_STREAM_MAX_SYMBOLS", "200"))
+MARKET_STREAM_STREAMS_PER_CONN = int(os.getenv("MARKET_STREAM_STREAMS_PER_CONN", "200"))
+MARKET_STREAM_BACKFILL_LIMIT = int(os.getenv("MARKET_STREAM_BACKFILL_LIMIT", "200"))
+MARKET_STREAM_BACKFILL_CONCURRENCY = int(os.getenv("MARKET_STREAM_BACKFILL_CONCURRENCY", "4"))
+MARKET_STREAM_SYMBOLS_REFRESH_SEC = int(os.getenv("MARKET_STREAM_SYMBOLS_REFRESH_SEC", "1800"))
+MARKET_STREAM_RECONNECT_MAX_SEC = float(os.getenv("MARKET_STREAM_RECONNECT_MAX_SEC", "30"))
+
+KlineListener = Callable[[str, str, list, bool], None]
+
+_TICKER_STREAM = "!miniTicker@arr"
+
+
+def kline_event_to_row(kline: dict) -> list:
+    """Kline payload ("k") of a stream event in the REST /klines row layout."""
+    return [
+        int(kline["t"]),
+        kline["o"],
+        kline["h"],
+        kline["l"],
+        kline["c"],
+        kline["v"],
+        int(kline["T"]),
+        kline.get("q", "0"),
+        int(kline.get("n", 0)),
+        kline.get("V", "0"),
+        kline.get("Q", "0"),
+        kline.get("B", "0"),
+    ]
+
+
+@dataclass
+class MarketStream:
+    base_url: str = BINANCE_WS_BASE_URL
+    intervals: tuple[str, ...] = MARKET_STREAM_INTERVALS
+    backfill_limit: int = MARKET_STREAM_BACKFILL_LIMIT
+    streams_per_conn: int = MARKET_STREAM_STREAMS_PER_CONN
+    with_tickers: bool = True
+    symbols: list[str] = field(default_factory=list)
+    messages: int = 0
+    reconnects: int = 0
+    backfills: int = 0
+    gaps: int = 0
+    last_message_at: float = 0.0
+    _session: Optional[aiohttp.ClientSession] = None
+    _tasks: list[asyncio.Task] = field(default_factory=list)
+    _listeners: list[KlineListener] = field(default_factory=list)
+    _backfill_sem: Optional[asyncio.Semaphore] = None
+    _pending_backfill: set[tuple[str, str]] = field(default_factory=set)
+
+    def add_kline_listener(self, listener: KlineListener) -> None:
+        """listener(symbol, interval, row, closed) runs for every applied kline update."""
+        self._listeners.append(listener)
+
+    def _connection_plan(self) -> list[tuple[list[str], list[tuple[str, str]]]]:
+        keys = [(symbol, interval) for symbol in self.symbols for interval in self.intervals]
+        plan: list[tuple[list[str], list[tuple[str, str]]]] = []
+        size = max(1, self.streams_per_conn)
+        for start in range(0, len(keys), size):
+            chunk = keys[start : start + size]
+            streams = [f"{symbol.lower()}@kline_{interval}" for symbol, interval in chunk]
+            plan.append((streams, chunk))
+        if self.with_tickers:
+            if plan and len(plan[-1][0]) < size:
+                plan[-1][0].append(_TICKER_STREAM)
+            else:
+                plan.append(([_TICKER_STREAM], []))
+        return plan
+
+    async def start(self, symbols: list[str]) -> None:
+        await self.stop()
+        self.symbols = [symbol.upper() for symbol in symbols]
+        self._session = aiohttp.ClientSession()
+        self._backfill_sem = asyncio.Semaphore(max(1, MARKET_STREAM_BACKFILL_CONCURRENCY))
+        self._tasks = [
+            asyncio.create_task(self._run_connection(streams, keys))
+            for streams, keys in self._connection_plan()
+        ]
+        print(
+            f"[market_stream] start symbols={len(self.symbols)} intervals={','.join(self.intervals)} "
+            f"connections={len(self._tasks)}"
+        )
+
+    async def stop(self) -> None:
+        tasks, self._tasks = self._tasks, []
+        for task in tasks:
+            task.cancel()
+        for task in tasks:
+            try:
+                await task
+            except asyncio.CancelledError:
+                pass
+        for symbol in self.symbols:
+            for interval in self.intervals:
+                set_klines_live(symbol, interval, False)
+        if self._session is not None:
+            await self._session.close()
+            self._session = None
+
+    async def _run_connection(self, streams: list[str], keys: list[tuple[str, str]]) -> None:
+        url = f"{self.base_url.rstrip('/')}/stream?streams={'/'.join(streams)}"
+        delay = 1.0
+        while True:
+            backfill_task: Optional[asyncio.Task] = None
+            try:
+                async with self._session.ws_connect(url, heartbeat=30) as ws:
+                    delay = 1.0
+                    # subscribe first, then top up over REST: candles that close
+                    # meanwhile arrive on the socket and merge() de-duplicates them
+                    backfill_task = asyncio.create_task(self._backfill(keys))
+                    async for msg in ws:
+                        if msg.type == aiohttp.WSMsgType.TEXT:
+                            self._handle_message(msg.data)
+                        elif msg.type in (aiohttp.WSMsgType.CLOSED, aiohttp.WSMsgType.ERROR):
+                            break
+                print(f"[market_stream] connection closed streams={len(streams)}")
+            except asyncio.CancelledError:
+                raise
+            except Exception as exc:
+                print(f"[market_stream] connection error streams={len(streams)}: {exc}")
+            finally:
+                if backfill_task is not None:
+                    backfill_task.cancel()
+                for symbol, interval in keys:
+                    set_klines_live(symbol, interval, False)
+            self.reconnects += 1
+            await asyncio.sleep(delay)
+            delay = min(delay * 2, MARKET_STREAM_RECONNECT_MAX_SEC)
+
+    async def _backfill(self, keys: list[tuple[str, str]]) -> None:
+        await asyncio.gather(*(self._backfill_one(symbol, interval) for symbol, interval in keys))
+
+    async def _backfill_one(self, symbol: str, interval: str) -> None:
+        key = (symbol, interval)
+        if key in self._pending_backfill:
+            return
+        self._pending_backfill.add(key)
+        try:
+            async with self._backfill_sem:
+                data = await refresh_klines(symbol, interval, self.backfill_limit)
+            if data:
+                set_klines_live(symbol, interval, True)
+                self.backfills += 1
+        except Exception as exc:
+            print(f"[market_stream] backfill failed {symbol} {interval}: {exc}")
+        finally:
+            self._pending_backfill.discard(key)
+
+    def _handle_message(self, raw: str) -> None:
+        try:
+            payload = json.loads(raw)
+        except ValueError:
+            return
+        data = payload.get("data", payload) if isinstance(payload, dict) else payload
+        self.messages += 1
+        self.last_message_at = time.time()
+        if isinstance(data, list):
+            apply_spot_mini_tickers(data)
+            return
+        if not isinstance(data, dict):
+            return
+        if data.get("e") == "24hrMiniTicker":
+            apply_spot_mini_tickers([data])
+        elif data.get("e") == "kline":
+            self._handle_kline(data.get("k") or {})
+
+    def _handle_kline(self, kline: dict) -> None:
+        try:
+            symbol = str(kline["s"]).upper()
+            interval = str(kline["i"])
+            row = kline_event_to_row(kline)
+        except (KeyError, TypeError, ValueError):
+            return
+        closed = bool(kline.get("x"))
+        if not merge_stream_kline(symbol, interval, row, closed=closed):
+            # candles were missed (or the series was never loaded): refill over REST
+            self.gaps += 1
+            asyncio.get_running_loop().create_task(self._backfill_one(symbol, interval))
+            return
+        for listener in self._listeners:
+            try:
+                listener(symbol, interval, row, closed)
+            except Exception as exc:
+                print(f"[market_stream] listener error {symbol} {interval}: {exc}")
+
+    def snapshot(self) -> dict:
+        return {
+            "symbols": len(self.symbols),
+            "connections": len(self._tasks),
+            "messages": self.messages,
+            "reconnects": self.reconnects,
+            "backfills": self.backfills,
+            "gaps": self.gaps,
+            "last_message_age_sec": round(time.time() - self.last_message_at, 1)
+            if self.last_message_at
+            else None,
+        }
+
+
+MARKET_STREAM = MarketStream()
+
+
+async def market_stream_loop(
+    get_symbols: Callable[[int], Awaitable[list[str]]],
+    stream: MarketStream = MARKET_STREAM,
+) -> None:
+    """Keep MARKET_STREAM subscribed to the current top symbols."""
+    current: list[str] = []
+    try:
+        while True:
+            try:
+                symbols = await get_symbols(MARKET_STREAM_MAX_SYMBOLS)
+            except Exception as exc:
+                print(f"[market_stream] symbols refresh failed: {exc}")
+                symbols = current
+            if symbols and sorted(symbols) != sorted(current):
+                await stream.start(symbols)
+                current = list(symbols)
+            await asyncio.sleep(MARKET_STREAM_SYMBOLS_REFRESH_SEC)
+    finally:
+        await stream.stop()
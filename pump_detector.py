@@ -2,6 +2,8 @@ import asyncio
 import os
 import re
 import time
+from collections import deque
+from dataclasses import dataclass, field
 from typing import Any, Callable, Dict, List, Optional, Tuple
 
 import aiohttp
@@ -11,6 +13,7 @@ from utils_symbols import ui_symbol
 
 from ai_types import Candle
 from binance_rest import binance_request_context, get_klines
+from kline_store import KLINE_STORE, interval_to_ms
 from symbol_cache import (
     filter_tradeable_symbols,
     get_spot_usdt_symbols,
@@ -103,7 +106,8 @@ async def get_shared_klines(
 ) -> list[list[str]] | list[Candle] | None:
     try:
         with binance_request_context("pumpdump"):
-            return await get_klines(symbol, interval, limit, start_ms=None)
+            # pump/dump moves are measured up to the forming candle's last price
+            return await get_klines(symbol, interval, limit, start_ms=None, forming=True)
     except Exception as exc:
         print(f"[BINANCE] ERROR {symbol}: {exc}")
         return None
@@ -240,6 +244,17 @@ def _calc_signal_with_reason(
 
     volume_5m = volumes_5m[-1]
     avg_volume_5m = sum(volumes_5m[:-1]) / max(1, len(volumes_5m) - 1)
+    return _evaluate_pump(symbol, last_price, change_1m, change_5m, volume_5m, avg_volume_5m)
+
+
+def _evaluate_pump(
+    symbol: str,
+    last_price: float,
+    change_1m: float,
+    change_5m: float,
+    volume_5m: float,
+    avg_volume_5m: float,
+) -> tuple[Dict[str, Any] | None, str]:
     if avg_volume_5m <= 0:
         return None, "fail_avg_volume"
     volume_mul = volume_5m / avg_volume_5m
@@ -297,6 +312,145 @@ def _calc_signal_from_klines(
     return sig
 
 
+@dataclass
+class _TriggerSeries:
+    """Forming candle of one interval plus the close of the candle before it."""
+
+    open_time: int = 0
+    close: float = 0.0
+    volume: float = 0.0
+    prev_close: float = 0.0
+
+
+@dataclass
+class _TriggerState:
+    m1: _TriggerSeries = field(default_factory=_TriggerSeries)
+    m5: _TriggerSeries = field(default_factory=_TriggerSeries)
+    # volumes of the closed 5m candles inside the PUMPDUMP_5M_LIMIT window
+    volumes_5m: deque = field(default_factory=deque)
+    volume_sum_5m: float = 0.0
+    seeded_1m: bool = False
+    seeded_5m: bool = False
+
+
+class PumpTriggerEvaluator:
+    """
+    Incremental version of the 1m/5m pump trigger for streamed candles.
+
+    Per symbol it keeps the forming 1m/5m candle, the previous closes and a
+    running sum of the closed 5m volumes, so every kline update is evaluated
+    in O(1) with the same thresholds as scan_pumps_chunk (_evaluate_pump).
+    State is seeded from KLINE_STORE the first time a symbol is seen and
+    after missed candles. Triggered signals are queued for next_signal().
+    """
+
+    def __init__(self, window_5m: int = PUMPDUMP_5M_LIMIT - 1) -> None:
+        self.window_5m = max(1, window_5m)
+        self._states: dict[str, _TriggerState] = {}
+        self._queue: asyncio.Queue = asyncio.Queue()
+        self.updates = 0
+        self.triggered = 0
+
+    def on_kline(self, symbol: str, interval: str, row: list, closed: bool = False) -> None:
+        if interval not in (PUMPDUMP_1M_INTERVAL, PUMPDUMP_5M_INTERVAL):
+            return
+        state = self._states.get(symbol)
+        if state is None:
+            state = self._states[symbol] = _TriggerState()
+        self.updates += 1
+        if interval == PUMPDUMP_5M_INTERVAL:
+            if not self._advance_5m(symbol, state, row):
+                return
+        elif not self._advance_1m(symbol, state, row):
+            return
+        if not (state.seeded_1m and state.seeded_5m):
+            return
+        if state.m1.prev_close <= 0 or state.m5.prev_close <= 0 or not state.volumes_5m:
+            return
+        signal, _ = _evaluate_pump(
+            symbol,
+            state.m1.close,
+            (state.m1.close / state.m1.prev_close - 1) * 100,
+            (state.m5.close / state.m5.prev_close - 1) * 100,
+            state.m5.volume,
+            state.volume_sum_5m / len(state.volumes_5m),
+        )
+        if signal:
+            self.triggered += 1
+            self._queue.put_nowait(signal)
+
+    def _advance_1m(self, symbol: str, state: _TriggerState, row: list) -> bool:
+        series = state.m1
+        open_time = int(row[0])
+        if state.seeded_1m and open_time == series.open_time:
+            series.close = float(row[4])
+        elif state.seeded_1m and open_time == series.open_time + interval_to_ms(PUMPDUMP_1M_INTERVAL):
+            series.prev_close = series.close
+            series.open_time = open_time
+            series.close = float(row[4])
+        elif state.seeded_1m and open_time < series.open_time:
+            return False
+        else:
+            state.seeded_1m = self._seed(symbol, PUMPDUMP_1M_INTERVAL, state)
+        return state.seeded_1m
+
+    def _advance_5m(self, symbol: str, state: _TriggerState, row: list) -> bool:
+        series = state.m5
+        open_time = int(row[0])
+        if state.seeded_5m and open_time == series.open_time:
+            series.close = float(row[4])
+            series.volume = float(row[5])
+        elif state.seeded_5m and open_time == series.open_time + interval_to_ms(PUMPDUMP_5M_INTERVAL):
+            volumes = state.volumes_5m
+            if len(volumes) >= self.window_5m:
+                state.volume_sum_5m -= volumes.popleft()
+            volumes.append(series.volume)
+            state.volume_sum_5m += series.volume
+            series.prev_close = series.close
+            series.open_time = open_time
+            series.close = float(row[4])
+            series.volume = float(row[5])
+        elif state.seeded_5m and open_time < series.open_time:
+            return False
+        else:
+            state.seeded_5m = self._seed(symbol, PUMPDUMP_5M_INTERVAL, state)
+        return state.seeded_5m
+
+    def _seed(self, symbol: str, interval: str, state: _TriggerState) -> bool:
+        limit = PUMPDUMP_5M_LIMIT if interval == PUMPDUMP_5M_INTERVAL else 2
+        rows = (KLINE_STORE.get((symbol, interval)) or [])[-limit:]
+        if len(rows) < 2:
+            return False
+        current, previous = rows[-1], rows[-2]
+        series = state.m5 if interval == PUMPDUMP_5M_INTERVAL else state.m1
+        series.open_time = int(current[0])
+        series.close = float(current[4])
+        series.volume = float(current[5])
+        series.prev_close = float(previous[4])
+        if interval == PUMPDUMP_5M_INTERVAL:
+            volumes = [float(item[5]) for item in rows[:-1]][-self.window_5m :]
+            state.volumes_5m = deque(volumes)
+            state.volume_sum_5m = sum(volumes)
+        return True
+
+    def forget(self, symbol: str) -> None:
+        self._states.pop(symbol, None)
+
+    async def next_signal(self) -> Dict[str, Any]:
+        return await self._queue.get()
+
+    def snapshot(self) -> dict[str, int]:
+        return {
+            "symbols": len(self._states),
+            "updates": self.updates,
+            "triggered": self.triggered,
+            "queued": self._queue.qsize(),
+        }
+
+
+PUMP_TRIGGER_EVALUATOR = PumpTriggerEvaluator()
+
+
 async def build_pump_symbol_list(
     session: aiohttp.ClientSession,
     *,
@@ -523,8 +677,8 @@ async def generate_pump_alert(symbol: str) -> str | None:
 
     with binance_request_context("pumpdump"):
         klines_1m, klines_5m = await asyncio.gather(
-            get_klines(symbol, PUMPDUMP_1M_INTERVAL, PUMPDUMP_1M_LIMIT, start_ms=None),
-            get_klines(symbol, PUMPDUMP_5M_INTERVAL, PUMPDUMP_5M_LIMIT, start_ms=None),
+            get_klines(symbol, PUMPDUMP_1M_INTERVAL, PUMPDUMP_1M_LIMIT, start_ms=None, forming=True),
+            get_klines(symbol, PUMPDUMP_5M_INTERVAL, PUMPDUMP_5M_LIMIT, start_ms=None, forming=True),
             return_exceptions=True,
         )
     if isinstance(klines_1m, BaseException):
@@ -0,0 +1,56 @@
+"""
+Render-once cache for broadcast messages.
+
+A broadcast sends the same signal to many recipients, and the text only
+depends on the signal, the recipient's language and a small "variant"
+(admin view, paywall preview, test message...). A RenderCache is created per
+broadcast with a render(lang, variant) callback and formats each
+(lang, variant) pair once; recipients then share the RenderedMessage, and
+per-recipient bits such as the trial suffix are appended at send time with
+with_suffix().
+"""
+
+from __future__ import annotations
+
+from dataclasses import dataclass, replace
+from typing import Callable, Hashable, Optional
+
+from aiogram.types import InlineKeyboardMarkup
+
+
+@dataclass(frozen=True)
+class RenderedMessage:
+    collapsed: str
+    expanded: str
+    reply_markup: Optional[InlineKeyboardMarkup] = None
+
+    @property
+    def text(self) -> str:
+        return self.collapsed
+
+    def with_suffix(self, suffix: str) -> "RenderedMessage":
+        if not suffix:
+            return self
+        return replace(self, collapsed=self.collapsed + suffix, expanded=self.expanded + suffix)
+
+
+class RenderCache:
+    def __init__(self, render: Callable[[str, Hashable], RenderedMessage]) -> None:
+        self._render = render
+        self._items: dict[tuple[str, Hashable], RenderedMessage] = {}
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, lang: str, variant: Hashable = None) -> RenderedMessage:
+        key = (lang, variant)
+        cached = self._items.get(key)
+        if cached is not None:
+            self.hits += 1
+            return cached
+        self.misses += 1
+        cached = self._render(lang, variant)
+        self._items[key] = cached
+        return cached
+
+    def __len__(self) -> int:
+        return len(self._items)
@@ -6,7 +6,8 @@ from statistics import median
 from typing import Any, Dict
 
 from cutoff_config import get_effective_cutoff_ts
-from db_path import get_db_path
+from db_pool import DB_POOL
+from signal_flags import is_test_signal, legacy_test_filter_sql
 from symbol_cache import get_blocked_symbols
 from utils.safe_math import safe_div, safe_pct
 
@@ -27,7 +28,7 @@ def _tp_zone_hit(row: sqlite3.Row | dict[str, Any]) -> bool:
 
 
 def init_signal_audit_tables() -> None:
-    conn = sqlite3.connect(get_db_path())
+    conn = DB_POOL.writer()
     try:
         conn.execute(
             """
@@ -80,7 +81,13 @@ def init_signal_audit_tables() -> None:
                 exp_notified INTEGER NOT NULL DEFAULT 0,
                 nf_notified INTEGER NOT NULL DEFAULT 0,
                 confirm_strict INTEGER NOT NULL DEFAULT 0,
-                confirm_count INTEGER NOT NULL DEFAULT 0
+                confirm_count INTEGER NOT NULL DEFAULT 0,
+                is_test INTEGER NOT NULL DEFAULT 0,
+                audit_cursor_ms INTEGER,
+                entry_touched INTEGER NOT NULL DEFAULT 0,
+                confirm_streak INTEGER NOT NULL DEFAULT 0,
+                confirm_first_at INTEGER,
+                confirm_first_price REAL
             )
             """
         )
@@ -143,6 +150,32 @@ def init_signal_audit_tables() -> None:
             conn.execute("ALTER TABLE signal_audit ADD COLUMN confirm_strict INTEGER NOT NULL DEFAULT 0")
         if "confirm_count" not in cols:
             conn.execute("ALTER TABLE signal_audit ADD COLUMN confirm_count INTEGER NOT NULL DEFAULT 0")
+        if "is_test" not in cols:
+            # флаг теста считается при вставке; старые строки размечаем один раз тем же
+            # LIKE, что раньше стоял в каждом запросе, а триггеры агрегатов пересоздаём
+            for trigger in ("trg_signal_stats_insert", "trg_signal_stats_update", "trg_signal_stats_delete"):
+                conn.execute(f"DROP TRIGGER IF EXISTS {trigger}")
+            conn.execute("ALTER TABLE signal_audit ADD COLUMN is_test INTEGER NOT NULL DEFAULT 0")
+            cur = conn.execute(
+                f"""
+                UPDATE signal_audit SET is_test = 1
+                WHERE {legacy_test_filter_sql(("reason_json", "breakdown_json", "notes"))}
+                """
+            )
+            print(f"[signal_audit] is_test backfilled rows={cur.rowcount or 0}")
+        # курсор аудита: свечи с open_time <= audit_cursor_ms уже обработаны,
+        # NULL — сигнал ещё не проходил аудит и проверяется с sent_at
+        if "audit_cursor_ms" not in cols:
+            conn.execute("ALTER TABLE signal_audit ADD COLUMN audit_cursor_ms INTEGER")
+        if "entry_touched" not in cols:
+            conn.execute("ALTER TABLE signal_audit ADD COLUMN entry_touched INTEGER NOT NULL DEFAULT 0")
+        if "confirm_streak" not in cols:
+            conn.execute("ALTER TABLE signal_audit ADD COLUMN confirm_streak INTEGER NOT NULL DEFAULT 0")
+        if "confirm_first_at" not in cols:
+            conn.execute("ALTER TABLE signal_audit ADD COLUMN confirm_first_at INTEGER")
+        if "confirm_first_price" not in cols:
+            conn.execute("ALTER TABLE signal_audit ADD COLUMN confirm_first_price REAL")
+        conn.execute("CREATE INDEX IF NOT EXISTS idx_signal_audit_test_sent_at ON signal_audit(is_test, sent_at)")
         conn.execute(
             """
             UPDATE signal_audit
@@ -166,11 +199,242 @@ def init_signal_audit_tables() -> None:
               AND COALESCE(outcome, '') NOT IN ('TP1', 'TP2');
             """
         )
+        if _init_signal_stats_rollup(conn):
+            rows = _rebuild_signal_stats(conn)
+            print(f"[signal_audit] signal_stats_daily backfilled rows={rows}")
+        conn.commit()
+    finally:
+        conn.close()
+
+
+# Дневные агрегаты для /stats: (день по sent_at, module, symbol, score_bucket).
+# Поддерживаются триггерами на signal_audit, поэтому insert_signal_audit,
+# mark_signal_closed, mark_signal_tp1_hit и т.д. обновляют их автоматически.
+_STATS_COUNTERS = (
+    "n_counted",
+    "n_closed",
+    "n_filled",
+    "n_wins",
+    "pnl_count",
+    "pnl_sum",
+    "pnl_pos_sum",
+    "pnl_neg_sum",
+    "ai_total",
+    "ai_tp1",
+    "ai_tp2",
+    "ai_sl",
+)
+
+
+def _stats_test_sql(p: str) -> str:
+    return f"(COALESCE({p}is_test, 0) != 0)"
+
+
+def _stats_key_sql(p: str) -> list[str]:
+    return [
+        f"CAST({p}sent_at / 86400 AS INTEGER)",
+        f"{p}module",
+        f"{p}symbol",
+        f"CASE WHEN {p}score >= 90 THEN 90 WHEN {p}score >= 80 THEN 80 WHEN {p}score >= 70 THEN 70 ELSE 0 END",
+    ]
+
+
+def _stats_counter_sql(p: str) -> dict[str, str]:
+    closed = f"({p}status = 'closed' AND {p}outcome IS NOT NULL AND {p}outcome != 'EXPIRED')"
+    filled = f"({closed} AND {p}outcome NOT IN ('NO_FILL', 'AMBIGUOUS'))"
+    win = f"({p}outcome IN ('TP1', 'TP2') OR COALESCE({p}tp1_hit, 0) = 1)"
+    pnl = f"({filled} AND {p}pnl_r IS NOT NULL)"
+    ai = f"({p}status = 'closed' AND {p}outcome IN ('TP1', 'TP2', 'SL', 'BE'))"
+    exprs = {
+        # как (status != 'closed' OR outcome != 'EXPIRED') в get_public_stats, включая NULL
+        "n_counted": f"({p}status != 'closed' OR ({p}outcome IS NOT NULL AND {p}outcome != 'EXPIRED'))",
+        "n_closed": closed,
+        "n_filled": filled,
+        "n_wins": f"({filled} AND {win})",
+        "pnl_count": pnl,
+        "pnl_sum": f"CASE WHEN {pnl} THEN {p}pnl_r ELSE 0 END",
+        "pnl_pos_sum": f"CASE WHEN {pnl} AND {p}pnl_r > 0 THEN {p}pnl_r ELSE 0 END",
+        "pnl_neg_sum": f"CASE WHEN {pnl} AND {p}pnl_r < 0 THEN {p}pnl_r ELSE 0 END",
+        "ai_total": ai,
+        "ai_tp1": f"({ai} AND {win})",
+        "ai_tp2": f"({ai} AND {p}outcome = 'TP2')",
+        "ai_sl": f"({ai} AND {p}outcome = 'SL')",
+    }
+    test = _stats_test_sql(p)
+    # NULL (например, outcome IS NULL) считается как 0, как и в WHERE старых запросов
+    return {name: f"(CASE WHEN {test} THEN 0 ELSE COALESCE({expr}, 0) END)" for name, expr in exprs.items()}
+
+
+def _stats_pnl_cond_sql(p: str) -> str:
+    return f"({_stats_counter_sql(p)['pnl_count']} = 1)"
+
+
+def _init_signal_stats_rollup(conn) -> bool:
+    cur = conn.execute("SELECT 1 FROM sqlite_master WHERE type='table' AND name='signal_stats_daily'")
+    created = cur.fetchone() is None
+    counter_cols = ",\n".join(
+        f"            {name} {'REAL' if name.startswith('pnl_') and name != 'pnl_count' else 'INTEGER'} NOT NULL DEFAULT 0"
+        for name in _STATS_COUNTERS
+    )
+    conn.execute(
+        f"""
+        CREATE TABLE IF NOT EXISTS signal_stats_daily (
+            day INTEGER NOT NULL,
+            module TEXT NOT NULL,
+            symbol TEXT NOT NULL,
+            score_bucket INTEGER NOT NULL,
+{counter_cols},
+            pnl_values TEXT NOT NULL DEFAULT '[]',
+            PRIMARY KEY (day, module, symbol, score_bucket)
+        ) WITHOUT ROWID
+        """
+    )
+    conn.execute("CREATE INDEX IF NOT EXISTS idx_signal_audit_closed_at ON signal_audit(closed_at)")
+
+    key_cols = "day, module, symbol, score_bucket"
+    new_key = _stats_key_sql("NEW.")
+    new_counters = _stats_counter_sql("NEW.")
+    old_key = _stats_key_sql("OLD.")
+    old_counters = _stats_counter_sql("OLD.")
+    add_sql = f"""
+            INSERT INTO signal_stats_daily ({key_cols}, {", ".join(_STATS_COUNTERS)}, pnl_values)
+            VALUES (
+                {", ".join(new_key)},
+                {", ".join(new_counters[name] for name in _STATS_COUNTERS)},
+                CASE WHEN {_stats_pnl_cond_sql("NEW.")} THEN json_array(NEW.pnl_r) ELSE '[]' END
+            )
+            ON CONFLICT ({key_cols}) DO UPDATE SET
+                {", ".join(f"{name} = {name} + excluded.{name}" for name in _STATS_COUNTERS)},
+                pnl_values = CASE
+                    WHEN excluded.pnl_count > 0 THEN json_insert(pnl_values, '$[#]', json_extract(excluded.pnl_values, '$[0]'))
+                    ELSE pnl_values
+                END;
+    """
+    remove_sql = f"""
+            UPDATE signal_stats_daily SET
+                {", ".join(f"{name} = {name} - {old_counters[name]}" for name in _STATS_COUNTERS)},
+                pnl_values = CASE
+                    WHEN {_stats_pnl_cond_sql("OLD.")} THEN COALESCE(
+                        json_remove(
+                            pnl_values,
+                            '$[' || (
+                                SELECT MIN(CAST(item.key AS INTEGER))
+                                FROM json_each(signal_stats_daily.pnl_values) AS item
+                                WHERE item.value = OLD.pnl_r
+                            ) || ']'
+                        ),
+                        pnl_values
+                    )
+                    ELSE pnl_values
+                END
+            WHERE day = {old_key[0]} AND module = {old_key[1]} AND symbol = {old_key[2]} AND score_bucket = {old_key[3]};
+    """
+    conn.execute(f"CREATE TRIGGER IF NOT EXISTS trg_signal_stats_insert AFTER INSERT ON signal_audit BEGIN {add_sql} END")
+    conn.execute(
+        f"""
+        CREATE TRIGGER IF NOT EXISTS trg_signal_stats_update
+        AFTER UPDATE OF status, outcome, tp1_hit, pnl_r, score, sent_at, symbol, module, is_test
+        ON signal_audit
+        BEGIN {remove_sql} {add_sql} END
+        """
+    )
+    conn.execute(f"CREATE TRIGGER IF NOT EXISTS trg_signal_stats_delete AFTER DELETE ON signal_audit BEGIN {remove_sql} END")
+    return created
+
+
+def _rebuild_signal_stats(conn) -> int:
+    key = _stats_key_sql("")
+    counters = _stats_counter_sql("")
+    conn.execute("DELETE FROM signal_stats_daily")
+    conn.execute(
+        f"""
+        INSERT INTO signal_stats_daily (day, module, symbol, score_bucket, {", ".join(_STATS_COUNTERS)}, pnl_values)
+        SELECT {", ".join(key)},
+               {", ".join(f"SUM({counters[name]})" for name in _STATS_COUNTERS)},
+               COALESCE(
+                   json_group_array(pnl_r) FILTER (WHERE {_stats_pnl_cond_sql("")}),
+                   '[]'
+               )
+        FROM signal_audit
+        GROUP BY {", ".join(key)}
+        """
+    )
+    cur = conn.execute("SELECT COUNT(*) FROM signal_stats_daily")
+    return int(cur.fetchone()[0])
+
+
+def rebuild_signal_stats() -> int:
+    """Recompute signal_stats_daily from signal_audit (backfills, manual fixes)."""
+    conn = DB_POOL.writer()
+    try:
+        conn.execute("BEGIN IMMEDIATE")
+        rows = _rebuild_signal_stats(conn)
         conn.commit()
+        return rows
     finally:
         conn.close()
 
 
+def _read_signal_stats(
+    conn,
+    *,
+    since_ts: int | None,
+    min_bucket: int,
+) -> tuple[dict[str, float], list[float]]:
+    """
+    Sum the counters for sent_at >= since_ts. Whole days come from the rollup;
+    the day since_ts falls into is summed from signal_audit with the same
+    expressions, so a rolling window stays exact to the second.
+    """
+    blocked = sorted(get_blocked_symbols())
+    blocked_clause = f" AND symbol NOT IN ({', '.join('?' for _ in blocked)})" if blocked else ""
+    first_full_day = 0
+    totals = {name: 0.0 for name in _STATS_COUNTERS}
+    pnl_values: list[float] = []
+    if since_ts is not None and since_ts > 0:
+        first_full_day = since_ts // 86400 + 1
+        key = _stats_key_sql("")
+        counters = _stats_counter_sql("")
+        cur = conn.execute(
+            f"""
+            SELECT {", ".join(f"COALESCE(SUM({counters[name]}), 0) AS {name}" for name in _STATS_COUNTERS)},
+                   json_group_array(pnl_r) FILTER (WHERE {_stats_pnl_cond_sql("")}) AS pnl_values
+            FROM signal_audit
+            WHERE sent_at >= ? AND sent_at < ?
+              AND {key[3]} >= ?
+              {blocked_clause}
+            """,
+            [int(since_ts), first_full_day * 86400, int(min_bucket), *blocked],
+        )
+        row = cur.fetchone()
+        for name in _STATS_COUNTERS:
+            totals[name] += float(row[name] or 0)
+        pnl_values.extend(json.loads(row["pnl_values"] or "[]"))
+    cur = conn.execute(
+        f"""
+        SELECT {", ".join(f"COALESCE(SUM({name}), 0) AS {name}" for name in _STATS_COUNTERS)}
+        FROM signal_stats_daily
+        WHERE day >= ? AND score_bucket >= ?
+          {blocked_clause}
+        """,
+        [first_full_day, int(min_bucket), *blocked],
+    )
+    row = cur.fetchone()
+    for name in _STATS_COUNTERS:
+        totals[name] += float(row[name] or 0)
+    cur = conn.execute(
+        f"""
+        SELECT pnl_values FROM signal_stats_daily
+        WHERE day >= ? AND score_bucket >= ? AND pnl_count > 0
+          {blocked_clause}
+        """,
+        [first_full_day, int(min_bucket), *blocked],
+    )
+    for (values,) in cur.fetchall():
+        pnl_values.extend(json.loads(values))
+    return totals, pnl_values
+
+
 def _compute_rr(signal_dict: dict) -> float:
     reason = signal_dict.get("reason") if isinstance(signal_dict.get("reason"), dict) else {}
     rr = reason.get("rr")
@@ -214,6 +478,8 @@ def insert_signal_audit(
     breakdown = signal_dict.get("breakdown") if isinstance(signal_dict.get("breakdown"), list) else []
     rr_value = _compute_rr(signal_dict)
     signal_sent_at = int(time.time()) if sent_at is None else int(sent_at)
+    reason_json = json.dumps(reason, ensure_ascii=False)
+    breakdown_json = json.dumps(breakdown, ensure_ascii=False)
 
     payload = (
         signal_id,
@@ -229,17 +495,18 @@ def insert_signal_audit(
         float(signal_dict.get("tp2", 0.0)),
         float(signal_dict.get("score", 0.0)),
         float(rr_value),
-        json.dumps(reason, ensure_ascii=False),
-        json.dumps(breakdown, ensure_ascii=False),
+        reason_json,
+        breakdown_json,
         signal_sent_at,
         "open",
         int(signal_dict.get("ttl_minutes", 720) or 720),
         "WAITING_ENTRY",
         int(bool(signal_dict.get("confirm_strict", False))),
         int(signal_dict.get("confirm_count", 0) or 0),
+        1 if is_test_signal(symbol_value, reason_json, breakdown_json) else 0,
     )
 
-    conn = sqlite3.connect(get_db_path())
+    conn = DB_POOL.writer()
     try:
         conn.execute(
             """
@@ -247,8 +514,8 @@ def insert_signal_audit(
                 signal_id, module, tier, symbol, direction, timeframe,
                 entry_from, entry_to, sl, tp1, tp2, score, rr,
                 reason_json, breakdown_json, sent_at, status, ttl_minutes
-                , state, confirm_strict, confirm_count
-            ) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+                , state, confirm_strict, confirm_count, is_test
+            ) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
             """,
             payload,
         )
@@ -289,7 +556,7 @@ def mark_signal_closed(
     notes: str | None,
     close_state: str | None = None,
 ) -> None:
-    conn = sqlite3.connect(get_db_path())
+    conn = DB_POOL.writer()
     try:
         state_expr = "state = ?," if close_state is not None else ""
         params: list[object] = [
@@ -300,7 +567,7 @@ def mark_signal_closed(
         ]
         if close_state is not None:
             params.append(close_state)
-        params.extend([notes, signal_id])
+        params.extend([notes, 1 if is_test_signal(None, notes) else 0, signal_id])
         conn.execute(
             """
             UPDATE signal_audit
@@ -312,7 +579,8 @@ def mark_signal_closed(
                 pnl_r = ?,
                 filled_at = ?,
                 {state_expr}
-                notes = ?
+                notes = ?,
+                is_test = MAX(is_test, ?)
             WHERE signal_id = ?
             """.format(state_expr=state_expr),
             [params[0], params[1], params[1], *params[2:]],
@@ -353,7 +621,7 @@ def mark_signal_state(
         params.append(int(confirm_count))
     params.extend([signal_id, *from_states])
 
-    conn = sqlite3.connect(get_db_path())
+    conn = DB_POOL.writer()
     try:
         cur = conn.execute(
             f"""
@@ -372,7 +640,7 @@ def mark_signal_state(
 
 
 def mark_signal_activated(signal_id: str, *, activated_at: int, entry_price: float) -> int:
-    conn = sqlite3.connect(get_db_path())
+    conn = DB_POOL.writer()
     try:
         cur = conn.execute(
             """
@@ -393,7 +661,7 @@ def mark_signal_activated(signal_id: str, *, activated_at: int, entry_price: flo
 
 
 def mark_signal_tp1_hit(signal_id: str, *, tp1_hit_at: int) -> int:
-    conn = sqlite3.connect(get_db_path())
+    conn = DB_POOL.writer()
     try:
         cur = conn.execute(
             """
@@ -429,7 +697,7 @@ def claim_signal_notification(signal_id: str, *, event_type: str) -> bool:
     col = col_map.get(str(event_type).upper())
     if col is None:
         return False
-    conn = sqlite3.connect(get_db_path())
+    conn = DB_POOL.writer()
     try:
         cur = conn.execute(
             f"""
@@ -454,7 +722,7 @@ def update_signal_be_tracking(
     be_triggered: bool,
     be_trigger_price: float | None,
 ) -> None:
-    conn = sqlite3.connect(get_db_path())
+    conn = DB_POOL.writer()
     try:
         conn.execute(
             """
@@ -482,8 +750,45 @@ def update_signal_be_tracking(
         conn.close()
 
 
+def update_signal_audit_cursor(
+    signal_id: str,
+    *,
+    cursor_ms: int,
+    entry_touched: bool,
+    confirm_streak: int,
+    confirm_first_at: int | None,
+    confirm_first_price: float | None,
+) -> int:
+    conn = DB_POOL.writer()
+    try:
+        cur = conn.execute(
+            """
+            UPDATE signal_audit
+            SET audit_cursor_ms = ?,
+                entry_touched = MAX(COALESCE(entry_touched, 0), ?),
+                confirm_streak = ?,
+                confirm_first_at = ?,
+                confirm_first_price = ?
+            WHERE signal_id = ?
+              AND status = 'open'
+            """,
+            (
+                int(cursor_ms),
+                1 if entry_touched else 0,
+                int(confirm_streak),
+                int(confirm_first_at) if confirm_first_at is not None else None,
+                float(confirm_first_price) if confirm_first_price is not None else None,
+                signal_id,
+            ),
+        )
+        conn.commit()
+        return int(cur.rowcount or 0)
+    finally:
+        conn.close()
+
+
 def mark_be_finalised(signal_id: str) -> int:
-    conn = sqlite3.connect(get_db_path())
+    conn = DB_POOL.writer()
     try:
         cur = conn.execute(
             """
@@ -501,7 +806,7 @@ def mark_be_finalised(signal_id: str) -> int:
 
 
 def get_signal_audit_by_identity(*, module: str, symbol: str, sent_at: int) -> dict | None:
-    conn = sqlite3.connect(get_db_path())
+    conn = DB_POOL.reader()
     conn.row_factory = sqlite3.Row
     try:
         cur = conn.execute(
@@ -521,7 +826,7 @@ def get_signal_audit_by_identity(*, module: str, symbol: str, sent_at: int) -> d
 
 
 def fetch_open_signals(max_age_sec: int = 86400) -> list[dict]:
-    conn = sqlite3.connect(get_db_path())
+    conn = DB_POOL.reader()
     conn.row_factory = sqlite3.Row
     try:
         blocked_clause, blocked_params = _blocked_symbols_clause()
@@ -531,15 +836,7 @@ def fetch_open_signals(max_age_sec: int = 86400) -> list[dict]:
             SELECT *
             FROM signal_audit
             WHERE status = 'open' AND sent_at >= ?
-              AND NOT (
-                symbol LIKE 'TEST%' OR
-                LOWER(COALESCE(reason_json, '')) LIKE '%test%' OR
-                LOWER(COALESCE(reason_json, '')) LIKE '%тест%' OR
-                LOWER(COALESCE(breakdown_json, '')) LIKE '%test%' OR
-                LOWER(COALESCE(breakdown_json, '')) LIKE '%тест%' OR
-                LOWER(COALESCE(notes, '')) LIKE '%test%' OR
-                LOWER(COALESCE(notes, '')) LIKE '%тест%'
-              )
+              AND is_test = 0
               {blocked_clause}
             ORDER BY sent_at ASC
             """,
@@ -557,64 +854,19 @@ def get_public_stats(days: int = 30, *, include_legacy: bool = False) -> dict:
     if cutoff_ts > since_ts:
         since_ts = cutoff_ts
     min_score = 80.0
-    conn = sqlite3.connect(get_db_path())
+    conn = DB_POOL.reader()
     conn.row_factory = sqlite3.Row
     try:
         blocked_clause, blocked_params = _blocked_symbols_clause()
-        cur = conn.cursor()
-        cur.execute(
-            f"""
-            SELECT COUNT(*) AS total
-            FROM signal_audit
-            WHERE sent_at >= ?
-              AND score >= ?
-              AND (status != 'closed' OR outcome != 'EXPIRED')
-              AND NOT (
-                symbol LIKE 'TEST%' OR
-                LOWER(COALESCE(reason_json, '')) LIKE '%test%' OR
-                LOWER(COALESCE(reason_json, '')) LIKE '%тест%' OR
-                LOWER(COALESCE(breakdown_json, '')) LIKE '%test%' OR
-                LOWER(COALESCE(breakdown_json, '')) LIKE '%тест%' OR
-                LOWER(COALESCE(notes, '')) LIKE '%test%' OR
-                LOWER(COALESCE(notes, '')) LIKE '%тест%'
-              )
-              {blocked_clause}
-            """,
-            [since_ts, min_score, *blocked_params],
-        )
-        total = int(cur.fetchone()["total"])
-
-        cur.execute(
-            f"""
-            SELECT outcome, pnl_r, tp1_hit
-            FROM signal_audit
-            WHERE status = 'closed' AND sent_at >= ?
-              AND score >= ?
-              AND outcome != 'EXPIRED'
-              AND NOT (
-                symbol LIKE 'TEST%' OR
-                LOWER(COALESCE(reason_json, '')) LIKE '%test%' OR
-                LOWER(COALESCE(reason_json, '')) LIKE '%тест%' OR
-                LOWER(COALESCE(breakdown_json, '')) LIKE '%test%' OR
-                LOWER(COALESCE(breakdown_json, '')) LIKE '%тест%' OR
-                LOWER(COALESCE(notes, '')) LIKE '%test%' OR
-                LOWER(COALESCE(notes, '')) LIKE '%тест%'
-              )
-              {blocked_clause}
-            """,
-            [since_ts, min_score, *blocked_params],
-        )
-        closed_rows = cur.fetchall()
-        closed = len(closed_rows)
+        counters, pnl_values = _read_signal_stats(conn, since_ts=since_ts, min_bucket=int(min_score))
+        total = int(counters["n_counted"])
+        closed = int(counters["n_closed"])
+        filled_closed = int(counters["n_filled"])
 
         excluded_outcomes = {"NO_FILL", "AMBIGUOUS"}
-        filled_rows = [row for row in closed_rows if row["outcome"] not in excluded_outcomes]
-        filled_closed = len(filled_rows)
-
-        wins = sum(1 for row in filled_rows if row["outcome"] in ("TP1", "TP2") or _tp_zone_hit(row))
+        wins = int(counters["n_wins"])
         winrate = safe_div(wins, filled_closed, 0.0) if filled_closed else 0.0
 
-        pnl_values = [row["pnl_r"] for row in filled_rows if row["pnl_r"] is not None]
         avg_r = safe_div(sum(pnl_values), len(pnl_values), 0.0) if pnl_values else 0.0
         median_r = float(median(pnl_values)) if pnl_values else 0.0
 
@@ -624,6 +876,7 @@ def get_public_stats(days: int = 30, *, include_legacy: bool = False) -> dict:
             safe_div(positive_sum, abs(negative_sum), 0.0) if negative_sum < 0 else None
         )
 
+        cur = conn.cursor()
         cur.execute(
             f"""
             SELECT symbol, direction, outcome, pnl_r, tp1_hit
@@ -631,15 +884,7 @@ def get_public_stats(days: int = 30, *, include_legacy: bool = False) -> dict:
             WHERE sent_at >= ?
               AND score >= ?
               AND (status != 'closed' OR outcome != 'EXPIRED')
-              AND NOT (
-                symbol LIKE 'TEST%' OR
-                LOWER(COALESCE(reason_json, '')) LIKE '%test%' OR
-                LOWER(COALESCE(reason_json, '')) LIKE '%тест%' OR
-                LOWER(COALESCE(breakdown_json, '')) LIKE '%test%' OR
-                LOWER(COALESCE(breakdown_json, '')) LIKE '%тест%' OR
-                LOWER(COALESCE(notes, '')) LIKE '%test%' OR
-                LOWER(COALESCE(notes, '')) LIKE '%тест%'
-              )
+              AND is_test = 0
               {blocked_clause}
             ORDER BY sent_at DESC
             LIMIT 10
@@ -655,36 +900,27 @@ def get_public_stats(days: int = 30, *, include_legacy: bool = False) -> dict:
             WHERE status = 'closed' AND sent_at >= ?
               AND score >= ?
               AND outcome != 'EXPIRED'
-              AND NOT (
-                symbol LIKE 'TEST%' OR
-                LOWER(COALESCE(reason_json, '')) LIKE '%test%' OR
-                LOWER(COALESCE(reason_json, '')) LIKE '%тест%' OR
-                LOWER(COALESCE(breakdown_json, '')) LIKE '%test%' OR
-                LOWER(COALESCE(breakdown_json, '')) LIKE '%тест%' OR
-                LOWER(COALESCE(notes, '')) LIKE '%test%' OR
-                LOWER(COALESCE(notes, '')) LIKE '%тест%'
-              )
+              AND is_test = 0
               {blocked_clause}
-            ORDER BY closed_at DESC
+            ORDER BY closed_at DESC, rowid DESC
             """,
             [since_ts, min_score, *blocked_params],
         )
-        streak_rows = [
-            ("TP1" if _tp_zone_hit(row) else row["outcome"])
-            for row in cur.fetchall()
-            if row["outcome"] not in excluded_outcomes
-        ]
+        # серия считается по последним закрытиям: читаем, пока она не прервётся
         streak = "-"
-        if streak_rows:
-            first = streak_rows[0]
-            is_win = first in ("TP1", "TP2")
-            count = 0
-            for outcome in streak_rows:
-                outcome_is_win = outcome in ("TP1", "TP2")
-                if outcome_is_win == is_win:
-                    count += 1
-                else:
-                    break
+        is_win = None
+        count = 0
+        for row in cur:
+            if row["outcome"] in excluded_outcomes:
+                continue
+            outcome = "TP1" if _tp_zone_hit(row) else row["outcome"]
+            outcome_is_win = outcome in ("TP1", "TP2")
+            if is_win is None:
+                is_win = outcome_is_win
+            if outcome_is_win != is_win:
+                break
+            count += 1
+        if is_win is not None:
             streak = f"{'W' if is_win else 'L'}{count}"
 
         filled_rate = safe_div(filled_closed, total, 0.0) if total else 0.0
@@ -706,7 +942,7 @@ def get_public_stats(days: int = 30, *, include_legacy: bool = False) -> dict:
 
 
 def get_last_signal_audit(module: str, *, include_legacy: bool = False) -> dict | None:
-    conn = sqlite3.connect(get_db_path())
+    conn = DB_POOL.reader()
     conn.row_factory = sqlite3.Row
     try:
         blocked_clause, blocked_params = _blocked_symbols_clause()
@@ -717,15 +953,7 @@ def get_last_signal_audit(module: str, *, include_legacy: bool = False) -> dict
             FROM signal_audit
             WHERE module = ?
               AND sent_at >= ?
-              AND NOT (
-                symbol LIKE 'TEST%' OR
-                LOWER(COALESCE(reason_json, '')) LIKE '%test%' OR
-                LOWER(COALESCE(reason_json, '')) LIKE '%тест%' OR
-                LOWER(COALESCE(breakdown_json, '')) LIKE '%test%' OR
-                LOWER(COALESCE(breakdown_json, '')) LIKE '%тест%' OR
-                LOWER(COALESCE(notes, '')) LIKE '%test%' OR
-                LOWER(COALESCE(notes, '')) LIKE '%тест%'
-              )
+              AND is_test = 0
               {blocked_clause}
             ORDER BY sent_at DESC
             LIMIT 1
@@ -752,7 +980,7 @@ def has_recent_signal_for_symbol(
     now_value = int(time.time()) if now_ts is None else int(now_ts)
     since_ts = max(0, now_value - max(0, int(within_sec)))
 
-    conn = sqlite3.connect(get_db_path())
+    conn = DB_POOL.reader()
     conn.row_factory = sqlite3.Row
     try:
         blocked_clause, blocked_params = _blocked_symbols_clause()
@@ -764,15 +992,7 @@ def has_recent_signal_for_symbol(
             WHERE module = ?
               AND UPPER(symbol) = ?
               AND sent_at >= ?
-              AND NOT (
-                symbol LIKE 'TEST%' OR
-                LOWER(COALESCE(reason_json, '')) LIKE '%test%' OR
-                LOWER(COALESCE(reason_json, '')) LIKE '%тест%' OR
-                LOWER(COALESCE(breakdown_json, '')) LIKE '%test%' OR
-                LOWER(COALESCE(breakdown_json, '')) LIKE '%тест%' OR
-                LOWER(COALESCE(notes, '')) LIKE '%test%' OR
-                LOWER(COALESCE(notes, '')) LIKE '%тест%'
-              )
+              AND is_test = 0
               {blocked_clause}
             LIMIT 1
             """,
@@ -789,7 +1009,7 @@ def count_signals_sent_since(
     module: str | None = "ai_signals",
     include_legacy: bool = False,
 ) -> int:
-    conn = sqlite3.connect(get_db_path())
+    conn = DB_POOL.reader()
     conn.row_factory = sqlite3.Row
     try:
         blocked_clause, blocked_params = _blocked_symbols_clause()
@@ -805,15 +1025,7 @@ def count_signals_sent_since(
             FROM signal_audit
             WHERE sent_at >= ?
               {module_clause}
-              AND NOT (
-                symbol LIKE 'TEST%' OR
-                LOWER(COALESCE(reason_json, '')) LIKE '%test%' OR
-                LOWER(COALESCE(reason_json, '')) LIKE '%тест%' OR
-                LOWER(COALESCE(breakdown_json, '')) LIKE '%test%' OR
-                LOWER(COALESCE(breakdown_json, '')) LIKE '%тест%' OR
-                LOWER(COALESCE(notes, '')) LIKE '%test%' OR
-                LOWER(COALESCE(notes, '')) LIKE '%тест%'
-              )
+              AND is_test = 0
               {blocked_clause}
             """,
             [*params, *blocked_params],
@@ -828,87 +1040,44 @@ def count_signals_sent_since(
 
 def get_ai_signal_stats(days: int | None, *, include_legacy: bool = False) -> dict:
     now = int(time.time())
-    params: list[Any] = ["TP1", "TP2", "SL", "BE", 80.0]
-    since_clauses: list[str] = []
+    since_values: list[int] = []
     if days is not None:
-        since_clauses.append("sent_at >= ?")
-        params.append(now - days * 86400)
+        since_values.append(now - days * 86400)
     cutoff_ts = get_effective_cutoff_ts(include_legacy=include_legacy)
     if cutoff_ts > 0:
-        since_clauses.append("sent_at >= ?")
-        params.append(cutoff_ts)
-    since_clause = ""
-    if since_clauses:
-        since_clause = " AND " + " AND ".join(since_clauses)
-
-    blocked_clause, blocked_params = _blocked_symbols_clause()
-    params.extend(blocked_params)
-    conn = sqlite3.connect(get_db_path())
+        since_values.append(cutoff_ts)
+    since_ts = max(since_values) if since_values else None
+
+    conn = DB_POOL.reader()
     conn.row_factory = sqlite3.Row
     try:
-        cur = conn.cursor()
-        cur.execute(
-            f"""
-            SELECT outcome, score, tp1_hit
-            FROM signal_audit
-            WHERE status = 'closed'
-              AND outcome IN (?, ?, ?, ?)
-              AND score >= ?
-              AND NOT (
-                symbol LIKE 'TEST%' OR
-                LOWER(COALESCE(reason_json, '')) LIKE '%test%' OR
-                LOWER(COALESCE(reason_json, '')) LIKE '%тест%' OR
-                LOWER(COALESCE(breakdown_json, '')) LIKE '%test%' OR
-                LOWER(COALESCE(breakdown_json, '')) LIKE '%тест%' OR
-                LOWER(COALESCE(notes, '')) LIKE '%test%' OR
-                LOWER(COALESCE(notes, '')) LIKE '%тест%'
-              )
-              {since_clause}
-              {blocked_clause}
-            """,
-            params,
-        )
-        rows = cur.fetchall()
-
-        total = len(rows)
-        tp2 = sum(1 for row in rows if row["outcome"] == "TP2")
-        tp1 = sum(1 for row in rows if row["outcome"] in ("TP1", "TP2") or _tp_zone_hit(row))
-        sl = sum(1 for row in rows if row["outcome"] == "SL")
-        exp = 0
-        winrate = safe_pct(tp1, total, 0.0) if total else 0.0
-
-        buckets = {
-            "0-69": {"total": 0, "tp1plus": 0},
-            "70-79": {"total": 0, "tp1plus": 0},
-            "80-100": {"total": 0, "tp1plus": 0},
-        }
-        for row in rows:
-            score = row["score"]
-            if score is None:
-                continue
-            score_value = float(score)
-            if score_value < 70:
-                bucket = buckets["0-69"]
-            elif score_value < 80:
-                bucket = buckets["70-79"]
-            else:
-                bucket = buckets["80-100"]
-            bucket["total"] += 1
-            if row["outcome"] in ("TP1", "TP2") or _tp_zone_hit(row):
-                bucket["tp1plus"] += 1
-
-        for bucket in buckets.values():
-            total_bucket = bucket["total"]
-            bucket["winrate"] = safe_pct(bucket["tp1plus"], total_bucket, 0.0) if total_bucket else 0.0
-
-        return {
-            "total": total,
-            "tp1": tp1,
-            "tp2": tp2,
-            "sl": sl,
-            "exp": exp,
-            "winrate": winrate,
-            "buckets": buckets,
-        }
+        counters, _ = _read_signal_stats(conn, since_ts=since_ts, min_bucket=80)
     finally:
         conn.close()
+
+    total = int(counters["ai_total"])
+    tp2 = int(counters["ai_tp2"])
+    tp1 = int(counters["ai_tp1"])
+    sl = int(counters["ai_sl"])
+    exp = 0
+    winrate = safe_pct(tp1, total, 0.0) if total else 0.0
+
+    # в выборку попадают только score >= 80, младшие корзины остаются пустыми
+    buckets = {
+        "0-69": {"total": 0, "tp1plus": 0},
+        "70-79": {"total": 0, "tp1plus": 0},
+        "80-100": {"total": total, "tp1plus": tp1},
+    }
+    for bucket in buckets.values():
+        total_bucket = bucket["total"]
+        bucket["winrate"] = safe_pct(bucket["tp1plus"], total_bucket, 0.0) if total_bucket else 0.0
+
+    return {
+        "total": total,
+        "tp1": tp1,
+        "tp2": tp2,
+        "sl": sl,
+        "exp": exp,
+        "winrate": winrate,
+        "buckets": buckets,
+    }
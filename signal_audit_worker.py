@@ -2,11 +2,13 @@ import asyncio
 import logging
 import os
 import time
+from bisect import bisect_left
+from dataclasses import dataclass, field, replace
 from typing import Any, Dict, Optional, Tuple
 
 from binance_rest import binance_request_context, fetch_klines
+from db_pool import DB_POOL, run_db
 from health import (
-    MODULES,
     mark_ok,
     mark_tick,
     safe_worker_loop,
@@ -28,8 +30,10 @@ from signal_audit_db import (
     mark_signal_closed,
     mark_signal_state,
     mark_signal_tp1_hit,
+    update_signal_audit_cursor,
     update_signal_be_tracking,
 )
+from kline_store import BINANCE_KLINES_MAX_LIMIT, interval_to_ms
 from settings import SIGNAL_TTL_SECONDS
 from utils.safe_math import EPS, safe_div
 
@@ -44,6 +48,7 @@ logger = logging.getLogger(__name__)
 BE_LEVELS = [8.0, 10.0, 12.0]
 BE_TRIGGER_PCT = BE_LEVELS[0]
 DEFAULT_LEVERAGE = 10.0
+AUDIT_FETCH_CONCURRENCY = max(1, int(os.getenv("AUDIT_FETCH_CONCURRENCY", "8")))
 
 
 def be_level_label(max_profit_pct: float) -> float:
@@ -126,17 +131,8 @@ def _require_two_closes() -> bool:
     return value not in {"0", "false", "no"}
 
 
-def _find_activation_from_candles(signal: Dict[str, Any], candles: list[Dict[str, float]]) -> tuple[int, float, int] | None:
-    if not candles:
-        return None
-    direction = str(signal.get("direction", "")).lower()
-    poi_from = float(signal["entry_from"])
-    poi_to = float(signal["entry_to"])
-
-    seen_poi_touch = False
-    strict = bool(signal.get("confirm_strict", False))
-    required_closes = 1
-    if strict:
+def _required_confirm_closes(signal: Dict[str, Any]) -> int:
+    if bool(signal.get("confirm_strict", False)):
         try:
             required_closes = int(
                 os.getenv("SOFT_BTC_STRICT_CONFIRM_N", os.getenv("SOFT_BTC_STRICT_CONFIRM_CLOSES", "2"))
@@ -144,38 +140,80 @@ def _find_activation_from_candles(signal: Dict[str, Any], candles: list[Dict[str
             )
         except (TypeError, ValueError):
             required_closes = 2
-        required_closes = max(2, required_closes)
-    elif _require_two_closes():
-        required_closes = 2
+        return max(2, required_closes)
+    if _require_two_closes():
+        return 2
+    return 1
+
+
+@dataclass
+class _ConfirmProgress:
+    """Running state of the activation scan, persisted with the audit cursor."""
+
+    entry_touched: bool = False
+    streak: int = 0
+    first_at: int | None = None
+    first_price: float | None = None
+
+    @classmethod
+    def from_signal(cls, signal: Dict[str, Any]) -> "_ConfirmProgress":
+        if signal.get("audit_cursor_ms") is None:
+            return cls()
+        first_at = signal.get("confirm_first_at")
+        first_price = signal.get("confirm_first_price")
+        return cls(
+            entry_touched=bool(signal.get("entry_touched")),
+            streak=int(signal.get("confirm_streak") or 0),
+            first_at=int(first_at) if first_at is not None else None,
+            first_price=float(first_price) if first_price is not None else None,
+        )
 
-    consecutive = 0
-    first_confirm_idx = None
-    for idx, candle in enumerate(candles):
-        if not seen_poi_touch and _entry_filled(candle, min(poi_from, poi_to), max(poi_from, poi_to)):
-            seen_poi_touch = True
 
-        if not seen_poi_touch:
+def _advance_activation(
+    signal: Dict[str, Any],
+    candles: list[Dict[str, float]],
+    progress: _ConfirmProgress,
+) -> tuple[int, float, int] | None:
+    """Feed candles into the activation scan; progress is updated in place."""
+    direction = str(signal.get("direction", "")).lower()
+    poi_from = float(signal["entry_from"])
+    poi_to = float(signal["entry_to"])
+    required_closes = _required_confirm_closes(signal)
+
+    for candle in candles:
+        if not progress.entry_touched and _entry_filled(candle, min(poi_from, poi_to), max(poi_from, poi_to)):
+            progress.entry_touched = True
+
+        if not progress.entry_touched:
             continue
 
         close_price = float(candle["close"])
         if _is_close_inside_poi(close_price, poi_from, poi_to):
-            consecutive = 0
-            first_confirm_idx = None
+            progress.streak = 0
+            progress.first_at = None
+            progress.first_price = None
             continue
 
         if _is_directional_close_outside_poi(close_price, direction, poi_from, poi_to):
-            if consecutive == 0:
-                first_confirm_idx = idx
-            consecutive += 1
-            if consecutive >= required_closes and first_confirm_idx is not None:
-                first_candle = candles[first_confirm_idx]
-                return int(first_candle["open_time"] / 1000), float(first_candle["close"]), consecutive
+            if progress.streak == 0:
+                progress.first_at = int(candle["open_time"] / 1000)
+                progress.first_price = close_price
+            progress.streak += 1
+            if progress.streak >= required_closes and progress.first_at is not None:
+                return progress.first_at, float(progress.first_price), progress.streak
         else:
-            consecutive = 0
-            first_confirm_idx = None
+            progress.streak = 0
+            progress.first_at = None
+            progress.first_price = None
     return None
 
 
+def _find_activation_from_candles(signal: Dict[str, Any], candles: list[Dict[str, float]]) -> tuple[int, float, int] | None:
+    if not candles:
+        return None
+    return _advance_activation(signal, candles, _ConfirmProgress())
+
+
 def _find_poi_touch_ts(signal: Dict[str, Any], candles: list[Dict[str, float]]) -> int | None:
     if not candles:
         return None
@@ -268,12 +306,16 @@ def _evaluate_signal(signal: Dict[str, Any], candles: list[Dict[str, float]]) ->
     max_profit_pct = float(signal.get("max_profit_pct") or 0.0)
     be_triggered = bool(signal.get("be_triggered"))
     be_trigger_price = signal.get("be_trigger_price")
+    be_level_pct = be_level_label(max_profit_pct)
+    be_trigger_event = False
     leverage = DEFAULT_LEVERAGE
+    walked = False
 
     for candle in candles:
         candle_ts = int(candle["open_time"] / 1000)
         if candle_ts < int(activated_at):
             continue
+        walked = True
 
         sl_hit, tp1_hit_candle, tp2_hit_candle, be_hit = _check_hits(
             candle, direction, sl, tp1, tp2, entry_ref
@@ -288,7 +330,6 @@ def _evaluate_signal(signal: Dict[str, Any], candles: list[Dict[str, float]]) ->
             max_profit_pct = current_profit_pct
         be_level_pct = be_level_label(max_profit_pct)
 
-        be_trigger_event = False
         if current_profit_pct >= BE_TRIGGER_PCT and not tp1_hit and not be_triggered:
             be_triggered = True
             be_trigger_price = float(candle["close"])
@@ -378,306 +419,487 @@ def _evaluate_signal(signal: Dict[str, Any], candles: list[Dict[str, float]]) ->
 
     # TTL applies only while waiting for confirmation/activation.
     # Once active, the position must be tracked until TP/SL/BE and can never become EXPIRED.
-    return None
+    if not walked:
+        return None
+    # still open: only the BE tracking state moved, the audit cursor keeps it
+    return {
+        "outcome": None,
+        "pnl_r": None,
+        "filled_at": filled_at,
+        "notes": None,
+        "continue_open": True,
+        "max_profit_pct": max_profit_pct,
+        "be_triggered": be_triggered,
+        "be_trigger_price": be_trigger_price,
+        "be_trigger_event": be_trigger_event,
+        "be_level_pct": be_level_pct,
+    }
+
+
+@dataclass
+class _AuditPlan:
+    """State transitions found for one signal in one audit cycle."""
+
+    signal: Dict[str, Any]
+    expired: bool = False
+    poi_touched_at: int | None = None
+    activation: tuple[int, float, int] | None = None
+    result: Optional[dict] = None
+    # new audit cursor and the activation scan state after the closed candles
+    cursor_ms: int | None = None
+    progress: Optional[_ConfirmProgress] = None
+    # filled in by _apply_audit_plans from the UPDATE row counts
+    applied: bool = False
+    poi_marked: bool = False
+    activated: bool = False
+    be_claimed: bool = False
+    final_claimed: bool = False
+    final_payloads: list[dict[str, Any]] = field(default_factory=list)
+
+
+_CLOSE_STATE_MAP = {
+    "TP1": "CLOSED_TP1",
+    "TP2": "CLOSED_TP2",
+    "SL": "CLOSED_SL",
+    "BE": "CLOSED_BE",
+    "NO_FILL": "EXPIRED",
+}
+_EVENT_STATUS_MAP = {
+    "TP1": "TP1",
+    "TP2": "TP2",
+    "SL": "SL",
+    "EXPIRED": "EXP",
+    "BE": "BE",
+    "NO_FILL": "NO_FILL",
+    "AMBIGUOUS": "AMBIGUOUS",
+}
+
+
+def _audit_start_ms(signal: Dict[str, Any]) -> int:
+    """First open_time the signal still needs: after its audit cursor, or sent_at."""
+    sent_ms = int(signal["sent_at"]) * 1000
+    cursor = signal.get("audit_cursor_ms")
+    if cursor is None:
+        return sent_ms
+    start = max(sent_ms, int(cursor) + 1)
+    first_at = signal.get("confirm_first_at")
+    if int(signal.get("confirm_streak") or 0) > 0 and first_at is not None:
+        # a pending confirmation activates at its first close, evaluation starts there
+        start = min(start, max(sent_ms, int(first_at) * 1000))
+    return start
+
+
+async def _fetch_symbol_candles(symbol: str, interval: str, signals: list[dict]) -> list[Dict[str, float]]:
+    """One candle window per symbol, starting at the earliest candle any of its signals needs."""
+    start_ms = min(_audit_start_ms(signal) for signal in signals)
+    interval_ms = interval_to_ms(interval) or 300_000
+    needed = (int(time.time() * 1000) - start_ms) // interval_ms + 2
+    limit = max(1, min(BINANCE_KLINES_MAX_LIMIT, needed))
+    with binance_request_context("signal_audit"):
+        data = await fetch_klines(symbol, interval, limit, start_ms=start_ms)
+    if not data:
+        return []
+    candles = []
+    for item in data:
+        parsed = _parse_kline(item)
+        if parsed and parsed["open_time"] >= start_ms:
+            candles.append(parsed)
+    return candles
+
+
+def _candles_since(candles: list[Dict[str, float]], open_times: list[int], start_ms: int) -> list[Dict[str, float]]:
+    return candles[bisect_left(open_times, start_ms):]
+
+
+def _plan_signal(
+    signal: Dict[str, Any],
+    candles: list[Dict[str, float]],
+    now_ts: int,
+    interval_ms: int,
+) -> _AuditPlan | None:
+    """
+    Evaluate one signal without touching the DB; the writes happen in _apply_audit_plans.
+
+    Only candles after the signal's audit cursor are walked. The cursor and the
+    confirmation streak advance over closed candles only: the forming candle is
+    evaluated every cycle but counted once it closes.
+    """
+    sent_at = int(signal["sent_at"])
+    state = str(signal.get("state") or "WAITING_ENTRY").upper()
+    is_activated = bool(signal.get("is_activated")) or signal.get("activated_at") is not None
+    ttl_minutes = int(signal.get("ttl_minutes") or SIGNAL_TTL_SECONDS // 60)
+    ttl_sec = max(60, ttl_minutes * 60)
+    waiting_states = {"WAIT_CONFIRM", "WAITING_ENTRY", "POI_TOUCHED"}
+    entry_price = float(signal.get("entry_price") or 0.0)
+    if (
+        now_ts > sent_at + ttl_sec
+        and state in waiting_states
+        and not is_activated
+        and entry_price <= 0.0
+    ):
+        return _AuditPlan(signal, expired=True)
+
+    cursor = signal.get("audit_cursor_ms")
+    cursor_ms = int(cursor) if cursor is not None else sent_at * 1000 - 1
+    new_candles = [candle for candle in candles if candle["open_time"] > cursor_ms]
+    closed_count = 0
+    for candle in new_candles:
+        if candle["open_time"] + interval_ms > now_ts * 1000:
+            break
+        closed_count += 1
+    closed, forming = new_candles[:closed_count], new_candles[closed_count:]
+
+    plan = _AuditPlan(signal)
+    planned = dict(signal)
+    if state == "WAITING_ENTRY":
+        touched_at = _find_poi_touch_ts(signal, new_candles)
+        if touched_at is not None:
+            plan.poi_touched_at = int(touched_at)
+            state = "POI_TOUCHED"
+
+    progress = _ConfirmProgress.from_signal(signal)
+    if state in {"WAITING_ENTRY", "POI_TOUCHED"}:
+        activation = _advance_activation(signal, closed, progress)
+        if activation is None and forming:
+            activation = _advance_activation(signal, forming, replace(progress))
+        if activation is not None:
+            plan.activation = activation
+            activated_at, entry_price, confirm_count = activation
+            planned["state"] = "ACTIVE_CONFIRMED"
+            planned["activated_at"] = activated_at
+            planned["entry_price"] = entry_price
+            planned["confirm_count"] = confirm_count
+    plan.progress = progress
+
+    # a fresh activation may start at a close before the cursor
+    plan.result = _evaluate_signal(planned, candles if plan.activation is not None else new_candles)
+    if plan.result is not None and str(plan.result.get("progress_event") or "").upper() == "TP1":
+        # the rest of the window is walked again next cycle, with tp1_hit set
+        plan.cursor_ms = int(plan.result["event_at"]) * 1000 - 1
+    elif closed:
+        plan.cursor_ms = int(closed[-1]["open_time"])
+
+    if (
+        plan.poi_touched_at is None
+        and plan.activation is None
+        and plan.result is None
+        and plan.cursor_ms is None
+    ):
+        return None
+    return plan
+
+
+def _apply_plan(plan: _AuditPlan) -> None:
+    signal = plan.signal
+    signal_id = str(signal["signal_id"])
+    module = str(signal.get("module", ""))
+    symbol = str(signal.get("symbol", ""))
+    ts_value = int(signal.get("sent_at", 0))
+
+    if plan.expired:
+        mark_signal_closed(
+            signal_id=signal["signal_id"],
+            outcome="NO_FILL",
+            pnl_r=None,
+            filled_at=None,
+            notes="closed_without_entry",
+            close_state="EXPIRED",
+        )
+        update_signal_events_status(module=module, symbol=symbol, ts=ts_value, status="NO_FILL")
+        return
 
+    if plan.poi_touched_at is not None:
+        plan.poi_marked = (
+            mark_signal_state(
+                signal_id,
+                from_states=("WAITING_ENTRY",),
+                to_state="POI_TOUCHED",
+                poi_touched_at=plan.poi_touched_at,
+            )
+            > 0
+        )
+        if plan.poi_marked:
+            signal["state"] = "POI_TOUCHED"
+            signal["poi_touched_at"] = plan.poi_touched_at
+
+    if plan.activation is not None:
+        activated_at, entry_price, confirm_count = plan.activation
+        plan.activated = (
+            mark_signal_state(
+                signal_id,
+                from_states=("WAITING_ENTRY", "POI_TOUCHED"),
+                to_state="ACTIVE_CONFIRMED",
+                activated_at=activated_at,
+                entry_price=entry_price,
+                confirm_count=confirm_count,
+            )
+            > 0
+        )
+        if not plan.activated:
+            # the result was computed for an activation that did not happen
+            plan.result = None
+            return
+        signal["state"] = "ACTIVE_CONFIRMED"
+        signal["activated_at"] = activated_at
+        signal["entry_price"] = entry_price
+        signal["confirm_count"] = confirm_count
+
+    result = plan.result
+    if result is not None:
+        be_trigger_price = (
+            float(result["be_trigger_price"]) if result.get("be_trigger_price") is not None else None
+        )
+        update_signal_be_tracking(
+            signal_id,
+            max_profit_pct=float(result.get("max_profit_pct") or 0.0),
+            be_level_pct=float(result.get("be_level_pct") or 0.0),
+            be_triggered=bool(result.get("be_triggered")),
+            be_trigger_price=be_trigger_price,
+        )
+        update_signal_events_be_tracking(
+            module=module,
+            symbol=symbol,
+            ts=ts_value,
+            max_profit_pct=float(result.get("max_profit_pct") or 0.0),
+            be_level_pct=float(result.get("be_level_pct") or 0.0),
+            be_triggered=bool(result.get("be_triggered")),
+            be_trigger_price=be_trigger_price,
+        )
+        if bool(result.get("be_trigger_event")):
+            plan.be_claimed = claim_signal_notification(signal_id, event_type="BE_ACTIVATED")
+
+        if str(result.get("progress_event") or "").upper() == "TP1":
+            event_at = int(result.get("event_at") or time.time())
+            if mark_signal_tp1_hit(signal_id, tp1_hit_at=event_at) > 0:
+                update_signal_events_status(module=module, symbol=symbol, ts=ts_value, status="TP1")
+                update_signal_events_tp_hits(module=module, symbol=symbol, ts=ts_value, tp1_hit=True)
+        elif result.get("outcome") is not None:
+            _apply_close(plan, result)
+            return
 
-async def evaluate_open_signals(
-    open_signals: Optional[list[dict]] = None,
-    *,
-    start_ts: float | None = None,
-    budget_sec: int = 45,
-) -> None:
-    if open_signals is None:
-        open_signals = fetch_open_signals()
-    if not open_signals:
+    if plan.cursor_ms is not None:
+        progress = plan.progress or _ConfirmProgress()
+        update_signal_audit_cursor(
+            signal_id,
+            cursor_ms=plan.cursor_ms,
+            entry_touched=progress.entry_touched or plan.poi_touched_at is not None,
+            confirm_streak=progress.streak,
+            confirm_first_at=progress.first_at,
+            confirm_first_price=progress.first_price,
+        )
+
+
+def _apply_close(plan: _AuditPlan, result: dict) -> None:
+    signal = plan.signal
+    signal_id = str(signal["signal_id"])
+    module = str(signal.get("module", ""))
+    symbol = str(signal.get("symbol", ""))
+    ts_value = int(signal.get("sent_at", 0))
+    mark_signal_closed(
+        signal_id=signal["signal_id"],
+        outcome=result["outcome"],
+        pnl_r=result["pnl_r"],
+        filled_at=result["filled_at"],
+        notes=result["notes"],
+        close_state=_CLOSE_STATE_MAP.get(str(result["outcome"])),
+    )
+    status_value = _EVENT_STATUS_MAP.get(result["outcome"])
+    if status_value is None:
+        return
+    if status_value in {"TP1", "TP2"}:
+        update_signal_events_tp_hits(
+            module=module,
+            symbol=symbol,
+            ts=ts_value,
+            tp1_hit=True,
+            tp2_hit=(status_value == "TP2"),
+        )
+    if status_value == "BE":
+        mark_be_finalised(signal_id)
+        mark_signal_events_be_finalised(module=module, symbol=symbol, ts=ts_value)
+        logger.info("[admin] BE_FINALISED signal_id=%s", signal.get("signal_id"))
+    plan.final_claimed = claim_signal_notification(signal_id, event_type="FINAL")
+    if plan.final_claimed:
+        update_signal_events_status(module=module, symbol=symbol, ts=ts_value, status=status_value)
+
+
+def _final_notify_payloads(signal: Dict[str, Any]) -> list[dict[str, Any]]:
+    module = str(signal.get("module", ""))
+    symbol = str(signal.get("symbol", ""))
+    ts_value = int(signal.get("sent_at", 0))
+    events = list_signal_events_by_identity(module=module, symbol=symbol, ts=ts_value)
+    audit_row = get_signal_audit_by_identity(module=module, symbol=symbol, sent_at=ts_value)
+    payloads: list[dict[str, Any]] = []
+    for event in events:
+        payload = dict(event)
+        if audit_row is not None:
+            payload["max_profit_pct"] = audit_row.get("max_profit_pct")
+            payload["be_trigger_price"] = audit_row.get("be_trigger_price")
+        payloads.append(payload)
+    return payloads
+
+
+def _apply_audit_plans(plans: list[_AuditPlan]) -> None:
+    """Write one cycle's transitions in a single transaction (runs on the DB thread)."""
+    with DB_POOL.transaction() as conn:
+        for plan in plans:
+            # a failing signal only discards its own writes
+            conn.execute("SAVEPOINT audit_signal")
+            try:
+                _apply_plan(plan)
+                plan.applied = True
+            except Exception as exc:
+                conn.execute("ROLLBACK TO audit_signal")
+                print(f"[signal_audit] Failed to update signal {plan.signal.get('signal_id')}: {exc}")
+            conn.execute("RELEASE audit_signal")
+    if _signal_result_notifier is None:
         return
+    for plan in plans:
+        if plan.applied and plan.final_claimed:
+            plan.final_payloads = _final_notify_payloads(plan.signal)
 
-    for signal in open_signals:
-        if start_ts is not None and time.time() - start_ts > budget_sec:
-            break
-        try:
-            symbol = signal["symbol"]
-            sent_at = int(signal["sent_at"])
-            confirm_tf = _resolve_confirm_tf()
-            with binance_request_context("signal_audit"):
-                data = await fetch_klines(
-                    symbol,
-                    confirm_tf,
-                    500,
-                    start_ms=sent_at * 1000,
-                )
-            if not data:
-                continue
 
-            candles = []
-            for item in data:
-                parsed = _parse_kline(item)
-                if parsed and parsed["open_time"] >= sent_at * 1000:
-                    candles.append(parsed)
+async def _notify_plan(plan: _AuditPlan) -> None:
+    if not plan.applied:
+        return
+    signal = plan.signal
+    if plan.poi_marked and _signal_poi_touched_notifier is not None:
+        await _signal_poi_touched_notifier(signal)
+    if plan.activated:
+        logger.info(
+            "[signal_audit] activated signal_id=%s symbol=%s strict=%s confirm_count=%s",
+            signal.get("signal_id"),
+            signal.get("symbol"),
+            bool(signal.get("confirm_strict", False)),
+            signal.get("confirm_count"),
+        )
+        if _signal_activation_notifier is not None:
+            await _signal_activation_notifier(signal)
 
-            if not candles:
-                continue
+    result = plan.result
+    if plan.expired or result is None:
+        return
+    if plan.be_claimed:
+        logger.info("[admin] BE_TRIGGERED signal_id=%s", signal.get("signal_id"))
+        if _signal_progress_notifier is not None:
+            progress_signal = dict(signal)
+            progress_signal["be_trigger_price"] = result.get("be_trigger_price")
+            progress_signal["max_profit_pct"] = result.get("max_profit_pct")
+            progress_signal["be_level_pct"] = float(result.get("be_level_pct") or 0.0)
+            await _signal_progress_notifier(progress_signal, "BE_ACTIVATED")
+    if result.get("outcome") is None or str(result.get("progress_event") or "").upper() == "TP1":
+        return
 
-            state = str(signal.get("state") or "WAITING_ENTRY").upper()
-            is_activated = bool(signal.get("is_activated")) or signal.get("activated_at") is not None
-            ttl_minutes = int(signal.get("ttl_minutes") or SIGNAL_TTL_SECONDS // 60)
-            ttl_sec = max(60, ttl_minutes * 60)
-            now_ts = int(time.time())
-            waiting_states = {"WAIT_CONFIRM", "WAITING_ENTRY", "POI_TOUCHED"}
-            entry_price = float(signal.get("entry_price") or 0.0)
-            if (
-                now_ts > sent_at + ttl_sec
-                and state in waiting_states
-                and not is_activated
-                and entry_price <= 0.0
-            ):
-                mark_signal_closed(
-                    signal_id=signal["signal_id"],
-                    outcome="NO_FILL",
-                    pnl_r=None,
-                    filled_at=None,
-                    notes="closed_without_entry",
-                    close_state="EXPIRED",
-                )
-                update_signal_events_status(
-                    module=str(signal.get("module", "")),
-                    symbol=symbol,
-                    ts=sent_at,
-                    status="NO_FILL",
-                )
-                continue
+    logger.info(
+        "[close_notify] close detected (audit) signal_id=%s symbol=%s side=%s reason=%s",
+        signal.get("signal_id"),
+        signal.get("symbol"),
+        str(signal.get("direction", "")).upper(),
+        result.get("outcome"),
+    )
+    if _signal_finalizer_notifier is not None:
+        await _signal_finalizer_notifier(signal, result)
+    logger.info(
+        "[close_notify] db updated signal_id=%s outcome=%s",
+        signal.get("signal_id"),
+        result.get("outcome"),
+    )
+    if _signal_result_notifier is None:
+        return
+    notify_tasks = [_signal_result_notifier(payload) for payload in plan.final_payloads]
+    if notify_tasks:
+        logger.info(
+            "[close_notify] notify dispatch signal_id=%s events=%s outcome=%s",
+            signal.get("signal_id"),
+            len(notify_tasks),
+            result.get("outcome"),
+        )
+        await asyncio.gather(*notify_tasks)
 
-            if state == "WAITING_ENTRY":
-                touched_at = _find_poi_touch_ts(signal, candles)
-                if touched_at is not None:
-                    marked = mark_signal_state(
-                        str(signal["signal_id"]),
-                        from_states=("WAITING_ENTRY",),
-                        to_state="POI_TOUCHED",
-                        poi_touched_at=int(touched_at),
-                    )
-                    if marked > 0:
-                        signal["state"] = "POI_TOUCHED"
-                        signal["poi_touched_at"] = int(touched_at)
-                        if _signal_poi_touched_notifier is not None:
-                            await _signal_poi_touched_notifier(signal)
-                        state = "POI_TOUCHED"
-
-            if state in {"WAITING_ENTRY", "POI_TOUCHED"}:
-                activation = _find_activation_from_candles(signal, candles)
-                if activation is not None:
-                    activated_at, entry_price, confirm_count = activation
-                    marked = mark_signal_state(
-                        str(signal["signal_id"]),
-                        from_states=("WAITING_ENTRY", "POI_TOUCHED"),
-                        to_state="ACTIVE_CONFIRMED",
-                        activated_at=activated_at,
-                        entry_price=entry_price,
-                        confirm_count=confirm_count,
-                    )
-                    if marked > 0:
-                        signal["state"] = "ACTIVE_CONFIRMED"
-                        signal["activated_at"] = activated_at
-                        signal["entry_price"] = entry_price
-                        signal["confirm_count"] = confirm_count
-                        logger.info(
-                            "[signal_audit] activated signal_id=%s symbol=%s strict=%s confirm_count=%s",
-                            signal.get("signal_id"),
-                            signal.get("symbol"),
-                            bool(signal.get("confirm_strict", False)),
-                            confirm_count,
-                        )
-                        if _signal_activation_notifier is not None:
-                            await _signal_activation_notifier(signal)
-
-            result = _evaluate_signal(signal, candles)
-            if result is None:
-                continue
 
-            update_signal_be_tracking(
-                str(signal["signal_id"]),
-                max_profit_pct=float(result.get("max_profit_pct") or 0.0),
-                be_level_pct=float(result.get("be_level_pct") or 0.0),
-                be_triggered=bool(result.get("be_triggered")),
-                be_trigger_price=(
-                    float(result["be_trigger_price"])
-                    if result.get("be_trigger_price") is not None
-                    else None
-                ),
-            )
-            update_signal_events_be_tracking(
-                module=str(signal.get("module", "")),
-                symbol=str(signal.get("symbol", "")),
-                ts=int(signal.get("sent_at", 0)),
-                max_profit_pct=float(result.get("max_profit_pct") or 0.0),
-                be_level_pct=float(result.get("be_level_pct") or 0.0),
-                be_triggered=bool(result.get("be_triggered")),
-                be_trigger_price=(
-                    float(result["be_trigger_price"])
-                    if result.get("be_trigger_price") is not None
-                    else None
-                ),
-            )
+async def evaluate_open_signals(open_signals: Optional[list[dict]] = None) -> int:
+    """
+    Run one audit pass over the open signals, return how many were checked.
 
-            if bool(result.get("be_trigger_event")) and claim_signal_notification(
-                str(signal["signal_id"]), event_type="BE_ACTIVATED"
-            ):
-                logger.info("[admin] BE_TRIGGERED signal_id=%s", signal.get("signal_id"))
-                if _signal_progress_notifier is not None:
-                    progress_signal = dict(signal)
-                    progress_signal["be_trigger_price"] = result.get("be_trigger_price")
-                    progress_signal["max_profit_pct"] = result.get("max_profit_pct")
-                    progress_signal["be_level_pct"] = float(result.get("be_level_pct") or 0.0)
-                    await _signal_progress_notifier(progress_signal, "BE_ACTIVATED")
-
-            progress_event = str(result.get("progress_event") or "").upper()
-            if progress_event == "TP1":
-                event_at = int(result.get("event_at") or time.time())
-                marked_tp1 = mark_signal_tp1_hit(str(signal["signal_id"]), tp1_hit_at=event_at)
-                if marked_tp1 > 0:
-                    module = str(signal.get("module", ""))
-                    symbol = str(signal.get("symbol", ""))
-                    ts_value = int(signal.get("sent_at", 0))
-                    update_signal_events_status(
-                        module=module,
-                        symbol=symbol,
-                        ts=ts_value,
-                        status="TP1",
-                    )
-                    update_signal_events_tp_hits(
-                        module=module,
-                        symbol=symbol,
-                        ts=ts_value,
-                        tp1_hit=True,
-                    )
-                continue
+    Signals are grouped by symbol: each symbol gets one candle fetch covering
+    the candles its signals have not processed yet (see _audit_start_ms), symbols are fetched and evaluated concurrently, and
+    all resulting transitions are written in one transaction before the
+    notifications go out.
+    """
+    if open_signals is None:
+        open_signals = await run_db(fetch_open_signals)
+    if not open_signals:
+        return 0
 
-            logger.info(
-                "[close_notify] close detected (audit) signal_id=%s symbol=%s side=%s reason=%s",
-                signal.get("signal_id"),
-                signal.get("symbol"),
-                str(signal.get("direction", "")).upper(),
-                result.get("outcome"),
-            )
-            close_state_map = {
-                "TP1": "CLOSED_TP1",
-                "TP2": "CLOSED_TP2",
-                "SL": "CLOSED_SL",
-                "BE": "CLOSED_BE",
-                "NO_FILL": "EXPIRED",
-            }
-            mark_signal_closed(
-                signal_id=signal["signal_id"],
-                outcome=result["outcome"],
-                pnl_r=result["pnl_r"],
-                filled_at=result["filled_at"],
-                notes=result["notes"],
-                close_state=close_state_map.get(str(result["outcome"])),
-            )
-            if _signal_finalizer_notifier is not None:
-                await _signal_finalizer_notifier(signal, result)
-            logger.info(
-                "[close_notify] db updated signal_id=%s outcome=%s",
-                signal.get("signal_id"),
-                result.get("outcome"),
-            )
-            status_map = {
-                "TP1": "TP1",
-                "TP2": "TP2",
-                "SL": "SL",
-                "EXPIRED": "EXP",
-                "BE": "BE",
-                "NO_FILL": "NO_FILL",
-                "AMBIGUOUS": "AMBIGUOUS",
-            }
-            status_value = status_map.get(result["outcome"])
-            if status_value is not None:
-                module = str(signal.get("module", ""))
-                symbol = str(signal.get("symbol", ""))
-                ts_value = int(signal.get("sent_at", 0))
-                if status_value in {"TP1", "TP2"}:
-                    update_signal_events_tp_hits(
-                        module=module,
-                        symbol=symbol,
-                        ts=ts_value,
-                        tp1_hit=True,
-                        tp2_hit=(status_value == "TP2"),
-                    )
-                if status_value == "BE":
-                    mark_be_finalised(str(signal["signal_id"]))
-                    mark_signal_events_be_finalised(module=module, symbol=symbol, ts=ts_value)
-                    logger.info("[admin] BE_FINALISED signal_id=%s", signal.get("signal_id"))
-                claimed = claim_signal_notification(str(signal["signal_id"]), event_type="FINAL")
-                if not claimed:
+    confirm_tf = _resolve_confirm_tf()
+    interval_ms = interval_to_ms(confirm_tf) or 300_000
+    by_symbol: dict[str, list[dict]] = {}
+    for signal in open_signals:
+        by_symbol.setdefault(str(signal["symbol"]), []).append(signal)
+    semaphore = asyncio.Semaphore(AUDIT_FETCH_CONCURRENCY)
+
+    async def _plan_symbol(symbol: str, signals: list[dict]) -> list[_AuditPlan]:
+        async with semaphore:
+            update_current_symbol("signal_audit", symbol)
+            candles = await _fetch_symbol_candles(symbol, confirm_tf, signals)
+        if not candles:
+            return []
+        open_times = [int(candle["open_time"]) for candle in candles]
+        now_ts = int(time.time())
+        plans = []
+        for signal in signals:
+            try:
+                signal_candles = _candles_since(candles, open_times, _audit_start_ms(signal))
+                if not signal_candles:
                     continue
-                update_signal_events_status(
-                    module=module,
-                    symbol=symbol,
-                    ts=ts_value,
-                    status=status_value,
-                )
-                if _signal_result_notifier is not None:
-                    events = list_signal_events_by_identity(module=module, symbol=symbol, ts=ts_value)
-                    audit_row = get_signal_audit_by_identity(module=module, symbol=symbol, sent_at=ts_value)
-                    notify_payloads: list[dict[str, Any]] = []
-                    for event in events:
-                        payload = dict(event)
-                        if audit_row is not None:
-                            payload["max_profit_pct"] = audit_row.get("max_profit_pct")
-                            payload["be_trigger_price"] = audit_row.get("be_trigger_price")
-                        notify_payloads.append(payload)
-                    notify_tasks = [_signal_result_notifier(payload) for payload in notify_payloads]
-                    if notify_tasks:
-                        logger.info(
-                            "[close_notify] notify dispatch signal_id=%s events=%s outcome=%s",
-                            signal.get("signal_id"),
-                            len(notify_tasks),
-                            result.get("outcome"),
-                        )
-                        await asyncio.gather(*notify_tasks)
-        except Exception as exc:
-            print(f"[signal_audit] Failed to evaluate signal {signal.get('signal_id')}: {exc}")
+                plan = _plan_signal(signal, signal_candles, now_ts, interval_ms)
+            except Exception as exc:
+                print(f"[signal_audit] Failed to evaluate signal {signal.get('signal_id')}: {exc}")
+                continue
+            if plan is not None:
+                plans.append(plan)
+        return plans
+
+    symbols = list(by_symbol)
+    outcomes = await asyncio.gather(
+        *(_plan_symbol(symbol, by_symbol[symbol]) for symbol in symbols),
+        return_exceptions=True,
+    )
+    plans: list[_AuditPlan] = []
+    for symbol, outcome in zip(symbols, outcomes):
+        if isinstance(outcome, BaseException):
+            print(f"[signal_audit] Failed to evaluate {symbol}: {outcome}")
             continue
+        plans.extend(outcome)
+    if not plans:
+        return len(open_signals)
+
+    await run_db(_apply_audit_plans, plans)
+    notified = await asyncio.gather(*(_notify_plan(plan) for plan in plans), return_exceptions=True)
+    for plan, outcome in zip(plans, notified):
+        if isinstance(outcome, BaseException):
+            print(f"[signal_audit] Failed to notify signal {plan.signal.get('signal_id')}: {outcome}")
+    return len(open_signals)
 
 
 async def signal_audit_worker_loop() -> None:
     async def _scan_once() -> None:
         start = time.time()
-        BUDGET = 45
         mark_tick("signal_audit", extra="audit cycle")
-        open_signals = fetch_open_signals()
+        open_signals = await run_db(fetch_open_signals)
         if not open_signals:
             mark_ok("signal_audit", extra="audit cycle")
             return
 
-        if not hasattr(_scan_once, "cursor"):
-            _scan_once.cursor = 0
-        chunk_size = 100
-        cursor = _scan_once.cursor
-        if cursor >= len(open_signals):
-            cursor = 0
-        chunk = open_signals[cursor : cursor + chunk_size]
-        new_cursor = cursor + len(chunk)
-        _scan_once.cursor = new_cursor
         total = len(open_signals)
-        update_module_progress("signal_audit", total, new_cursor, len(chunk))
-        if chunk:
-            update_current_symbol("signal_audit", chunk[0].get("symbol", ""))
-
-        await evaluate_open_signals(
-            chunk,
-            start_ts=start,
-            budget_sec=BUDGET,
-        )
-        current_symbol = (
-            MODULES.get("signal_audit").current_symbol if "signal_audit" in MODULES else None
-        )
+        symbols = len({str(signal["symbol"]) for signal in open_signals})
+        checked = await evaluate_open_signals(open_signals)
+        update_module_progress("signal_audit", total, checked, total)
         mark_ok(
             "signal_audit",
             extra=(
-                f"progress={new_cursor}/{total} "
-                f"checked={len(chunk)}/{len(chunk)} "
-                f"current={current_symbol or '-'} cycle={int(time.time() - start)}s"
+                f"checked={checked}/{total} symbols={symbols} "
+                f"cycle={int(time.time() - start)}s"
             ),
         )
 
@@ -0,0 +1,156 @@
+"""
+Pure setup computations for the AI deep stage.
+
+_prepare_signal hands the candle bundle to run_setup_features(); depending on
+AI_DEEP_EXECUTOR it is computed right on the event loop ("inline") or shipped
+as CandleFrame column arrays to a ProcessPoolExecutor ("process"), so long
+candle sets no longer stall aiogram polling and the pump scanner. Network
+calls, caches and stats stay in the caller.
+"""
+
+from __future__ import annotations
+
+import asyncio
+import multiprocessing
+import os
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from typing import Any, Dict, Optional
+
+from ai_types import CandleFrame, CandleSeries
+from trading_core import (
+    _column,
+    _compute_rsi_series,
+    _nearest_level,
+    detect_rsi_divergence,
+    detect_trend_and_structure,
+    find_key_levels,
+    is_bb_extreme_reversal,
+    is_volume_climax,
+    set_indicator_engine,
+)
+import trading_core
+
+AI_DEEP_EXECUTOR = os.getenv("AI_DEEP_EXECUTOR", "inline").strip().lower()
+AI_DEEP_EXECUTOR_WORKERS = int(os.getenv("AI_DEEP_EXECUTOR_WORKERS", "2"))
+AI_DEEP_EXECUTOR_START = os.getenv("AI_DEEP_EXECUTOR_START", "forkserver").strip().lower()
+
+_SETUP_TFS = ("1d", "4h", "1h", "15m", "5m")
+_POOL: Optional[ProcessPoolExecutor] = None
+
+
+def set_deep_executor(mode: str) -> None:
+    """Switch between "inline" and "process" at runtime (e.g. for debugging)."""
+    global AI_DEEP_EXECUTOR
+    mode = (mode or "").strip().lower()
+    if mode not in ("inline", "process"):
+        raise ValueError(f"unknown deep executor mode: {mode}")
+    AI_DEEP_EXECUTOR = mode
+    if mode == "inline":
+        shutdown_deep_executor()
+
+
+def shutdown_deep_executor() -> None:
+    global _POOL
+    if _POOL is not None:
+        _POOL.shutdown(wait=False, cancel_futures=True)
+        _POOL = None
+
+
+def _get_pool() -> ProcessPoolExecutor:
+    global _POOL
+    if _POOL is None:
+        start_method = AI_DEEP_EXECUTOR_START
+        if start_method not in multiprocessing.get_all_start_methods():
+            start_method = "spawn"
+        _POOL = ProcessPoolExecutor(
+            max_workers=max(1, AI_DEEP_EXECUTOR_WORKERS),
+            mp_context=multiprocessing.get_context(start_method),
+        )
+    return _POOL
+
+
+def compute_setup_features(candles: Dict[str, CandleSeries]) -> Dict[str, Any]:
+    """
+    Everything in the setup stage that depends only on candles: HTF structure,
+    key levels around the current price and the side-dependent confirmations
+    for both sides (liquidity sweep is left out, it needs the touched level).
+    """
+    candles_1d = candles["1d"]
+    candles_1h = candles["1h"]
+    candles_15m = candles["15m"]
+    candles_5m = candles["5m"]
+    current_price = _column(candles_5m, "close")[-1]
+
+    structures = {
+        "1d": detect_trend_and_structure(candles_1d),
+        "4h": detect_trend_and_structure(candles["4h"]),
+        "1h": detect_trend_and_structure(candles_1h),
+    }
+
+    key_levels = find_key_levels(candles_1d)
+    recent_h1 = candles_1h[-24:]
+    recent_15m = candles_15m[-32:]
+    key_levels["highs"].extend(_column(recent_h1, "high"))
+    key_levels["lows"].extend(_column(recent_h1, "low"))
+    key_levels["highs"].extend(_column(recent_15m, "high"))
+    key_levels["lows"].extend(_column(recent_15m, "low"))
+    key_levels["highs"] = sorted(set(key_levels["highs"]))
+    key_levels["lows"] = sorted(set(key_levels["lows"]))
+    nearest_high, dist_high = _nearest_level(current_price, key_levels["highs"])
+    nearest_low, dist_low = _nearest_level(current_price, key_levels["lows"])
+
+    closes_15m = list(_column(candles_15m, "close"))
+    closes_5m = list(_column(candles_5m, "close"))
+    rsi_15m = _compute_rsi_series(closes_15m)
+    rsi_5m = _compute_rsi_series(closes_5m)
+    bb_15m = candles_15m[-40:] if len(candles_15m) >= 40 else candles_15m
+    bb_5m = candles_5m[-40:] if len(candles_5m) >= 40 else candles_5m
+
+    rsi_divergence: Dict[str, bool] = {}
+    bb_extreme: Dict[str, bool] = {}
+    for side, kind, direction in (("LONG", "bullish", "long"), ("SHORT", "bearish", "short")):
+        rsi_divergence[side] = detect_rsi_divergence(closes_15m, rsi_15m, kind) or detect_rsi_divergence(
+            closes_5m, rsi_5m, kind
+        )
+        bb_extreme[side] = is_bb_extreme_reversal(bb_15m, direction=direction) or is_bb_extreme_reversal(
+            bb_5m, direction=direction
+        )
+
+    return {
+        "structures": structures,
+        "key_levels": key_levels,
+        "nearest_high": nearest_high,
+        "dist_high": dist_high,
+        "nearest_low": nearest_low,
+        "dist_low": dist_low,
+        "volume_climax": is_volume_climax(candles_5m),
+        "rsi_divergence": rsi_divergence,
+        "bb_extreme": bb_extreme,
+    }
+
+
+def _compute_in_worker(frames: Dict[str, CandleFrame], engine: str) -> Dict[str, Any]:
+    if trading_core.INDICATOR_ENGINE != engine:
+        set_indicator_engine(engine)
+    return compute_setup_features(frames)
+
+
+async def run_setup_features(candles: Dict[str, CandleSeries]) -> Dict[str, Any]:
+    if AI_DEEP_EXECUTOR != "process":
+        return compute_setup_features(candles)
+
+    frames = {
+        tf: series if isinstance(series, CandleFrame) else CandleFrame.from_candles(series)
+        for tf, series in candles.items()
+        if tf in _SETUP_TFS
+    }
+    loop = asyncio.get_running_loop()
+    try:
+        return await loop.run_in_executor(
+            _get_pool(), _compute_in_worker, frames, trading_core.INDICATOR_ENGINE
+        )
+    except BrokenProcessPool as exc:
+        print(f"[ai_signals] deep executor broken, recomputing inline: {exc}")
+        shutdown_deep_executor()
+        return compute_setup_features(candles)
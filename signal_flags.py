@@ -0,0 +1,36 @@
+"""
+Test-signal detection shared by signal_events and signal_audit.
+
+Test broadcasts used to be filtered out with LIKE '%test%' / '%тест%' scans
+over reason_json, breakdown_json and notes in nearly every query. The flag is
+now computed once when a row is written and stored in the indexed is_test
+column; legacy_test_filter_sql() keeps the old predicate only for the one-off
+backfill of rows written before that.
+"""
+
+from __future__ import annotations
+
+from typing import Iterable, Optional
+
+TEST_SYMBOL_PREFIX = "TEST"
+TEST_MARKERS = ("test", "тест")
+
+
+def is_test_signal(symbol: Optional[str], *texts: Optional[str]) -> bool:
+    if str(symbol or "").upper().startswith(TEST_SYMBOL_PREFIX):
+        return True
+    for text in texts:
+        if not text:
+            continue
+        lowered = str(text).lower()
+        if any(marker in lowered for marker in TEST_MARKERS):
+            return True
+    return False
+
+
+def legacy_test_filter_sql(columns: Iterable[str]) -> str:
+    parts = [f"symbol LIKE '{TEST_SYMBOL_PREFIX}%'"]
+    for column in columns:
+        for marker in TEST_MARKERS:
+            parts.append(f"LOWER(COALESCE({column}, '')) LIKE '%{marker}%'")
+    return "(" + " OR ".join(parts) + ")"
@@ -9,27 +9,30 @@ import traceback
 from statistics import mean
 from typing import Any, Callable, Dict, List, Optional, Sequence, Tuple
 
-from ai_types import Candle
+from ai_types import Candle, CandleFrame
 from config import cfg
-from binance_rest import get_klines
+from binance_rest import get_klines_bundle
 from db import get_state, set_state
 from symbol_cache import get_spot_usdt_symbols, get_top_usdt_symbols_by_volume
 from ai_patterns import analyze_ai_patterns
 from market_regime import get_market_regime
+from signal_compute import run_setup_features
 from btc_context import BTC_REGIME_CHOP, BTC_REGIME_RISK_OFF, BTC_REGIME_RISK_ON, BTC_REGIME_SQUEEZE
-from indicators_cache import get_cached_atr, get_cached_ema, get_cached_rsi
-from utils_klines import normalize_klines
+from indicators_cache import (
+    get_cached_atr,
+    get_cached_batch,
+    get_cached_ema,
+    get_cached_ema_tail,
+    get_cached_rsi,
+)
+from utils_klines import klines_to_frame, normalize_klines
+import indicators_vectorized
 from trading_core import (
-    _compute_rsi_series,
-    _nearest_level,
+    _use_vectorized,
     analyze_orderflow,
     compute_score_breakdown,
-    detect_rsi_divergence,
     detect_trend_and_structure,
-    find_key_levels,
-    is_bb_extreme_reversal,
     is_liquidity_sweep,
-    is_volume_climax,
 )
 
 BTC_SYMBOL = "BTCUSDT"
@@ -72,6 +75,8 @@ AI_MAX_DEEP_PER_CYCLE = int(os.getenv("AI_MAX_DEEP_PER_CYCLE", "3"))
 AI_DEEP_TOP_K = int(os.getenv("AI_DEEP_TOP_K", str(AI_MAX_DEEP_PER_CYCLE)))
 AI_CHEAP_LIMIT = int(os.getenv("AI_CHEAP_LIMIT", "120"))
 AI_CHEAP_TF = os.getenv("AI_CHEAP_TF", "15m")
+# batched pre-score; AI_PRESCORE_BATCH=0 or INDICATOR_ENGINE=reference scores per symbol
+AI_PRESCORE_BATCH = os.getenv("AI_PRESCORE_BATCH", "1").lower() in ("1", "true", "yes", "y")
 AGGTRADES_TOP_K = int(os.getenv("AGGTRADES_TOP_K", "2"))
 KLINES_CONCURRENCY = int(
     os.getenv("MAX_KLINES_CONCURRENCY", os.getenv("KLINES_CONCURRENCY", "10"))
@@ -296,7 +301,9 @@ def _structure_alignment(state: str, side: str) -> str:
     return "neutral"
 
 
-def _compute_ema_series(closes: List[float], period: int) -> List[float]:
+def _compute_ema_series(closes: Sequence[float], period: int) -> List[float]:
+    if _use_vectorized():
+        return indicators_vectorized.ema_series(closes, period)
     if len(closes) < period:
         return []
     k = 2 / (period + 1)
@@ -659,13 +666,14 @@ async def _gather_stage_a_klines(
     tf: str,
     limit: int,
     timings: dict[str, float] | None = None,
-) -> Optional[Dict[str, List[Candle]]]:
+) -> Optional[Dict[str, CandleFrame]]:
     tfs = (tf,)
     return await _fetch_direct_bundle(
         symbol,
         tfs,
         limit_overrides={tf: limit},
         timings=timings,
+        as_frame=True,
     )
 
 
@@ -675,25 +683,28 @@ async def _fetch_direct_bundle(
     *,
     limit_overrides: dict[str, int] | None = None,
     timings: dict[str, float] | None = None,
-) -> Optional[Dict[str, List[Candle]]]:
+    as_frame: bool = False,
+) -> Optional[Dict[str, List[Candle]] | Dict[str, CandleFrame]]:
     start = time.perf_counter()
     limits = dict(AI_DIRECT_LIMITS)
     if limit_overrides:
         limits.update(limit_overrides)
-    tasks = [asyncio.create_task(get_klines(symbol, tf, limits[tf])) for tf in tfs]
-    bundle_task = asyncio.gather(*tasks, return_exceptions=True)
+    # normalize_klines/klines_to_frame drop the forming candle: closed history is enough;
+    # higher timeframes are resampled from a lower one where the window allows
+    bundle_task = get_klines_bundle(symbol, {tf: limits[tf] for tf in tfs}, forming=False)
     if AI_DIRECT_BUNDLE_TIMEOUT_SEC > 0:
-        results = await asyncio.wait_for(
+        raw = await asyncio.wait_for(
             bundle_task,
             timeout=AI_DIRECT_BUNDLE_TIMEOUT_SEC,
         )
     else:
-        results = await bundle_task
-    bundle: Dict[str, List[Candle]] = {}
-    for tf, result in zip(tfs, results):
-        if isinstance(result, BaseException) or not isinstance(result, list):
+        raw = await bundle_task
+    bundle: Dict[str, List[Candle]] | Dict[str, CandleFrame] = {}
+    for tf in tfs:
+        result = raw.get(tf)
+        if not isinstance(result, list):
             return None
-        candles = normalize_klines(result)
+        candles = klines_to_frame(result) if as_frame else normalize_klines(result)
         if not candles or len(candles) < MIN_KLINES_REQUIRED:
             return None
         bundle[tf] = candles
@@ -704,20 +715,32 @@ async def _fetch_direct_bundle(
     return bundle
 
 
-def _pre_score(candles: Dict[str, List[Candle]], *, tf: str, symbol: str) -> float:
-    source = candles.get(tf) or []
-    if len(source) < 20:
+def _pre_score(candles: Dict[str, CandleFrame], *, tf: str, symbol: str) -> float:
+    source = candles.get(tf)
+    if source is None or len(source) < 20:
         return 0.0
-    closes = [c.close for c in source]
+    if not isinstance(source, CandleFrame):
+        source = klines_to_frame(source)
     trend = detect_trend_and_structure(source)
-    volume_ratio, _ = _volume_ratio([c.volume for c in source])
+    volume_ratio, _ = _volume_ratio(source.volume)
     ema50 = get_cached_ema(symbol, tf, source, 50)
-    last_close = closes[-1]
     atr = get_cached_atr(symbol, tf, source, 14)
     rsi_value = get_cached_rsi(symbol, tf, source)
+    return _pre_score_from_inputs(
+        trend.get("trend"), volume_ratio, ema50, source.close[-1], atr, rsi_value
+    )
 
+
+def _pre_score_from_inputs(
+    trend: Optional[str],
+    volume_ratio: float,
+    ema50: Optional[float],
+    last_close: float,
+    atr: Optional[float],
+    rsi_value: float,
+) -> float:
     score = 0.0
-    if trend.get("trend") in ("up", "down"):
+    if trend in ("up", "down"):
         score += 25
     else:
         score += 10
@@ -745,6 +768,57 @@ def _pre_score(candles: Dict[str, List[Candle]], *, tf: str, symbol: str) -> flo
     return min(score, 100.0)
 
 
+def _pre_score_batch(bundles: Dict[str, Dict[str, CandleFrame]], *, tf: str) -> Dict[str, float]:
+    """
+    Pre-score a whole batch of symbols at once, same scores as _pre_score.
+
+    Frames of equal length are stacked and EMA50 / ATR14 / RSI14 are advanced
+    for all of them in lockstep, one candle at a time.
+    """
+    if not AI_PRESCORE_BATCH or not _use_vectorized():
+        return {symbol: _pre_score(bundle, tf=tf, symbol=symbol) for symbol, bundle in bundles.items()}
+
+    scores: Dict[str, float] = {}
+    groups: Dict[int, List[Tuple[str, CandleFrame]]] = {}
+    for symbol, bundle in bundles.items():
+        source = bundle.get(tf)
+        if source is None or len(source) < 20:
+            scores[symbol] = 0.0
+            continue
+        if not isinstance(source, CandleFrame):
+            source = klines_to_frame(source)
+        groups.setdefault(len(source), []).append((symbol, source))
+
+    for items in groups.values():
+        symbols = [symbol for symbol, _ in items]
+        frames = [frame for _, frame in items]
+        emas = get_cached_batch(
+            symbols, tf, frames, "ema", 50,
+            lambda batch: indicators_vectorized.batch_ema_last([f.close for f in batch], 50),
+        )
+        atrs = get_cached_batch(
+            symbols, tf, frames, "atr", 14,
+            lambda batch: indicators_vectorized.batch_atr_last(
+                [f.high for f in batch], [f.low for f in batch], [f.close for f in batch], 14
+            ),
+        )
+        rsis = get_cached_batch(
+            symbols, tf, frames, "rsi", 14,
+            lambda batch: indicators_vectorized.batch_rsi_last([f.close for f in batch], 14),
+        )
+        for symbol, frame, ema50, atr, rsi_value in zip(symbols, frames, emas, atrs, rsis):
+            volume_ratio, _ = _volume_ratio(frame.volume)
+            scores[symbol] = _pre_score_from_inputs(
+                detect_trend_and_structure(frame).get("trend"),
+                volume_ratio,
+                ema50,
+                frame.close[-1],
+                atr,
+                rsi_value if rsi_value is not None else 50.0,
+            )
+    return scores
+
+
 async def _get_hourly_snapshot(symbol: str) -> Optional[Dict[str, float]]:
     bundle = await _fetch_direct_bundle(symbol, ("1h",))
     if not bundle:
@@ -1036,9 +1110,10 @@ async def _prepare_signal(
         _fail_setup("fail_price_too_low")
         return None
 
-    daily_structure = detect_trend_and_structure(candles_1d)
-    h4_structure = detect_trend_and_structure(candles_4h)
-    h1_structure = detect_trend_and_structure(candles_1h)
+    features = await run_setup_features(candles)
+    daily_structure = features["structures"]["1d"]
+    h4_structure = features["structures"]["4h"]
+    h1_structure = features["structures"]["1h"]
 
     global_trend = daily_structure["trend"] if daily_structure["trend"] != "range" else h4_structure["trend"]
     local_trend = h1_structure["trend"]
@@ -1047,19 +1122,8 @@ async def _prepare_signal(
     structure_info = structure_by_tf.get(structure_window, h4_structure)
     structure_state = _normalize_structure_state(structure_info)
 
-    key_levels = find_key_levels(candles_1d)
-
-    recent_h1 = candles_1h[-24:]
-    recent_15m = candles_15m[-32:]
-    key_levels["highs"].extend([c.high for c in recent_h1])
-    key_levels["lows"].extend([c.low for c in recent_h1])
-    key_levels["highs"].extend([c.high for c in recent_15m])
-    key_levels["lows"].extend([c.low for c in recent_15m])
-    key_levels["highs"] = sorted(set(key_levels["highs"]))
-    key_levels["lows"] = sorted(set(key_levels["lows"]))
-
-    nearest_high, dist_high = _nearest_level(current_price, key_levels["highs"])
-    nearest_low, dist_low = _nearest_level(current_price, key_levels["lows"])
+    nearest_high, dist_high = features["nearest_high"], features["dist_high"]
+    nearest_low, dist_low = features["nearest_low"], features["dist_low"]
 
     candidate_side: Optional[str] = None
     level_touched: Optional[float] = None
@@ -1079,28 +1143,12 @@ async def _prepare_signal(
             level_value,
             "long" if side_value == "LONG" else "short",
         )
-        volume_value = is_volume_climax(candles_5m)
-        closes_15m = [c.close for c in candles_15m]
-        closes_5m = [c.close for c in candles_5m]
-        rsi_15m = _compute_rsi_series(closes_15m)
-        rsi_5m = _compute_rsi_series(closes_5m)
-        if side_value == "LONG":
-            rsi_value = detect_rsi_divergence(closes_15m, rsi_15m, "bullish") or detect_rsi_divergence(
-                closes_5m, rsi_5m, "bullish"
-            )
-        else:
-            rsi_value = detect_rsi_divergence(closes_15m, rsi_15m, "bearish") or detect_rsi_divergence(
-                closes_5m, rsi_5m, "bearish"
-            )
-        bb_extreme_15 = is_bb_extreme_reversal(
-            candles_15m[-40:] if len(candles_15m) >= 40 else candles_15m,
-            direction="long" if side_value == "LONG" else "short",
-        )
-        bb_extreme_5 = is_bb_extreme_reversal(
-            candles_5m[-40:] if len(candles_5m) >= 40 else candles_5m,
-            direction="long" if side_value == "LONG" else "short",
+        return (
+            sweep_value,
+            features["volume_climax"],
+            features["rsi_divergence"][side_value],
+            features["bb_extreme"][side_value],
         )
-        return sweep_value, volume_value, rsi_value, bb_extreme_15 or bb_extreme_5
 
     async def _attempt_trend_setup() -> Optional[Dict[str, Any]]:
         if not AI_TREND_MODE_ENABLED:
@@ -1111,8 +1159,10 @@ async def _prepare_signal(
             _trend_detected("none")
             _trend_failed("fail_trend_no_trend")
             return None
-        closes = [c.close for c in trend_candles]
-        ema_series = _compute_ema_series(closes, AI_TREND_BASE_EMA)
+        # only the slope endpoints are used: take them from the streamed EMA
+        ema_series = get_cached_ema_tail(
+            symbol, AI_TREND_TF, trend_candles, AI_TREND_BASE_EMA, AI_TREND_SLOPE_LOOKBACK + 1
+        )
         if len(ema_series) <= AI_TREND_SLOPE_LOOKBACK:
             _trend_detected("none")
             _trend_failed("fail_trend_no_trend")
@@ -1124,7 +1174,7 @@ async def _prepare_signal(
             _trend_failed("fail_trend_no_trend")
             return None
         slope_pct = safe_div((ema_base_now - ema_base_prev) * 100, ema_base_now, default=0.0) or 0.0
-        last_close = closes[-1]
+        last_close = trend_candles[-1].close
         side_value: Optional[str] = None
         trend_label: Optional[str] = None
         if last_close > ema_base_now and slope_pct >= AI_TREND_SLOPE_MIN_PCT:
@@ -2391,7 +2441,7 @@ async def scan_market(
 
     async def _run_prescore(
         symbol: str,
-    ) -> tuple[str, Optional[Dict[str, List[Candle]]], Optional[float]]:
+    ) -> tuple[str, Optional[Dict[str, CandleFrame]]]:
         symbol_start = time.perf_counter()
         timings = _ensure_symbol_timings(symbol)
         try:
@@ -2409,20 +2459,15 @@ async def scan_market(
                 fails["fail_symbol_error"] = fails.get("fail_symbol_error", 0) + 1
                 logger.exception("[ai_signals] symbol crash symbol=%s stage=prescore err=%s", symbol, exc)
                 logger.error(traceback.format_exc())
-                return symbol, None, None
-            if not quick:
-                return symbol, None, None
-            prescore_start = time.perf_counter()
-            pre_score_value = _pre_score(quick, tf=AI_CHEAP_TF, symbol=symbol)
-            timings["prescore_dt"] = time.perf_counter() - prescore_start
-            return symbol, quick, pre_score_value
+                return symbol, None
+            return symbol, quick or None
         finally:
             _update_total(symbol, time.perf_counter() - symbol_start)
             _refresh_slowest()
 
     async def _run_prescore_with_timeout(
         symbol: str,
-    ) -> tuple[str, Optional[Dict[str, List[Candle]]], Optional[float]]:
+    ) -> tuple[str, Optional[Dict[str, CandleFrame]]]:
         try:
             coro = _with_symbol_semaphore(_run_prescore, symbol)
             if AI_PER_SYMBOL_TIMEOUT_SEC > 0:
@@ -2433,7 +2478,7 @@ async def scan_market(
             timings = _ensure_symbol_timings(symbol)
             timings["timeout"] = AI_PER_SYMBOL_TIMEOUT_SEC
             _refresh_slowest()
-            return symbol, None, None
+            return symbol, None
 
     scored: List[Tuple[str, float]] = []
     for i in range(0, len(symbols), batch_size):
@@ -2447,14 +2492,28 @@ async def scan_market(
         checked += len(batch)
         quick_tasks = [asyncio.create_task(_run_prescore_with_timeout(symbol)) for symbol in batch]
         quick_list = await asyncio.gather(*quick_tasks, return_exceptions=True)
+        fetched: Dict[str, Dict[str, CandleFrame]] = {}
         for item in quick_list:
             if isinstance(item, BaseException):
                 fails["fail_symbol_error"] = fails.get("fail_symbol_error", 0) + 1
                 continue
-            symbol, quick, pre_score = item
+            symbol, quick = item
             if not quick:
                 fails["fail_no_klines"] = fails.get("fail_no_klines", 0) + 1
                 continue
+            fetched[symbol] = quick
+        if not fetched:
+            continue
+        batch_start = time.perf_counter()
+        batch_scores = _pre_score_batch(fetched, tf=AI_CHEAP_TF)
+        batch_dt = time.perf_counter() - batch_start
+        for symbol in fetched:
+            timings = _ensure_symbol_timings(symbol)
+            timings["prescore_dt"] = batch_dt / len(fetched)
+            _update_total(symbol, timings["prescore_dt"])
+        _refresh_slowest()
+        for symbol in fetched:
+            pre_score = batch_scores[symbol]
             pre_score_stats["checked"] += 1
             if pre_score < PRE_SCORE_THRESHOLD:
                 if _is_bluechip(symbol):
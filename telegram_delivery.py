@@ -0,0 +1,254 @@
+"""
+Concurrent fan-out of Telegram messages.
+
+send_signal_to_all and _deliver_pumpdump_signal_stats used to await
+bot.send_message for one recipient after another, so a broadcast took
+roughly (recipients × round-trip) seconds. TelegramDelivery.deliver() runs
+the per-recipient send callbacks on a bounded pool of workers instead, while
+keeping under Telegram's limits: a global token bucket (~30 msg/s for the
+whole bot, shared by every broadcast running at the same time) and at most
+one request per chat per TG_PER_CHAT_INTERVAL_SEC.
+
+A callback usually makes several API calls (send_message, then
+edit_message_reply_markup, or a plain-text resend after a parse-mode
+error), so the limits are applied per API call rather than per callback:
+DeliveryThrottle, installed on the bot session, takes a bucket token and a
+per-chat slot for every request made from inside a delivery callback.
+Requests made anywhere else pass through untouched.
+
+TelegramRetryAfter raised by a callback pauses the global bucket for
+retry_after seconds and re-queues that recipient (up to
+TG_RETRY_AFTER_MAX_ATTEMPTS sends). Any other exception escaping a callback
+ends that recipient with DeliveryResult.error set; callers handle the
+per-recipient errors they care about (blocked bot, bad chat id) inside the
+callback and fold the rest into their stats from the returned results.
+"""
+
+from __future__ import annotations
+
+import asyncio
+import os
+import random
+import time
+from contextvars import ContextVar
+from dataclasses import dataclass
+from typing import Any, Awaitable, Callable, Generic, Optional, Sequence, TypeVar
+
+from aiogram.client.session.middlewares.base import BaseRequestMiddleware, NextRequestMiddlewareType
+from aiogram.exceptions import TelegramRetryAfter
+
+TG_DELIVERY_WORKERS = int(os.getenv("TG_DELIVERY_WORKERS", "16"))
+TG_GLOBAL_RATE = float(os.getenv("TG_GLOBAL_RATE", "28"))
+TG_GLOBAL_BURST = int(os.getenv("TG_GLOBAL_BURST", "28"))
+TG_PER_CHAT_INTERVAL_SEC = float(os.getenv("TG_PER_CHAT_INTERVAL_SEC", "1.0"))
+TG_RETRY_AFTER_MAX_ATTEMPTS = int(os.getenv("TG_RETRY_AFTER_MAX_ATTEMPTS", "3"))
+
+T = TypeVar("T")
+
+# (delivery, chat_id) of the callback running in the current worker task
+_CURRENT: ContextVar[Optional[tuple["TelegramDelivery", int]]] = ContextVar("tg_delivery_current", default=None)
+
+
+class TokenBucket:
+    """Async token bucket: ``rate`` tokens per second, at most ``capacity`` banked."""
+
+    def __init__(self, rate: float, capacity: int) -> None:
+        self.rate = max(0.1, float(rate))
+        self.capacity = max(1, int(capacity))
+        self._tokens = float(self.capacity)
+        self._updated = time.monotonic()
+        self._paused_until = 0.0
+        self._lock = asyncio.Lock()
+
+    def _refill(self, now: float) -> None:
+        self._tokens = min(self.capacity, self._tokens + (now - self._updated) * self.rate)
+        self._updated = now
+
+    def pause(self, seconds: float) -> None:
+        """Hand out no tokens for ``seconds`` (flood wait from Telegram)."""
+        now = time.monotonic()
+        self._paused_until = max(self._paused_until, now + max(0.0, seconds))
+        self._refill(now)
+        self._tokens = 0.0
+
+    async def acquire(self) -> None:
+        async with self._lock:
+            while True:
+                now = time.monotonic()
+                if now < self._paused_until:
+                    await asyncio.sleep(self._paused_until - now)
+                    continue
+                self._refill(now)
+                if self._tokens >= 1.0:
+                    self._tokens -= 1.0
+                    return
+                await asyncio.sleep((1.0 - self._tokens) / self.rate)
+
+
+@dataclass
+class DeliveryResult(Generic[T]):
+    item: T
+    chat_id: int
+    ok: bool = False
+    value: Any = None
+    error: Optional[BaseException] = None
+    attempts: int = 0
+
+
+class TelegramDelivery:
+    def __init__(
+        self,
+        *,
+        workers: int = TG_DELIVERY_WORKERS,
+        global_rate: float = TG_GLOBAL_RATE,
+        global_burst: int = TG_GLOBAL_BURST,
+        per_chat_interval: float = TG_PER_CHAT_INTERVAL_SEC,
+        max_attempts: int = TG_RETRY_AFTER_MAX_ATTEMPTS,
+    ) -> None:
+        self.workers = max(1, workers)
+        self.per_chat_interval = max(0.0, per_chat_interval)
+        self.max_attempts = max(1, max_attempts)
+        self._bucket = TokenBucket(global_rate, global_burst)
+        self._chat_next: dict[int, float] = {}
+        self.sent = 0
+        self.failed = 0
+        self.retry_after = 0
+
+    def _reserve_chat(self, chat_id: int) -> float:
+        """Book the next send slot for chat_id; returns how long to wait for it."""
+        now = time.monotonic()
+        if len(self._chat_next) > 10000:
+            self._chat_next = {key: ts for key, ts in self._chat_next.items() if ts > now}
+        slot = max(now, self._chat_next.get(chat_id, 0.0))
+        self._chat_next[chat_id] = slot + self.per_chat_interval
+        return slot - now
+
+    async def gate(self, chat_id: int) -> None:
+        """Wait for chat_id's next slot and a global token before one API call."""
+        wait = self._reserve_chat(chat_id)
+        if wait > 0:
+            await asyncio.sleep(wait)
+        await self._bucket.acquire()
+
+    async def deliver(
+        self,
+        items: Sequence[T],
+        send: Callable[[T], Awaitable[Any]],
+        *,
+        chat_id_of: Callable[[T], int] = lambda item: item.chat_id,
+    ) -> list[DeliveryResult[T]]:
+        """
+        Run send(item) for every item and return results in the same order.
+        send() is awaited once per attempt; it must raise TelegramRetryAfter
+        unchanged so the recipient can be re-queued. Its API calls are rate
+        limited by DeliveryThrottle, which must be installed on the bot.
+        """
+        results = [DeliveryResult(item=item, chat_id=int(chat_id_of(item))) for item in items]
+        if not results:
+            return results
+        queue: asyncio.Queue[int] = asyncio.Queue()
+        for index in range(len(results)):
+            queue.put_nowait(index)
+        remaining = len(results)
+        done = asyncio.Event()
+        loop = asyncio.get_running_loop()
+        requeues: set[asyncio.TimerHandle] = set()
+
+        def _finish() -> None:
+            nonlocal remaining
+            remaining -= 1
+            if remaining <= 0:
+                done.set()
+
+        def _requeue(handle_box: list, index: int) -> None:
+            requeues.discard(handle_box[0])
+            queue.put_nowait(index)
+
+        async def _worker() -> None:
+            while True:
+                index = await queue.get()
+                result = results[index]
+                result.attempts += 1
+                requeued = False
+                current = _CURRENT.set((self, result.chat_id))
+                try:
+                    result.value = await send(result.item)
+                    result.ok = True
+                    self.sent += 1
+                except TelegramRetryAfter as exc:
+                    self.retry_after += 1
+                    delay = float(exc.retry_after) + random.uniform(0.05, 0.2)
+                    print(
+                        f"[tg_delivery] floodwait chat_id={result.chat_id} "
+                        f"retry_after={exc.retry_after}s attempt={result.attempts}"
+                    )
+                    self._bucket.pause(delay)
+                    if result.attempts < self.max_attempts:
+                        box: list = []
+                        box.append(loop.call_later(delay, _requeue, box, index))
+                        requeues.add(box[0])
+                        requeued = True
+                        continue
+                    result.error = exc
+                    self.failed += 1
+                except Exception as exc:
+                    result.error = exc
+                    self.failed += 1
+                except BaseException as exc:
+                    # e.g. a CancelledError leaking out of the callback: this
+                    # worker ends, the recipient still counts as finished
+                    result.error = exc
+                    self.failed += 1
+                    raise
+                finally:
+                    _CURRENT.reset(current)
+                    if not requeued:
+                        _finish()
+
+        tasks = [
+            asyncio.create_task(_worker())
+            for _ in range(min(self.workers, len(results)))
+        ]
+        waiter = asyncio.create_task(done.wait())
+        try:
+            pending = {waiter, *tasks}
+            while not done.is_set():
+                _, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+                if not done.is_set() and pending == {waiter}:
+                    # every worker exited early: fail whatever is still queued
+                    for result in results:
+                        if not result.ok and result.error is None:
+                            result.error = RuntimeError("delivery workers exited")
+                            self.failed += 1
+                    break
+        finally:
+            waiter.cancel()
+            for handle in requeues:
+                handle.cancel()
+            for task in tasks:
+                task.cancel()
+            await asyncio.gather(waiter, *tasks, return_exceptions=True)
+        return results
+
+    def snapshot(self) -> dict:
+        return {
+            "workers": self.workers,
+            "sent": self.sent,
+            "failed": self.failed,
+            "retry_after": self.retry_after,
+            "chats_tracked": len(self._chat_next),
+        }
+
+
+class DeliveryThrottle(BaseRequestMiddleware):
+    """Bot session middleware gating each API call made by a delivery callback."""
+
+    async def __call__(self, make_request: NextRequestMiddlewareType, bot, method):
+        current = _CURRENT.get()
+        if current is not None:
+            delivery, chat_id = current
+            await delivery.gate(chat_id)
+        return await make_request(bot, method)
+
+
+TELEGRAM_DELIVERY = TelegramDelivery()
@@ -2,9 +2,10 @@ import logging
 import os
 import time
 from statistics import mean
-from typing import Dict, Iterable, List, Optional, Tuple
+from typing import Dict, Iterable, List, Optional, Sequence, Tuple
 
-from ai_types import Candle
+import indicators_vectorized
+from ai_types import Candle, CandleFrame, CandleSeries
 from binance_rest import fetch_json
 from utils.safe_math import EPS, guarded_div, safe_div, safe_pct
 
@@ -25,6 +26,19 @@ MEGA_WHALE_TRADE_USD = 300_000     # для флага whale_activity
 
 logger = logging.getLogger(__name__)
 
+# "vectorized" routes the series indicators through indicators_vectorized,
+# "reference" keeps the plain per-element loops below (useful for debugging).
+INDICATOR_ENGINE = os.getenv("INDICATOR_ENGINE", "vectorized").strip().lower()
+
+
+def set_indicator_engine(engine: str) -> None:
+    global INDICATOR_ENGINE
+    INDICATOR_ENGINE = (engine or "").strip().lower()
+
+
+def _use_vectorized() -> bool:
+    return INDICATOR_ENGINE == "vectorized"
+
 
 async def _fetch_futures_json(url: str, params: Dict) -> Optional[Dict]:
     """
@@ -37,26 +51,44 @@ async def _fetch_futures_json(url: str, params: Dict) -> Optional[Dict]:
     return data
 
 
-def _pivot_highs_lows(candles: List[Candle], left: int = 2, right: int = 2) -> tuple[list[Tuple[int, float]], list[Tuple[int, float]]]:
+def _column(candles: CandleSeries, name: str) -> Sequence[float]:
+    """Column of a candle series: a zero-copy view for CandleFrame, a list otherwise."""
+    if isinstance(candles, CandleFrame):
+        return getattr(candles, name)
+    return [getattr(c, name) for c in candles]
+
+
+def _pivot_points(
+    highs: Sequence[float],
+    lows: Sequence[float],
+    left: int = 2,
+    right: int = 2,
+) -> tuple[list[Tuple[int, float]], list[Tuple[int, float]]]:
+    if _use_vectorized():
+        return indicators_vectorized.pivot_points(highs, lows, left, right)
     swing_highs: list[Tuple[int, float]] = []
     swing_lows: list[Tuple[int, float]] = []
 
-    for i in range(left, len(candles) - right):
-        high = candles[i].high
-        low = candles[i].low
-        if all(high > candles[i - j].high for j in range(1, left + 1)) and all(
-            high > candles[i + j].high for j in range(1, right + 1)
+    for i in range(left, min(len(highs), len(lows)) - right):
+        high = highs[i]
+        low = lows[i]
+        if all(high > highs[i - j] for j in range(1, left + 1)) and all(
+            high > highs[i + j] for j in range(1, right + 1)
         ):
             swing_highs.append((i, high))
-        if all(low < candles[i - j].low for j in range(1, left + 1)) and all(
-            low < candles[i + j].low for j in range(1, right + 1)
+        if all(low < lows[i - j] for j in range(1, left + 1)) and all(
+            low < lows[i + j] for j in range(1, right + 1)
         ):
             swing_lows.append((i, low))
 
     return swing_highs, swing_lows
 
 
-def detect_trend_and_structure(candles: List[Candle]) -> dict:
+def _pivot_highs_lows(candles: CandleSeries, left: int = 2, right: int = 2) -> tuple[list[Tuple[int, float]], list[Tuple[int, float]]]:
+    return _pivot_points(_column(candles, "high"), _column(candles, "low"), left, right)
+
+
+def detect_trend_and_structure(candles: CandleSeries) -> dict:
     swing_highs, swing_lows = _pivot_highs_lows(candles)
     trend = "range"
     last_swing_high = swing_highs[-1][1] if swing_highs else None
@@ -109,7 +141,7 @@ def detect_trend_and_structure(candles: List[Candle]) -> dict:
     }
 
 
-def find_key_levels(daily_candles: List[Candle], lookback_days: int = 30) -> dict:
+def find_key_levels(daily_candles: CandleSeries, lookback_days: int = 30) -> dict:
     highs: list[float] = []
     lows: list[float] = []
     lookback = daily_candles[-lookback_days:] if len(daily_candles) >= lookback_days else daily_candles
@@ -119,16 +151,18 @@ def find_key_levels(daily_candles: List[Candle], lookback_days: int = 30) -> dic
     lows.extend([l for _, l in swing_lows])
 
     if lookback:
-        highs.append(max(c.high for c in lookback))
-        lows.append(min(c.low for c in lookback))
+        highs.append(max(_column(lookback, "high")))
+        lows.append(min(_column(lookback, "low")))
 
-    if len(daily_candles) >= 2:
-        highs.append(daily_candles[-2].high)
-        lows.append(daily_candles[-2].low)
+    daily_highs = _column(daily_candles[-2:], "high")
+    daily_lows = _column(daily_candles[-2:], "low")
+    if len(daily_highs) >= 2:
+        highs.append(daily_highs[-2])
+        lows.append(daily_lows[-2])
 
-    if daily_candles:
-        highs.append(daily_candles[-1].high)
-        lows.append(daily_candles[-1].low)
+    if daily_highs:
+        highs.append(daily_highs[-1])
+        lows.append(daily_lows[-1])
 
     return {
         "highs": sorted(set(highs)),
@@ -136,12 +170,13 @@ def find_key_levels(daily_candles: List[Candle], lookback_days: int = 30) -> dic
     }
 
 
-def is_liquidity_sweep(recent_candles: List[Candle], level: float, direction: str) -> bool:
+def is_liquidity_sweep(recent_candles: CandleSeries, level: float, direction: str) -> bool:
     if len(recent_candles) < 3:
         return False
 
     last_candle = recent_candles[-1]
-    prev_volumes = [c.volume for c in recent_candles[-6:-1]]
+    volumes = _column(recent_candles, "volume")
+    prev_volumes = volumes[-6:-1]
     avg_volume = mean(prev_volumes) if prev_volumes else 0
 
     if direction == "long":
@@ -152,18 +187,21 @@ def is_liquidity_sweep(recent_candles: List[Candle], level: float, direction: st
     return pierced and last_candle.volume >= avg_volume * 1.2 if avg_volume > 0 else pierced
 
 
-def is_volume_climax(candles: List[Candle], lookback: int = 20) -> bool:
+def is_volume_climax(candles: CandleSeries, lookback: int = 20) -> bool:
     if len(candles) <= lookback:
         return False
-    prev_volumes = [c.volume for c in candles[-lookback - 1 : -1]]
-    current_volume = candles[-1].volume
+    volumes = _column(candles, "volume")
+    prev_volumes = volumes[-lookback - 1 : -1]
+    current_volume = volumes[-1]
     sorted_volumes = sorted(prev_volumes)
     idx = int(len(sorted_volumes) * 0.9)
     threshold = sorted_volumes[idx]
     return current_volume >= threshold
 
 
-def _compute_rsi_series(closes: List[float], period: int = 14) -> List[float]:
+def _compute_rsi_series(closes: Sequence[float], period: int = 14) -> List[float]:
+    if _use_vectorized():
+        return indicators_vectorized.rsi_series(closes, period)
     period = max(1, int(period))
     if len(closes) < period + 1:
         return [50.0] * len(closes)
@@ -198,8 +236,10 @@ def _compute_rsi_series(closes: List[float], period: int = 14) -> List[float]:
 
 
 def _compute_atr_series(
-    highs: List[float], lows: List[float], closes: List[float], period: int = 14
+    highs: Sequence[float], lows: Sequence[float], closes: Sequence[float], period: int = 14
 ) -> List[float]:
+    if _use_vectorized():
+        return indicators_vectorized.atr_series(highs, lows, closes, period)
     period = max(1, int(period))
     n = min(len(highs), len(lows), len(closes))
     if n == 0:
@@ -238,13 +278,11 @@ def _compute_atr_series(
     return atrs
 
 
-def detect_rsi_divergence(price_series: List[float], rsi_series: List[float], direction: str) -> bool:
+def detect_rsi_divergence(price_series: Sequence[float], rsi_series: Sequence[float], direction: str) -> bool:
     if len(price_series) < 6 or len(price_series) != len(rsi_series):
         return False
 
-    swing_highs, swing_lows = _pivot_highs_lows(
-        [Candle(p, p, p, p, 0, 0, 0) for p in price_series], left=1, right=1
-    )
+    swing_highs, swing_lows = _pivot_points(price_series, price_series, left=1, right=1)
 
     if direction == "bullish":
         lows = swing_lows[-2:]
@@ -262,24 +300,30 @@ def detect_rsi_divergence(price_series: List[float], rsi_series: List[float], di
         return price2 > price1 and rsi2 < rsi1
 
 
-def _true_range(prev_close: float, candle: Candle) -> float:
+def _true_range_at(highs: Sequence[float], lows: Sequence[float], closes: Sequence[float], i: int) -> float:
+    prev_close = closes[i - 1]
     return max(
-        candle.high - candle.low,
-        abs(candle.high - prev_close),
-        abs(candle.low - prev_close),
+        highs[i] - lows[i],
+        abs(highs[i] - prev_close),
+        abs(lows[i] - prev_close),
     )
 
 
-def compute_atr(candles: List[Candle], period: int = 14) -> Optional[float]:
+def compute_atr(candles: CandleSeries, period: int = 14) -> Optional[float]:
     period = max(1, int(period))
     if len(candles) < period + 1:
         return None
+    highs = _column(candles, "high")
+    lows = _column(candles, "low")
+    closes = _column(candles, "close")
+    if _use_vectorized():
+        return indicators_vectorized.atr_last(highs, lows, closes, period)
     trs = []
     for i in range(1, period + 1):
-        trs.append(_true_range(candles[i - 1].close, candles[i]))
+        trs.append(_true_range_at(highs, lows, closes, i))
     atr = safe_div(sum(trs), period, 0.0)
-    for i in range(period + 1, len(candles)):
-        tr = _true_range(candles[i - 1].close, candles[i])
+    for i in range(period + 1, len(closes)):
+        tr = _true_range_at(highs, lows, closes, i)
         atr = safe_div((atr * (period - 1) + tr), period, atr)
     return atr
 
@@ -295,7 +339,9 @@ def _nearest_level(price: float, levels: Iterable[float]) -> Tuple[Optional[floa
     return best_level, best_distance
 
 
-def compute_ema(closes: List[float], period: int) -> Optional[float]:
+def compute_ema(closes: Sequence[float], period: int) -> Optional[float]:
+    if _use_vectorized():
+        return indicators_vectorized.ema_last(closes, period)
     if len(closes) < period:
         return None
     k = safe_div(2, (period + 1), 0.0)
@@ -306,12 +352,14 @@ def compute_ema(closes: List[float], period: int) -> Optional[float]:
 
 
 def compute_bollinger_bands(
-    closes: List[float], period: int = 20, mult: float = 2.0
+    closes: Sequence[float], period: int = 20, mult: float = 2.0
 ) -> Tuple[List[float], List[float], List[float]]:
     """
     Возвращает (middle, upper, lower) списки той же длины, что и closes.
     Для первых period-1 значений можно вернуть те же значения, что и последний рассчитанный.
     """
+    if _use_vectorized():
+        return indicators_vectorized.bollinger_bands(closes, period, mult)
     if len(closes) < period:
         return [closes[-1]] * len(closes), [closes[-1]] * len(closes), [closes[-1]] * len(closes)
 
@@ -337,7 +385,7 @@ def compute_bollinger_bands(
 
 
 def is_bb_extreme_reversal(
-    candles: List[Candle], period: int = 20, mult: float = 2.0, direction: str = "long"
+    candles: CandleSeries, period: int = 20, mult: float = 2.0, direction: str = "long"
 ) -> bool:
     """
     По Боллинджеру ищем экстремум + возврат внутрь канала.
@@ -352,7 +400,7 @@ def is_bb_extreme_reversal(
     if len(candles) < period + 2:
         return False
 
-    closes = [c.close for c in candles]
+    closes = _column(candles, "close")
     _, upper, lower = compute_bollinger_bands(closes, period=period, mult=mult)
 
     last = candles[-1]
@@ -3,7 +3,7 @@ from __future__ import annotations
 import time
 from typing import Sequence
 
-from ai_types import Candle
+from ai_types import Candle, CandleFrame
 
 
 def normalize_klines(raw_klines: Sequence[list] | Sequence[Candle] | None) -> list[Candle]:
@@ -42,3 +42,19 @@ def normalize_klines(raw_klines: Sequence[list] | Sequence[Candle] | None) -> li
     if candles and candles[-1].close_time is not None and candles[-1].close_time > now_ms:
         candles.pop()
     return candles
+
+
+def klines_to_frame(raw_klines: Sequence[list] | Sequence[Candle] | CandleFrame | None) -> CandleFrame:
+    if isinstance(raw_klines, CandleFrame):
+        return raw_klines
+    if not raw_klines:
+        return CandleFrame.empty()
+
+    if isinstance(raw_klines[0], Candle):
+        return CandleFrame.from_candles(raw_klines)
+
+    frame = CandleFrame.from_klines(raw_klines)
+    now_ms = int(time.time() * 1000)
+    if frame and frame.close_time[-1] > now_ms:
+        return frame.view(None, -1)
+    return frame